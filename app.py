@@ -1,13 +1,28 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, make_response, Response, stream_with_context, g
 from scraper.reddit_scraper import RedditScraper
 from scraper.gemini_analyzer import GeminiAnalyzer  
 from scraper.sentiment_analyzer import SentimentAnalyzer
+from scraper.analysis_cache import AnalysisCache
+from scraper.storage import ResultStore
+from scraper.jobs import JobManager
+from scraper.crawler import IncrementalCrawler
+from scraper.pipeline import analyze_stream
+from scraper.near_duplicates import NearDuplicateDetector
+from scraper.export import FORMATS, export_filename, iter_export
+from scraper.aggregates import sentiment_bucket
+from scraper.text_classifier import MOD_VERDICT_KEY, classify_mod_post, filter_mod_posts, is_mod_post
+from scraper.metrics import registry, start_request_timing, finish_request_timing, format_server_timing
+from scraper.http_cache import (FragmentCache, compress_response, http_not_modified_total, is_not_modified,
+                                make_etag, not_modified_response, precompress_directory, send_static, set_validators)
 import os
 import json
+import time
+import queue
 import hashlib
-from typing import List, Dict
-from datetime import datetime
-from collections import Counter
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,66 +41,135 @@ app.config['JSON_SORT_KEYS'] = False
 reddit_scraper = RedditScraper(
     client_id=os.getenv('REDDIT_CLIENT_ID'),
     client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
-    user_agent=os.getenv('REDDIT_USER_AGENT')
+    user_agent=os.getenv('REDDIT_USER_AGENT'),
+    subreddits=[s.strip() for s in os.getenv('REDDIT_SUBREDDITS', '').split(',') if s.strip()] or None,
+    listings=[l.strip() for l in os.getenv('REDDIT_LISTINGS', 'hot').split(',') if l.strip()],
+    max_workers=int(os.getenv('REDDIT_CRAWL_WORKERS', 4))
 )
-gemini_analyzer = GeminiAnalyzer()
-sentiment_analyzer = SentimentAnalyzer()
-
-def extract_keywords(results, top_n=5):
-    """Extract mental health keywords from posts"""
-    mental_health_terms = [
-        'anxiety', 'depression', 'therapy', 'stress', 'trauma',
-        'coping', 'medication', 'support', 'recovery', 'mental health',
-        'therapist', 'counseling', 'self-care', 'diagnosis', 'symptoms',
-        'treatment', 'healing', 'crisis', 'panic', 'grief'
-    ]
-    
-    keyword_counts = Counter()
-    
-    for post in results:
-        content = (post.get('title', '') + ' ' + post.get('content', '')).lower()
-        for term in mental_health_terms:
-            if term in content:
-                keyword_counts[term] += 1
-    
-    return dict(keyword_counts.most_common(top_n))
-
-def filter_mod_posts(posts: List[Dict]) -> List[Dict]:
-    """Filter out any posts that might be from moderators with comprehensive checks"""
-    mod_keywords = [
-        'moderator', 'mod ', 'mods ', 'modding', 'moderation', 
-        'rules', 'rule', 'announcement', 'official', 'meta',
-        'welcome', 'introduction', 'guideline', 'reminder', 'update'
-    ]
-    filtered = []
-    
-    for post in posts:
-        # Skip if explicitly marked as mod
-        if post.get('is_moderator', False):
-            continue
-            
-        # Check content for mod keywords in title or content
-        title = post.get('title', '').lower()
-        content = post.get('content', '').lower()
-        
-        # Skip if title starts with [Mod] or similar
-        if title.startswith(('[mod]', '[meta]', '[announcement]')):
-            continue
-            
-        # Check for mod keywords in content
-        combined = f"{title}\n{content}"
-        if any(keyword in combined for keyword in mod_keywords):
-            continue
-            
-        # Skip posts with very high upvote-to-comment ratios (common for mod posts)
-        upvotes = post.get('upvotes', 0)
-        comments = post.get('comments', 1)
-        if upvotes > 100 and comments < 3:  # Suspicious ratio
-            continue
-            
-        filtered.append(post)
-        
-    return filtered
+analysis_cache = AnalysisCache(os.getenv('ANALYSIS_CACHE_PATH', 'data/analysis_cache.db'))
+gemini_analyzer = GeminiAnalyzer(cache=analysis_cache, batch_size=int(os.getenv('GEMINI_BATCH_SIZE', 4)))
+sentiment_analyzer = SentimentAnalyzer(
+    cache=analysis_cache,
+    backend=os.getenv('SENTIMENT_BACKEND', 'pytorch'),
+    # Shared inference service (python -m scraper.inference_server) so workers don't each hold the model
+    service_socket=os.getenv('SENTIMENT_SERVICE_SOCKET') or None
+)
+
+# The model is loaded lazily. PRELOAD_MODEL=1 loads the weights at import time, which under
+# gunicorn --preload happens once in the master so forked workers share them copy-on-write
+# (see gunicorn.conf.py). Otherwise the model is warmed up in the background. With an inference
+# service the local model is only loaded if the service turns out to be unreachable.
+if os.getenv('PRELOAD_MODEL') == '1' and sentiment_analyzer.service is None:
+    sentiment_analyzer.load()
+elif os.getenv('WARM_UP_MODEL', '1') == '1':
+    sentiment_analyzer.warm_up(background=True)
+result_store = ResultStore(os.getenv('RESULTS_DB_PATH', 'data/results.db'))
+result_store.import_json_files('data')  # One-shot migration of legacy JSON results
+result_store.backfill_mod_verdicts()
+job_manager = JobManager(max_workers=int(os.getenv('SCRAPE_JOB_WORKERS', 2)), store=result_store)
+# Sentiment and Gemini work of /analyze requests, run side by side rather than one after the other
+analyze_executor = ThreadPoolExecutor(max_workers=int(os.getenv('ANALYZE_WORKERS', 16)), thread_name_prefix='analyze')
+
+# Cross-posts and reposts whose word shingles overlap an analyzed post's at least this much (estimated
+# Jaccard similarity) reuse its sentiment and insight instead of calling the model and Gemini again (0 disables)
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.7))
+near_duplicate_detector = NearDuplicateDetector(
+    result_store, threshold=NEAR_DUPLICATE_THRESHOLD
+) if NEAR_DUPLICATE_THRESHOLD > 0 else None
+
+# CRAWL_INTERVAL=<seconds> keeps the store fresh by fetching only posts newer than each subreddit's
+# watermark in the background (or run `python -m scraper.crawler` as a separate process)
+incremental_crawler = IncrementalCrawler(
+    reddit_scraper, result_store, sentiment_analyzer, gemini_analyzer,
+    interval=float(os.getenv('CRAWL_INTERVAL') or 0) or 900,
+    max_posts=int(os.getenv('CRAWL_MAX_POSTS', 100)),
+    near_duplicates=near_duplicate_detector
+)
+if float(os.getenv('CRAWL_INTERVAL') or 0) > 0:
+    incremental_crawler.start()
+
+SCRAPE_STAGES = ['fetch', 'sentiment', 'insight', 'save']
+
+# Queries are answered from stored posts dated within this many days before going to Reddit (0 disables)
+LOCAL_RESULTS_MAX_AGE_DAYS = float(os.getenv('LOCAL_RESULTS_MAX_AGE_DAYS', 7))
+
+# SERVER_TIMING=1 adds a Server-Timing header with per-stage durations to every response
+SERVER_TIMING = os.getenv('SERVER_TIMING') == '1'
+http_request_seconds = registry.histogram(
+    'http_request_seconds', 'Time to produce a response (streamed bodies excluded)', ['endpoint', 'method', 'status']
+)
+registry.gauge('analysis_cache_hit_ratio', 'Share of analysis cache lookups served from either tier',
+               function=lambda: analysis_cache.stats()['hit_ratio'])
+registry.gauge('sentiment_model_ready', '1 once the sentiment model is loaded (and warmed up, if a warm-up runs)',
+               function=lambda: int(sentiment_analyzer.model.ready))
+registry.gauge('sentiment_service_ready', '1 while the shared sentiment inference service answers pings',
+               function=lambda: int(sentiment_analyzer.service_available()))
+
+# HTTP_COMPRESSION=0 leaves compression to a reverse proxy
+HTTP_COMPRESSION = os.getenv('HTTP_COMPRESSION', '1') == '1'
+# Rendered dashboards are reused for this many seconds while the stored data is unchanged
+dashboard_cache = FragmentCache(ttl=float(os.getenv('DASHBOARD_CACHE_SECONDS', 30)))
+# Serialized /scrape answers for saved queries, also keyed by the data version
+scrape_response_cache = FragmentCache(ttl=300, max_entries=256)
+# Part of every ETag so that a deploy with changed templates invalidates cached pages
+TEMPLATE_DIR = os.path.join(app.root_path, app.template_folder)
+TEMPLATE_VERSION = make_etag(*sorted(
+    (name, os.path.getmtime(os.path.join(TEMPLATE_DIR, name))) for name in os.listdir(TEMPLATE_DIR)
+)) if os.path.isdir(TEMPLATE_DIR) else ''
+
+# Write static/<file>.gz (and .br with brotli installed) once; serve_static picks them by Accept-Encoding
+try:
+    precompress_directory(app.static_folder)
+except OSError as e:
+    print(f"WARNING: Could not precompress static files: {str(e)}")
+
+def serve_static(filename):
+    return send_static(app.static_folder, filename, request.accept_encodings,
+                       max_age=app.get_send_file_max_age(filename))
+
+app.view_functions['static'] = serve_static
+
+def versioned(view):
+    """
+    Give a GET view ETag/Last-Modified validators derived from the result store's data version;
+    conditional requests that still match are answered with 304 without running the view
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version, updated_at = result_store.data_version()
+        # The date is included because "last N days" windows move even when the data does not
+        etag = make_etag(version, request.full_path, date.today(), TEMPLATE_VERSION)
+        if is_not_modified(request, etag, updated_at):
+            http_not_modified_total.inc(endpoint=request.endpoint)
+            return not_modified_response(etag, updated_at)
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.cache_control.no_store:
+            set_validators(response, etag, updated_at)
+        return response
+    return wrapper
+
+@app.before_request
+def start_timing():
+    g.request_started_at = time.perf_counter()
+    start_request_timing()
+
+@app.after_request
+def record_timing(response):
+    timings = finish_request_timing()
+    started_at = g.pop('request_started_at', None)
+    if started_at is not None:
+        http_request_seconds.observe(time.perf_counter() - started_at, endpoint=request.endpoint or 'unknown',
+                                     method=request.method, status=response.status_code)
+    if SERVER_TIMING and timings:
+        response.headers['Server-Timing'] = format_server_timing(timings)
+    return response
+
+@app.after_request
+def compress(response):
+    # Runs before record_timing (after_request hooks run in reverse), so compression time is measured
+    if HTTP_COMPRESSION:
+        compress_response(response, request.accept_encodings)
+    return response
 
 def get_cache_key(keywords, limit):
     """Generate a cache key based on search parameters"""
@@ -93,50 +177,41 @@ def get_cache_key(keywords, limit):
     return hashlib.md5(key_string.encode()).hexdigest()
 
 def get_cached_results(cache_key):
-    """Try to get results from cache with mod post filtering"""
-    cache_file = f"data/cache_{cache_key}.json"
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            cached_data = json.load(f)
-            return filter_mod_posts(cached_data)  # Always filter mod posts when loading
-    return None
-
-def cache_results(cache_key, results):
-    """Save results to cache after filtering mod posts"""
-    cache_file = f"data/cache_{cache_key}.json"
+    """Try to get results from cache with mod post filtering, as (query id, posts) or (None, None)"""
+    query_id = result_store.find_query_id(cache_key)
+    if query_id is not None:
+        return query_id, filter_mod_posts(result_store.posts_for_query(query_id))  # Always filter mod posts when loading
+    return None, None
+
+def find_local_posts(keywords, limit):
+    """Fresh, already analyzed stored posts matching any keyword (newest first, at most `limit`)"""
+    if LOCAL_RESULTS_MAX_AGE_DAYS <= 0:
+        return []
+    since = (datetime.utcnow() - timedelta(days=LOCAL_RESULTS_MAX_AGE_DAYS)).isoformat()
+    return result_store.search_posts(keywords, limit, subreddits=reddit_scraper.subreddits, since=since)
+
+def cache_results(cache_key, keywords, limit, results):
+    """Save results as a query in the result store after filtering mod posts"""
     filtered_results = filter_mod_posts(results)
-    with open(cache_file, 'w', encoding='utf-8') as f:
-        json.dump(filtered_results, f)
+    return result_store.save_query(cache_key, keywords, limit, filtered_results)
 
 def clean_cache(cache_key=None):
-    """Clean the cache by filtering out mod posts from cache files"""
-    os.makedirs('data', exist_ok=True)
-    cache_files = []
-    
-    if cache_key:
-        cache_files = [f"data/cache_{cache_key}.json"]
-    else:
-        cache_files = [f for f in os.listdir('data') if f.startswith('cache_')]
-        cache_files = [os.path.join('data', f) for f in cache_files]
-    
+    """Clean the cache by unlinking mod posts from saved queries"""
     cleaned_count = 0
-    for cache_file in cache_files:
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cached_data = json.load(f)
-                
-                original_count = len(cached_data)
-                filtered_data = filter_mod_posts(cached_data)
-                
-                if len(filtered_data) < original_count:
-                    with open(cache_file, 'w', encoding='utf-8') as f:
-                        json.dump(filtered_data, f, ensure_ascii=False, indent=2)
-                    cleaned_count += (original_count - len(filtered_data))
-                    
-            except Exception as e:
-                print(f"Error cleaning cache file {cache_file}: {str(e)}")
-                continue
+    for query_id in result_store.query_ids(cache_key):
+        try:
+            # Re-run the heuristics rather than trusting verdicts recorded under older rules
+            removed = []
+            for post in result_store.posts_for_query(query_id):
+                if classify_mod_post(post):
+                    post[MOD_VERDICT_KEY] = True
+                    result_store.upsert_posts([post])
+                    removed.append(post['id'])
+            if removed:
+                cleaned_count += result_store.unlink_posts(query_id, removed)
+        except Exception as e:
+            print(f"Error cleaning cached query {query_id}: {str(e)}")
+            continue
     
     return cleaned_count
 
@@ -144,66 +219,159 @@ def clean_cache(cache_key=None):
 def home():
     return render_template('index.html')
 
+def scrape_events(keywords, limit, cache_key, job=None, local_posts=()):
+    """
+    Stream a scrape through mod filtering, sentiment, insight and storage
+    Yields ('post', analyzed_post) for each post as soon as it is ready, then ('done', summary)
+    :param local_posts: Already analyzed stored matches; they are yielded first and only the
+                        remaining `limit - len(local_posts)` posts are fetched from Reddit
+    """
+    local_posts = list(local_posts)
+    shortfall = limit - len(local_posts)
+    fetched_count = [0]
+
+    def fetched_posts():
+        if shortfall <= 0:
+            return
+        known_urls = {post.get('url') for post in local_posts}
+        for post in reddit_scraper.iter_mentalhealth(keywords, limit=shortfall, exclude_urls=known_urls):
+            if is_mod_post(post):
+                continue
+            fetched_count[0] += 1
+            if job:
+                job.advance('fetch', fetched_count[0])
+            yield post
+        if job:
+            job.finish_stage('fetch')
+            job.set_total('sentiment', fetched_count[0])
+            job.set_total('insight', fetched_count[0])
+
+    if job:
+        for stage in ('fetch', 'sentiment', 'insight'):
+            job.start_stage(stage)
+
+    post_ids = []
+    preview = []
+    sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+
+    for post in local_posts:
+        post_ids.append(post['id'])
+        sentiment_counts[sentiment_bucket(post.get('sentiment'))] += 1
+        if len(preview) < 3:
+            preview.append(post)
+        yield 'post', post
+    if job and preview:
+        job.set_partial_results(list(preview))
+
+    analyzed = analyze_stream(
+        fetched_posts(), sentiment_analyzer, gemini_analyzer,
+        on_sentiment=(lambda done: job.advance('sentiment', done)) if job else None,
+        near_duplicates=near_duplicate_detector
+    )
+    for post in analyzed:
+        post['id'] = result_store.upsert_posts([post])[0]
+        post_ids.append(post['id'])
+        sentiment_counts[sentiment_bucket(post.get('sentiment'))] += 1
+        if len(preview) < 3:
+            preview.append(post)
+            if job:
+                job.set_partial_results(list(preview))
+        if job:
+            job.advance('insight', len(post_ids))
+        yield 'post', post
+
+    if job:
+        job.finish_stage('sentiment')
+        job.finish_stage('insight')
+
+    if not post_ids:
+        if job:
+            job.finish_stage('save')
+        yield 'done', {'status': 'success', 'count': 0, 'message': 'No results found'}
+        return
+
+    # Save the query as rows referencing the stored posts
+    if job:
+        job.start_stage('save')
+    query_id = result_store.record_query(cache_key, keywords, limit, post_ids)
+    if job:
+        job.finish_stage('save')
+
+    yield 'done', {
+        'status': 'success',
+        'count': len(post_ids),
+        'preview': preview,
+        'file': f"query_{query_id}",
+        'sentiment_counts': sentiment_counts,
+        'local_count': len(local_posts)
+    }
+
+def run_scrape_pipeline(job, keywords, limit, cache_key, local_posts=()):
+    """Run a scrape to completion for a background job, returning its summary"""
+    summary = None
+    for event, payload in scrape_events(keywords, limit, cache_key, job=job, local_posts=local_posts):
+        if event == 'done':
+            summary = payload
+    return summary
+
+def parse_scrape_request(data):
+    """Extract (keywords, limit) from a scrape request body"""
+    keywords = [k.strip() for k in data.get('keywords', '').split(',') if k.strip()]
+    limit = int(data.get('limit', 10))
+    return keywords, limit
+
 @app.route('/scrape', methods=['POST'])
 def start_scraping():
     try:
-        data = request.get_json()
-        keywords = [k.strip() for k in data.get('keywords', '').split(',') if k.strip()]
-        limit = int(data.get('limit', 10))
+        keywords, limit = parse_scrape_request(request.get_json())
         
         if not keywords:
             return jsonify({'status': 'error', 'message': 'Please enter keywords'}), 400
 
-        # Check cache first
+        # Check cache first (precomputed summary, so only the preview posts are loaded)
         cache_key = get_cache_key(keywords, limit)
-        cached_results = get_cached_results(cache_key)  # This now includes filtering
+        cached_summary = result_store.get_query_summary(cache_key)
         
-        if cached_results:
+        if cached_summary and cached_summary['count']:
+            # Reuse the serialized answer until the stored data changes
+            body = scrape_response_cache.get_or_render(
+                cache_key, result_store.data_version()[0],
+                lambda: app.json.dumps({
+                    'status': 'success',
+                    'count': cached_summary['count'],
+                    'preview': filter_mod_posts(result_store.posts_for_query(cached_summary['query_id'], limit=3)),
+                    'file': f"query_{cached_summary['query_id']}",
+                    'sentiment_counts': cached_summary['sentiment_counts'],
+                    'cached': True
+                })
+            )
+            return Response(body, mimetype='application/json')
+
+        # Enough fresh matches in the store answer the query without touching Reddit
+        local_posts = find_local_posts(keywords, limit)
+        if len(local_posts) >= limit:
+            query_id = result_store.record_query(cache_key, keywords, limit, [post['id'] for post in local_posts])
             return jsonify({
                 'status': 'success',
-                'count': len(cached_results),
-                'preview': cached_results[:3],
-                'file': f"cache_{cache_key}.json",
-                'sentiment_counts': get_sentiment_counts(cached_results),
+                'count': len(local_posts),
+                'preview': local_posts[:3],
+                'file': f"query_{query_id}",
+                'sentiment_counts': get_sentiment_counts(local_posts),
                 'cached': True
             })
 
-        # Scrape Reddit
-        reddit_results = reddit_scraper.scrape_mentalhealth(keywords, limit=limit)
-        filtered_results = filter_mod_posts(reddit_results)
-        
-        if not filtered_results:
-            return jsonify({'status': 'success', 'count': 0, 'message': 'No results found'})
-
-        # Analyze content
-        analyzed_results = []
-        for post in filtered_results:
-            sentiment = sentiment_analyzer.analyze_text(post['content'])
-            insight = gemini_analyzer.generate_insight(post['content'])
-            
-            analyzed_post = {
-                **post,
-                'sentiment': sentiment['label'],
-                'sentiment_score': sentiment['score'],
-                'insight': insight
-            }
-            analyzed_results.append(analyzed_post)
-
-        # Save and cache filtered results
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"reddit_results_{timestamp}.json"
-        save_results(analyzed_results, filename)
-        
-        # Only cache already-filtered results
-        cache_results(cache_key, analyzed_results)
+        # Run the pipeline in the background for the shortfall; identical in-flight queries share one job
+        job_id = job_manager.submit(
+            cache_key,
+            SCRAPE_STAGES,
+            lambda job: run_scrape_pipeline(job, keywords, limit, cache_key, local_posts)
+        )
         
         return jsonify({
-            'status': 'success',
-            'count': len(analyzed_results),
-            'preview': analyzed_results[:3],
-            'file': filename,
-            'sentiment_counts': get_sentiment_counts(analyzed_results)
-        })
+            'status': 'queued',
+            'job_id': job_id,
+            'poll_url': f"/jobs/{job_id}"
+        }), 202
     
     except Exception as e:
         return jsonify({
@@ -211,6 +379,65 @@ def start_scraping():
             'message': str(e)
         }), 500
 
+@app.route('/scrape/stream', methods=['POST'])
+def stream_scraping():
+    """Stream analyzed posts as NDJSON lines while the scrape is still running"""
+    keywords, limit = parse_scrape_request(request.get_json())
+    
+    if not keywords:
+        return jsonify({'status': 'error', 'message': 'Please enter keywords'}), 400
+
+    cache_key = get_cache_key(keywords, limit)
+
+    def generate():
+        try:
+            query_id, cached_results = get_cached_results(cache_key)
+            if cached_results:
+                for post in cached_results:
+                    yield json.dumps({'type': 'post', 'post': post}) + '\n'
+                yield json.dumps({
+                    'type': 'done',
+                    'status': 'success',
+                    'count': len(cached_results),
+                    'file': f"query_{query_id}",
+                    'sentiment_counts': get_sentiment_counts(cached_results),
+                    'cached': True
+                }) + '\n'
+                return
+
+            local_posts = find_local_posts(keywords, limit)
+            if len(local_posts) >= limit:
+                query_id = result_store.record_query(cache_key, keywords, limit, [post['id'] for post in local_posts])
+                for post in local_posts:
+                    yield json.dumps({'type': 'post', 'post': post}) + '\n'
+                yield json.dumps({
+                    'type': 'done',
+                    'status': 'success',
+                    'count': len(local_posts),
+                    'file': f"query_{query_id}",
+                    'sentiment_counts': get_sentiment_counts(local_posts),
+                    'cached': True
+                }) + '\n'
+                return
+
+            for event, payload in scrape_events(keywords, limit, cache_key, local_posts=local_posts):
+                if event == 'post':
+                    yield json.dumps({'type': 'post', 'post': payload}) + '\n'
+                else:
+                    yield json.dumps({'type': 'done', **payload}) + '\n'
+        except Exception as e:
+            yield json.dumps({'type': 'error', 'status': 'error', 'message': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    # Answered from the result store when the job runs in another worker process
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    return jsonify(status)
+
 @app.route('/analyze', methods=['POST'])
 def analyze_text():
     try:
@@ -220,12 +447,12 @@ def analyze_text():
         if not text:
             return jsonify({'status': 'error', 'message': 'No text provided'}), 400
             
-        sentiment = sentiment_analyzer.analyze_text(text)
+        sentiment = analyze_executor.submit(sentiment_analyzer.analyze_text, text)
         insight = gemini_analyzer.generate_insight(text)
         
         return jsonify({
             'status': 'success',
-            'sentiment': sentiment,
+            'sentiment': sentiment.result(),
             'insight': insight
         })
         
@@ -235,6 +462,74 @@ def analyze_text():
             'message': str(e)
         }), 500
 
+def analyze_events(text):
+    """
+    Yield (event, payload) for one text: 'sentiment' as soon as the model answers, 'insight' for each
+    piece of Gemini text as it streams in, then 'done' with the complete insight
+    """
+    events = queue.Queue()
+    cancelled = threading.Event()
+
+    def stream_insight():
+        parts = []
+        try:
+            for part in gemini_analyzer.stream_insight(text):
+                if cancelled.is_set():
+                    break  # Client went away; closing the generator closes the Gemini stream
+                parts.append(part)
+                events.put(('insight', {'text': part}))
+        except Exception as e:
+            events.put(('error', str(e)))
+        finally:
+            events.put(('insight_done', ''.join(parts)))
+
+    sentiment = analyze_executor.submit(sentiment_analyzer.analyze_text, text)
+    sentiment.add_done_callback(lambda future: events.put(('sentiment', future)))
+    analyze_executor.submit(stream_insight)
+
+    try:
+        pending, insight = 2, ''
+        while pending:
+            event, payload = events.get()
+            if event == 'sentiment':
+                pending -= 1
+                yield 'sentiment', payload.result()
+            elif event == 'insight_done':
+                pending -= 1
+                insight = payload
+            elif event == 'error':
+                raise RuntimeError(payload)
+            else:
+                yield event, payload
+        yield 'done', {'status': 'success', 'insight': insight.strip()}
+    finally:
+        cancelled.set()
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/analyze/stream', methods=['POST'])
+def stream_analysis():
+    """Server-sent events for /analyze: the sentiment first, then the insight as Gemini writes it"""
+    data = request.get_json() or {}
+    text = data.get('text', '')
+
+    if not text:
+        return jsonify({'status': 'error', 'message': 'No text provided'}), 400
+
+    def generate():
+        try:
+            for event, payload in analyze_events(text):
+                yield sse_event(event, payload)
+        except Exception as e:
+            yield sse_event('error', {'status': 'error', 'message': str(e)})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream until it completes
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/clean-cache', methods=['POST'])
 def clean_cache_route():
     try:
@@ -254,63 +549,175 @@ def clean_cache_route():
             'message': str(e)
         }), 500
 
+@app.route('/ready')
+def readiness():
+    ready = sentiment_analyzer.ready
+    return jsonify({
+        'status': 'ready' if ready else 'warming',
+        'sentiment_model': sentiment_analyzer.model.status(),
+        'sentiment_service': sentiment_analyzer.service.socket_path if sentiment_analyzer.service else None,
+        # Informational: an open circuit degrades insights to fallbacks but the app still serves
+        'gemini': gemini_analyzer.status()
+    }), 200 if ready else 503
+
+@app.route('/metrics')
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/crawler')
+def crawler_status():
+    return jsonify({
+        'status': 'success',
+        'crawler': incremental_crawler.status()
+    })
+
+@app.route('/cache-stats')
+def cache_stats():
+    return jsonify({
+        'status': 'success',
+        'analysis_cache': analysis_cache.stats()
+    })
+
+def render_dashboard(days):
+    since = window_start(days)
+    
+    # Charts read the precomputed counters across all scrapes in the window
+    stats = result_store.aggregate_summary(since=since, top_keywords=5)
+    
+    # Table rows are loaded page by page from /api/posts, over the same posts as the charts
+    return render_template('dashboard.html', 
+                        since=since,
+                        days=days,
+                        sentiment_counts=stats['sentiment_counts'],
+                        keywords=stats['keywords'])
+
 @app.route('/dashboard')
+@versioned
 def show_dashboard():
     try:
-        data_files = sorted(
-            [f for f in os.listdir('data') if f.startswith('reddit_results_')],
-            reverse=True
+        days = request.args.get('days', type=int)
+        return dashboard_cache.get_or_render(
+            (days, date.today()), result_store.data_version()[0], lambda: render_dashboard(days)
         )
-        latest_file = data_files[0] if data_files else None
-        
-        if latest_file:
-            results = load_results(f"data/{latest_file}")
-            # Always filter mod posts when displaying results
-            filtered_results = filter_mod_posts(results)  
-            sentiment_counts = get_sentiment_counts(filtered_results)
-            keywords = extract_keywords(filtered_results, top_n=5)
-        else:
-            filtered_results = []
-            sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
-            keywords = {}
-        
-        return render_template('dashboard.html', 
-                            results=filtered_results,
-                            sentiment_counts=sentiment_counts,
-                            keywords=keywords)
     
     except Exception as e:
-        return render_template('dashboard.html', 
+        response = make_response(render_template('dashboard.html', 
                             error=str(e),
-                            results=[],
+                            since=None,
+                            days=None,
                             sentiment_counts={'positive': 0, 'negative': 0, 'neutral': 0},
-                            keywords={})
+                            keywords={}))
+        # Never let a client revalidate its way into keeping the error page
+        response.cache_control.no_store = True
+        return response
+
+@app.route('/api/stats')
+@versioned
+def stats():
+    try:
+        days = request.args.get('days', type=int)
+        since = request.args.get('since') or window_start(days)
+        until = request.args.get('until') or None
+        top_keywords = request.args.get('top', 5, type=int)
+        
+        return jsonify({
+            'status': 'success',
+            **result_store.aggregate_summary(since=since, until=until, top_keywords=top_keywords),
+            'daily_sentiment': result_store.daily_counts('sentiment', since=since)
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/posts')
+@versioned
+def list_posts():
+    try:
+        args = request.args
+        size = min(max(int(args.get('size', 50)), 1), 200)
+        page = max(int(args.get('page', 1)), 1)
+        query_id = args.get('query')
+        
+        result = result_store.list_posts(
+            query_id=int(query_id) if query_id else None,
+            sentiment=args.get('sentiment') or None,
+            subreddit=args.get('subreddit') or None,
+            source=args.get('source') or None,
+            text=args.get('q') or None,
+            since=args.get('since') or None,
+            until=args.get('until') or None,
+            sort=args.get('sort', '-date'),
+            size=size,
+            cursor=args.get('cursor') or None,
+            offset=(page - 1) * size
+        )
+        
+        return jsonify({'status': 'success', **result})
+    
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/export')
+def export_posts():
+    """Stream every matching stored post as NDJSON or CSV (optionally gzipped) without buffering it"""
+    try:
+        args = request.args
+        fmt = args.get('format', 'ndjson')
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        compress = args.get('gzip') in ('1', 'true')
+        query_id = args.get('query')
+        subreddits = [s.strip() for s in args.get('subreddit', '').split(',') if s.strip()]
+
+        posts = result_store.iter_posts(
+            query_id=int(query_id) if query_id else None,
+            sentiment=args.get('sentiment') or None,
+            subreddits=subreddits or None,
+            source=args.get('source') or None,
+            text=args.get('q') or None,
+            since=args.get('since') or None,
+            until=args.get('until') or None
+        )
+        filename = export_filename(fmt, compress, datetime.now().strftime('%Y%m%d_%H%M%S'))
+        return Response(
+            stream_with_context(iter_export(posts, fmt, compress=compress)),
+            mimetype='application/gzip' if compress else FORMATS[fmt],
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+    
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
 
 @app.route('/about')
 def about():
     return render_template('about.html')
 
-def save_results(data, filename):
-    """Save results to file, making sure we only save filtered results"""
-    os.makedirs('data', exist_ok=True)
-    # Make sure we're saving filtered data
-    filtered_data = filter_mod_posts(data)
-    with open(f"data/{filename}", 'w', encoding='utf-8') as f:
-        json.dump(filtered_data, f, ensure_ascii=False, indent=2)
-
-def load_results(filename):
-    """Load results from file and filter mod posts"""
-    with open(filename, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    # Always filter mod posts when loading
-    return filter_mod_posts(data)  
+def window_start(days):
+    """First day (YYYY-MM-DD) of a window covering the last `days` days, or None for all time"""
+    if not days or days <= 0:
+        return None
+    return (date.today() - timedelta(days=days - 1)).isoformat()
 
 def get_sentiment_counts(results):
-    return {
-        'positive': len([r for r in results if r.get('sentiment') == 'POSITIVE']),
-        'negative': len([r for r in results if r.get('sentiment') == 'NEGATIVE']),
-        'neutral': len([r for r in results if not r.get('sentiment') or r.get('sentiment') not in ['POSITIVE', 'NEGATIVE']])
-    }
+    counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+    for r in results:
+        counts[sentiment_bucket(r.get('sentiment'))] += 1
+    return counts
 
 if __name__ == '__main__':
     os.makedirs('data', exist_ok=True)
@@ -0,0 +1,364 @@
+"""
+Offline end-to-end benchmark of the scrape pipeline and dashboard endpoints
+
+Reddit is replaced by benchmarks.fakes.FakeReddit, Gemini by a local StubGeminiServer and the
+sentiment model by StubSentimentPipeline (or a real model with --sentiment-model), so no
+credentials or network access are needed. Each corpus size runs in its own subprocess against a
+fresh data directory, so peak RSS is measured per size.
+
+Stages, and what their latency percentiles measure:
+    crawl            RedditScraper over FakeReddit          gap between consecutive posts
+    filter_mod_posts moderator filter on a synthetic corpus per post
+    sentiment        SentimentAnalyzer.analyze_batch        per batch of 16
+    insight          GeminiAnalyzer against the stub server per call (batch_size posts, including retries)
+    store            ResultStore.upsert_posts               per post
+    scrape_stream    POST /scrape/stream on a cold corpus   time from request to each post
+    scrape_cached    POST /scrape answered from the store   per request
+    dashboard        GET /dashboard                         per request
+    api_posts        GET /api/posts, following cursors     per page
+    api_stats        GET /api/stats                         per request
+    analyze          POST /analyze on uncached texts        per request (whole response)
+    analyze_stream   POST /analyze/stream on uncached texts time from request to the first insight text
+
+Results are printed as a table and written as JSON; pass an earlier file with --compare to see
+throughput and p95 changes between commits.
+
+Usage: python -m benchmarks.bench_end_to_end [--sizes 10,100,1000] [--output FILE] [--compare FILE]
+                                             [--gemini-latency 0.02] [--gemini-error-rate 0]
+                                             [--gemini-batch-size 4] [--gemini-drop-rate 0]
+                                             [--gemini-chunk-latency 0]
+                                             [--reddit-latency 0] [--sentiment-latency 0.0005]
+                                             [--sentiment-model NAME] [--requests 50]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRAPE_KEYWORDS = 'anxiety,depression,stress,therapy'
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    rank = max(1, int(round(pct / 100 * len(sorted_samples) + 0.5)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return None
+
+@contextmanager
+def stage(results, name):
+    """Time a stage; the body appends latency samples (seconds) and sets the item count"""
+    record = {'samples': [], 'items': 0}
+    start = time.perf_counter()
+    yield record
+    wall = time.perf_counter() - start
+    samples = sorted(record['samples'])
+    ms = lambda value: None if value is None else round(value * 1000, 3)
+    results[name] = {
+        'wall_seconds': round(wall, 4),
+        'items': record['items'],
+        'items_per_second': round(record['items'] / wall, 2) if wall else None,
+        'p50_ms': ms(percentile(samples, 50)),
+        'p95_ms': ms(percentile(samples, 95)),
+        'p99_ms': ms(percentile(samples, 99)),
+        'max_ms': ms(samples[-1] if samples else None),
+        'rss_mb': round(current_rss_mb() or 0, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def timed(func, samples):
+    """Wrap func so each call's duration is appended to samples"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+def run_size(size, args):
+    """Run every stage for one corpus size (runs in a subprocess) and return the results"""
+    from benchmarks.fakes import FakeReddit, StubGeminiServer, StubSentimentPipeline, make_posts
+
+    workdir = tempfile.mkdtemp(prefix='bench-e2e-')
+    server = StubGeminiServer(latency=args.gemini_latency, jitter=args.gemini_jitter,
+                              error_rate=args.gemini_error_rate, drop_rate=args.gemini_drop_rate,
+                              chunk_latency=args.gemini_chunk_latency).start()
+    os.environ.update({
+        'REDDIT_CLIENT_ID': 'benchmark', 'REDDIT_CLIENT_SECRET': 'benchmark', 'REDDIT_USER_AGENT': 'benchmark',
+        'REDDIT_LISTINGS': 'hot', 'GEMINI_API_KEY': 'benchmark', 'GEMINI_API_URL': server.url, 'GEMINI_RPS': '0',
+        'GEMINI_BATCH_SIZE': str(args.gemini_batch_size),
+        'RESULTS_DB_PATH': os.path.join(workdir, 'results.db'),
+        'ANALYSIS_CACHE_PATH': os.path.join(workdir, 'analysis_cache.db'),
+        'PRELOAD_MODEL': '0', 'WARM_UP_MODEL': '0',
+    })
+    os.chdir(workdir)
+    logging.disable(logging.CRITICAL)
+    sys.path.insert(0, REPO_ROOT)
+
+    try:
+        import app as webapp
+        from scraper.model_manager import ModelManager
+        from scraper.sentiment_analyzer import SentimentAnalyzer
+        from scraper.text_classifier import filter_mod_posts
+
+        if args.sentiment_model:
+            webapp.sentiment_analyzer = SentimentAnalyzer(args.sentiment_model, cache=webapp.analysis_cache)
+        else:
+            stub = StubSentimentPipeline(args.sentiment_latency)
+            webapp.sentiment_analyzer.model = ModelManager('stub sentiment model', lambda: stub)
+        webapp.sentiment_analyzer.load()
+
+        subreddits = webapp.reddit_scraper.subreddits
+        per_subreddit = size * 5 // (4 * len(subreddits)) + 1
+        keywords = SCRAPE_KEYWORDS.split(',')
+        client = webapp.app.test_client()
+        results = {}
+
+        webapp.reddit_scraper.reddit = FakeReddit(per_subreddit, seed=f"crawl{size}-", page_latency=args.reddit_latency)
+        with stage(results, 'crawl') as record:
+            posts = []
+            last = time.perf_counter()
+            for post in webapp.reddit_scraper.iter_mentalhealth(keywords, limit=size):
+                now = time.perf_counter()
+                record['samples'].append(now - last)
+                last = now
+                posts.append(post)
+            record['items'] = len(posts)
+
+        corpus = make_posts(size, seed=f"filter{size}-")
+        with stage(results, 'filter_mod_posts') as record:
+            kept = []
+            filter_one = timed(filter_mod_posts, record['samples'])
+            for post in corpus:
+                kept.extend(filter_one([post]))
+            record['items'] = len(corpus)
+
+        with stage(results, 'sentiment') as record:
+            analyze = timed(webapp.sentiment_analyzer.analyze_batch, record['samples'])
+            sentiments = []
+            for start in range(0, len(posts), 16):
+                sentiments.extend(analyze([post['content'] for post in posts[start:start + 16]]))
+            record['items'] = len(posts)
+
+        with stage(results, 'insight') as record:
+            generate = timed(webapp.gemini_analyzer.generate_insight_batch, record['samples'])
+            batch_size = webapp.gemini_analyzer.batch_size
+            groups = [[post['content'] for post in posts[start:start + batch_size]]
+                      for start in range(0, len(posts), batch_size)]
+            with ThreadPoolExecutor(max_workers=webapp.gemini_analyzer.max_workers) as executor:
+                insights = [insight for group in executor.map(generate, groups) for insight in group]
+            record['items'] = len(posts)
+
+        with stage(results, 'store') as record:
+            upsert = timed(webapp.result_store.upsert_posts, record['samples'])
+            post_ids = []
+            for post, sentiment, insight in zip(posts, sentiments, insights):
+                post_ids.extend(upsert([{**post, 'sentiment': sentiment['label'],
+                                         'sentiment_score': sentiment['score'], 'insight': insight}]))
+            webapp.result_store.record_query(f"benchmark-{size}", keywords, size, post_ids)
+            record['items'] = len(post_ids)
+
+        webapp.reddit_scraper.reddit = FakeReddit(per_subreddit, seed=f"stream{size}-", page_latency=args.reddit_latency)
+        payload = {'keywords': SCRAPE_KEYWORDS, 'limit': size}
+        with stage(results, 'scrape_stream') as record:
+            start = time.perf_counter()
+            response = client.post('/scrape/stream', json=payload, buffered=False)
+            buffer = b''
+            for chunk in response.response:
+                buffer += chunk if isinstance(chunk, bytes) else chunk.encode()
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    if line and json.loads(line)['type'] == 'post':
+                        record['samples'].append(time.perf_counter() - start)
+                        record['items'] += 1
+            response.close()
+
+        with stage(results, 'scrape_cached') as record:
+            for _ in range(args.requests):
+                request_start = time.perf_counter()
+                client.post('/scrape', json=payload)
+                record['samples'].append(time.perf_counter() - request_start)
+            record['items'] = args.requests
+
+        with stage(results, 'dashboard') as record:
+            for i in range(args.requests):
+                request_start = time.perf_counter()
+                client.get('/dashboard?days=7' if i % 2 else '/dashboard')
+                record['samples'].append(time.perf_counter() - request_start)
+            record['items'] = args.requests
+
+        with stage(results, 'api_posts') as record:
+            cursor = ''
+            for _ in range(args.requests):
+                request_start = time.perf_counter()
+                page = client.get(f"/api/posts?size=50&sort=-date&cursor={cursor}").get_json()
+                record['samples'].append(time.perf_counter() - request_start)
+                record['items'] += 1
+                cursor = page.get('next_cursor')
+                if not cursor:
+                    break
+
+        with stage(results, 'api_stats') as record:
+            for _ in range(args.requests):
+                request_start = time.perf_counter()
+                client.get('/api/stats?days=30')
+                record['samples'].append(time.perf_counter() - request_start)
+            record['items'] = args.requests
+
+        with stage(results, 'analyze') as record:
+            for post in make_posts(args.requests, seed=f"analyze{size}-", mod_ratio=0):
+                request_start = time.perf_counter()
+                client.post('/analyze', json={'text': post['content']})
+                record['samples'].append(time.perf_counter() - request_start)
+            record['items'] = args.requests
+
+        with stage(results, 'analyze_stream') as record:
+            for post in make_posts(args.requests, seed=f"analyze_stream{size}-", mod_ratio=0):
+                request_start = time.perf_counter()
+                response = client.post('/analyze/stream', json={'text': post['content']}, buffered=False)
+                for chunk in response.response:
+                    if (chunk if isinstance(chunk, str) else chunk.decode()).startswith('event: insight'):
+                        record['samples'].append(time.perf_counter() - request_start)
+                        break
+                response.close()
+            record['items'] = args.requests
+
+        return {
+            'size': size,
+            'stages': results,
+            'gemini_stub': server.stats(),
+            'analysis_cache': webapp.analysis_cache.stats(),
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(report):
+    print(f"{'size':>7} {'stage':<17} {'wall s':>8} {'items/s':>10} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'peak MB':>8}")
+    fmt = lambda value, spec: format(value, spec) if value is not None else '-'.rjust(len(format(0, spec)))
+    for result in report['results']:
+        for name, stats in result['stages'].items():
+            print(f"{result['size']:>7} {name:<17} {stats['wall_seconds']:8.3f} "
+                  f"{fmt(stats['items_per_second'], '10.1f')} {fmt(stats['p50_ms'], '9.2f')} "
+                  f"{fmt(stats['p95_ms'], '9.2f')} {fmt(stats['p99_ms'], '9.2f')} {stats['peak_rss_mb']:8.0f}")
+
+def compare(report, baseline_path, max_regression):
+    """Print throughput and p95 changes against an earlier report; True if any exceeds max_regression"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(r['size'], name): stats for r in baseline['results'] for name, stats in r['stages'].items()}
+    print(f"\nCompared with {baseline['meta'].get('commit') or baseline_path}:")
+    print(f"{'size':>7} {'stage':<17} {'items/s':>9} {'p95':>9}")
+    regressed = False
+    for result in report['results']:
+        for name, stats in result['stages'].items():
+            old = previous.get((result['size'], name))
+            if not old:
+                continue
+            throughput = (stats['items_per_second'] / old['items_per_second'] - 1
+                          if stats['items_per_second'] and old['items_per_second'] else None)
+            p95 = stats['p95_ms'] / old['p95_ms'] - 1 if stats['p95_ms'] and old['p95_ms'] else None
+            if max_regression is not None and (
+                    (throughput is not None and throughput < -max_regression) or
+                    (p95 is not None and p95 > max_regression)):
+                regressed = True
+            print(f"{result['size']:>7} {name:<17} "
+                  f"{format(throughput, '+9.1%') if throughput is not None else '-':>9} "
+                  f"{format(p95, '+9.1%') if p95 is not None else '-':>9}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,100,1000', help='Comma-separated corpus sizes (10 to 100000)')
+    parser.add_argument('--output', help='JSON report path (default benchmarks/results/end_to_end-<time>-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier JSON report to compare against')
+    parser.add_argument('--max-regression', type=float,
+                        help='With --compare, exit 1 if throughput drops or p95 grows by more than this ratio')
+    parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint stage')
+    parser.add_argument('--gemini-latency', type=float, default=0.02)
+    parser.add_argument('--gemini-jitter', type=float, default=0.5)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--gemini-batch-size', type=int, default=4, help='Posts per Gemini request')
+    parser.add_argument('--gemini-drop-rate', type=float, default=0.0,
+                        help='Share of posts the stub leaves out of multi-post answers')
+    parser.add_argument('--gemini-chunk-latency', type=float, default=0.0,
+                        help='Stub generation time per further chunk of a single-post answer')
+    parser.add_argument('--reddit-latency', type=float, default=0.0, help='Seconds per 100-post listing page')
+    parser.add_argument('--sentiment-latency', type=float, default=0.0005, help='Stub model seconds per text')
+    parser.add_argument('--sentiment-model', help='Use a real HuggingFace model instead of the stub')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_size(args.worker, args)))
+        return 0
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_end_to_end', '--worker', str(size)] + sys.argv[1:],
+            capture_output=True, text=True, cwd=REPO_ROOT
+        )
+        if proc.returncode != 0:
+            print(f"size {size} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'unknown error'}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': {key: value for key, value in vars(args).items() if key not in ('worker', 'output', 'compare')},
+        },
+        'results': results,
+    }
+
+    output = args.output or os.path.join(
+        REPO_ROOT, 'benchmarks', 'results',
+        f"end_to_end-{datetime.now():%Y%m%d-%H%M%S}{'-' + commit if commit else ''}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_table(report)
+    print(f"\nWrote {output}")
+
+    if args.compare and compare(report, args.compare, args.max_regression):
+        print(f"Regression above {args.max_regression:.0%} in at least one stage")
+        return 1
+    return 0 if results else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Gemini client behaviour under injected faults: circuit breaker during an outage, AIMD concurrency under throttling
+
+Outage: StubGeminiServer answers slower than the client timeout, so every request times out.
+Without the breaker each post waits out the timeout (and retries); with it the circuit opens after a
+few failures and the rest of the posts get their fallback immediately. The stub then recovers and,
+after the reset timeout, a half-open trial closes the circuit again.
+
+Throttling: the stub answers 429 to requests beyond --server-concurrency in flight. With a fixed
+pool of --workers threads most attempts are throttled and retried; the adaptive limit backs off
+to what the server accepts.
+
+Usage: python -m benchmarks.bench_gemini_resilience [--posts 30] [--timeout 0.5] [--reset-seconds 1]
+                                                    [--workers 8] [--server-concurrency 2] [--latency 0.05]
+"""
+import os
+import time
+import argparse
+import logging
+from benchmarks.fakes import StubGeminiServer, make_posts
+from scraper.circuit_breaker import circuit_breaker_transitions_total
+from scraper.gemini_analyzer import GeminiAnalyzer, gemini_retries_total
+from scraper.insights import FALLBACK_PREFIX
+
+def make_analyzer(url: str, workers: int, timeout: float, **kwargs) -> GeminiAnalyzer:
+    analyzer = GeminiAnalyzer(base_url=url, max_workers=workers, requests_per_second=0, timeout=timeout,
+                              backoff_base=0.05, **kwargs)
+    analyzer.api_key = 'benchmark'
+    return analyzer
+
+def run(analyzer: GeminiAnalyzer, texts):
+    start = time.perf_counter()
+    insights = analyzer.generate_insights(texts)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(insight.startswith(FALLBACK_PREFIX) for insight in insights)
+
+def outage(args, texts):
+    print(f"Outage: stub answers in {args.timeout * 4:g}s, client timeout {args.timeout:g}s, {len(texts)} posts")
+    server = StubGeminiServer(latency=args.timeout * 4, jitter=0).start()
+    try:
+        for label, failures in (('without breaker', 0), ('with breaker', args.breaker_failures)):
+            analyzer = make_analyzer(server.url, 4, args.timeout, breaker_failures=failures,
+                                     breaker_reset_seconds=args.reset_seconds)
+            before = server.stats()['requests']
+            elapsed, fallbacks = run(analyzer, texts)
+            print(f"  {label:<16} {elapsed:7.2f}s  {fallbacks:>3} fallbacks  "
+                  f"{server.stats()['requests'] - before:>3} requests reached the API")
+
+        # Recovery: the next request after the reset timeout is a half-open trial
+        server.latency = args.latency
+        time.sleep(args.reset_seconds)
+        elapsed, fallbacks = run(analyzer, texts)
+        print(f"  {'after recovery':<16} {elapsed:7.2f}s  {fallbacks:>3} fallbacks  "
+              f"circuit {analyzer.circuit_breaker.state}, transitions: "
+              + ", ".join(f"{state} {int(circuit_breaker_transitions_total.value(name='gemini', state=state))}"
+                          for state in ('open', 'half_open', 'closed')))
+    finally:
+        server.stop()
+
+def throttling(args, texts):
+    print(f"\nThrottling: stub accepts {args.server_concurrency} concurrent requests, client runs {args.workers} workers")
+    server = StubGeminiServer(latency=args.latency, max_concurrency=args.server_concurrency).start()
+    try:
+        for label, adaptive in (('fixed', False), ('adaptive', True)):
+            analyzer = make_analyzer(server.url, args.workers, args.timeout * 10, adaptive_concurrency=adaptive,
+                                     max_retries=5)
+            before = dict(server.stats(), retries=gemini_retries_total.value())
+            elapsed, fallbacks = run(analyzer, texts)
+            after = dict(server.stats(), retries=gemini_retries_total.value())
+            limit = f", final limit {int(analyzer.concurrency.limit)}" if analyzer.concurrency else ""
+            print(f"  {label:<16} {elapsed:7.2f}s  {fallbacks:>3} fallbacks  "
+                  f"{after['throttled'] - before['throttled']:>3} x 429  "
+                  f"{int(after['retries'] - before['retries']):>3} retries{limit}")
+    finally:
+        server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=30)
+    parser.add_argument('--timeout', type=float, default=0.5, help='Client timeout in seconds')
+    parser.add_argument('--breaker-failures', type=int, default=5)
+    parser.add_argument('--reset-seconds', type=float, default=1, help='Circuit breaker reset timeout')
+    parser.add_argument('--workers', type=int, default=8, help='Client max_workers in the throttling run')
+    parser.add_argument('--server-concurrency', type=int, default=2, help='Stub requests in flight before 429s')
+    parser.add_argument('--latency', type=float, default=0.05, help='Healthy stub latency in seconds')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING if os.getenv('BENCH_VERBOSE') else logging.CRITICAL)
+    texts = [post['content'] for post in make_posts(args.posts, mod_ratio=0)]
+    outage(args, texts)
+    throttling(args, texts)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Overhead of near-duplicate detection against the sentiment and Gemini calls it saves
+
+Builds a synthetic corpus in which a share of posts are reposts/cross-posts of others with a few
+words edited, runs scraper.pipeline.analyze_stream over it with and without the detector (counting
+model and Gemini calls with instant stubs), checks the detector's matches against the known repost
+groups, and prices the saved calls at the given per-call latencies.
+
+Usage: python -m benchmarks.bench_near_duplicates [--posts 5000] [--duplicate-ratio 0.2] [--edits 3] [--threshold 0.7]
+                                                  [--sentiment-ms 20] [--gemini-ms 1500] [--gemini-batch-size 4]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from benchmarks.fakes import WORDS, make_posts
+from scraper.near_duplicates import NearDuplicateDetector
+from scraper.pipeline import analyze_stream
+from scraper.storage import ResultStore
+
+class CountingSentiment:
+    def __init__(self):
+        self.texts = 0
+
+    def analyze_batch(self, texts):
+        self.texts += len(texts)
+        return [{'label': 'POSITIVE', 'score': 0.9} for _ in texts]
+
+class CountingGemini:
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.max_workers = 4
+        self.requests = 0
+        self.posts = 0
+
+    def generate_insight_batch(self, texts):
+        self.requests += 1
+        self.posts += len(texts)
+        return [f"Insight {len(text)}" for text in texts]
+
+def make_corpus(num_posts: int, duplicate_ratio: float, edits: int, seed: int = 7):
+    """
+    Posts where `duplicate_ratio` of them are edited copies of another post
+    :return: (posts in arrival order, {url: group id})
+    """
+    rng = random.Random(seed)
+    num_originals = max(1, int(num_posts * (1 - duplicate_ratio)))
+    posts = make_posts(num_originals, seed=seed, mod_ratio=0)
+    groups = {post['url']: i for i, post in enumerate(posts)}
+    for i in range(num_posts - num_originals):
+        original = rng.choice(posts[:num_originals])
+        words = original['content'].split()
+        for _ in range(edits):
+            position = rng.randrange(len(words))
+            operation = rng.randrange(3)
+            if operation == 0:
+                words[position] = rng.choice(WORDS)
+            elif operation == 1 and len(words) > 1:
+                del words[position]
+            else:
+                words.insert(position, rng.choice(WORDS))
+        repost = {**original, 'content': ' '.join(words), 'subreddit': rng.choice(['depression', 'anxiety']),
+                  'url': f"https://reddit.com/r/repost/comments/{i}/"}
+        groups[repost['url']] = groups[original['url']]
+        posts.append(repost)
+    rng.shuffle(posts)
+    return posts, groups
+
+def run(posts, gemini_batch_size, detector=None):
+    sentiment, gemini = CountingSentiment(), CountingGemini(gemini_batch_size)
+    start = time.perf_counter()
+    analyzed = list(analyze_stream(posts, sentiment, gemini, batch_size=16, near_duplicates=detector))
+    return analyzed, sentiment, gemini, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.2, help='Share of posts that are edited copies')
+    parser.add_argument('--edits', type=int, default=3, help='Words replaced, deleted or inserted per copy')
+    parser.add_argument('--threshold', type=float, default=0.7, help='Near-duplicate similarity threshold')
+    parser.add_argument('--sentiment-ms', type=float, default=20, help='Model time per text (CPU distilbert)')
+    parser.add_argument('--gemini-ms', type=float, default=1500, help='Latency per Gemini request')
+    parser.add_argument('--gemini-batch-size', type=int, default=4)
+    args = parser.parse_args()
+
+    posts, groups = make_corpus(args.posts, args.duplicate_ratio, args.edits)
+    true_duplicates = len(posts) - len(set(groups.values()))
+    print(f"{len(posts)} posts, {true_duplicates} reposts with {args.edits} edited words\n")
+
+    _, base_sentiment, base_gemini, base_seconds = run(posts, args.gemini_batch_size)
+    detector = NearDuplicateDetector(threshold=args.threshold)
+    analyzed, sentiment, gemini, seconds = run(posts, args.gemini_batch_size, detector)
+
+    flagged = [post for post in analyzed if post.get('duplicate_of')]
+    correct = sum(groups[post['url']] == groups[post['duplicate_of']] for post in flagged)
+    overhead = seconds - base_seconds
+    saved_texts = base_sentiment.texts - sentiment.texts
+    saved_requests = base_gemini.requests - gemini.requests
+    saved_seconds = saved_texts * args.sentiment_ms / 1000 + saved_requests * args.gemini_ms / 1000
+
+    print(f"{'':<20}{'sentiment texts':>16}{'gemini posts':>14}{'gemini requests':>17}{'pipeline time':>15}")
+    for label, (texts, posts_sent, requests, elapsed) in (
+            ('without detector', (base_sentiment.texts, base_gemini.posts, base_gemini.requests, base_seconds)),
+            ('with detector', (sentiment.texts, gemini.posts, gemini.requests, seconds))):
+        print(f"{label:<20}{texts:>16}{posts_sent:>14}{requests:>17}{elapsed:>14.3f}s")
+    print()
+    print(f"flagged {len(flagged)}: precision {correct / max(len(flagged), 1):.3f}, "
+          f"recall {correct / max(true_duplicates, 1):.3f}")
+    print(f"detector overhead {overhead * 1000:.1f} ms total, {overhead / len(posts) * 1e6:.1f} us/post")
+    print(f"saved {saved_texts} sentiment texts and {saved_requests} Gemini requests "
+          f"~ {saved_seconds:.1f}s at {args.sentiment_ms:g} ms/text and {args.gemini_ms:g} ms/request "
+          f"({saved_seconds / max(overhead, 1e-9):.0f}x the overhead)")
+
+    # Reposts arriving in a later scrape are matched against stored canonical posts instead
+    with tempfile.TemporaryDirectory() as workdir:
+        store = ResultStore(os.path.join(workdir, 'results.db'))
+        half = len(posts) // 2
+        first, _, _, _ = run(posts[:half], args.gemini_batch_size, NearDuplicateDetector(store, threshold=args.threshold))
+        store.upsert_posts(first)
+        later, _, _, store_seconds = run(posts[half:], args.gemini_batch_size,
+                                         NearDuplicateDetector(store, threshold=args.threshold))
+        _, _, _, plain_seconds = run(posts[half:], args.gemini_batch_size)
+        first_urls = {post['url'] for post in first}
+        from_store = sum(post.get('duplicate_of') in first_urls for post in later)
+        print(f"\nsecond scrape against {len(first)} stored posts: {from_store} matched stored canonical posts, "
+              f"{(store_seconds - plain_seconds) / (len(posts) - half) * 1e6:.1f} us/post")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Parity check and throughput benchmark for the SentimentAnalyzer backends
+
+Each backend runs in its own subprocess so load time and peak RSS are measured in isolation.
+Label agreement with the full-precision pytorch backend is checked on a fixed corpus; the
+script exits non-zero when a backend falls below --min-agreement.
+
+Usage: python -m benchmarks.bench_sentiment_backends [--backends pytorch,quantized,onnx] [--model NAME]
+                                                      [--repeat 10] [--batch-size 16]
+                                                      [--min-agreement 0.95]
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+CORPUS = [
+    "I finally talked to my therapist about the panic attacks and it went better than I expected.",
+    "Nothing helps anymore. I wake up exhausted and go to bed feeling worse.",
+    "Three months sober today and I'm proud of myself for the first time in years.",
+    "My anxiety is through the roof before every shift and I can't keep doing this.",
+    "The support group last night made me feel less alone.",
+    "I don't know why I bother trying, everyone leaves eventually.",
+    "Started journaling and going for walks, small steps but they help.",
+    "My medication got changed and the side effects are making everything harder.",
+    "Had a good day for once. Went outside, saw friends, laughed.",
+    "I keep replaying the trauma every night and I can't sleep.",
+    "Grateful for the people here who answered my post last week.",
+    "The waiting list for counseling is six months and I'm running out of patience.",
+    "I think I'm finally starting to heal after the breakup.",
+    "Work stress is crushing me and my family doesn't understand.",
+    "Today I asked for help instead of hiding. That's progress.",
+    "I feel numb all the time and I'm scared of how little I care.",
+    "My new psychiatrist actually listens, which is a huge relief.",
+    "Every morning starts with dread and a racing heart.",
+    "Coping skills from DBT are finally clicking for me.",
+    "I lost my job and my motivation at the same time.",
+    "Meditation has been surprisingly helpful with my racing thoughts.",
+    "I cancelled plans again because I couldn't face anyone.",
+    "My sister drove four hours to sit with me when I was in crisis. I love her.",
+    "The diagnosis explains so much but I'm angry it took ten years.",
+    "Slept eight hours for the first time in months!",
+    "I'm tired of pretending I'm fine at school.",
+    "Recovery isn't linear but this week was a good one.",
+    "Grief hits me out of nowhere in the grocery store.",
+    "I appreciate this community more than I can say.",
+    "Therapy feels pointless when I can't afford to go more than once a month.",
+    "Exercise and sunlight are doing more than I thought they would.",
+    "I snapped at my partner again and I hate who I've become.",
+]
+
+def run_backend(backend, model, repeat, batch_size):
+    """Load one backend, label the corpus and time batched inference (runs in a subprocess)"""
+    from scraper.sentiment_analyzer import SentimentAnalyzer
+
+    start = time.perf_counter()
+    kwargs = {'model_name': model} if model else {}
+    analyzer = SentimentAnalyzer(backend=backend, lazy=False, **kwargs)
+    load_seconds = time.perf_counter() - start
+
+    labels = [result['label'] for result in analyzer.analyze_batch(CORPUS, batch_size=batch_size)]
+
+    texts = CORPUS * repeat
+    start = time.perf_counter()
+    analyzer.analyze_batch(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'texts': len(texts),
+        'seconds': elapsed,
+        'texts_per_second': len(texts) / elapsed,
+        'ms_per_text': 1000 * elapsed / len(texts),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'labels': labels,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='pytorch,quantized,onnx')
+    parser.add_argument('--model', help="HuggingFace model name or local path (defaults to the app's model)")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--min-agreement', type=float, default=0.95)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.model, args.repeat, args.batch_size)))
+        return 0
+
+    backends = args.backends.split(',')
+    if 'pytorch' not in backends:
+        backends.insert(0, 'pytorch')
+
+    results = {}
+    for backend in backends:
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_sentiment_backends', '--worker', backend,
+             '--repeat', str(args.repeat), '--batch-size', str(args.batch_size)]
+            + (['--model', args.model] if args.model else []),
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{backend:<10} failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'unknown error'}")
+            continue
+        results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    if 'pytorch' not in results:
+        print("Reference pytorch backend failed; cannot check parity")
+        return 1
+
+    reference = results['pytorch']['labels']
+    failed = False
+    print(f"{'backend':<10} {'load s':>8} {'texts/s':>9} {'ms/text':>8} {'peak MB':>8} {'agreement':>10}")
+    for backend, result in results.items():
+        agreement = sum(a == b for a, b in zip(reference, result['labels'])) / len(reference)
+        failed |= agreement < args.min_agreement
+        print(f"{backend:<10} {result['load_seconds']:8.1f} {result['texts_per_second']:9.1f} "
+              f"{result['ms_per_text']:8.2f} {result['peak_rss_mb']:8.0f} {agreement:10.1%}")
+
+    if failed:
+        print(f"Label agreement below {args.min_agreement:.0%} for at least one backend")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
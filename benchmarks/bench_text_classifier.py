@@ -0,0 +1,104 @@
+"""
+Compare the original mod filter / keyword extraction loops with scraper.text_classifier
+
+Usage: python -m benchmarks.bench_text_classifier [num_posts]
+"""
+import sys
+import time
+import random
+from collections import Counter
+from scraper.text_classifier import (
+    MENTAL_HEALTH_TERMS, MOD_KEYWORDS, TermMatcher, filter_mod_posts, mental_health_matcher
+)
+
+WORDS = (
+    "i feel so tired today and nothing helps my anxiety keeps getting worse at night "
+    "work is hard family does not understand therapy session was okay stress panic "
+    "support group recovery grief trauma coping medication"
+).split()
+MOD_WORDS = ['update', 'rules', 'welcome', 'moderator', 'announcement']
+
+def make_corpus(num_posts, seed=42, mod_ratio=0.05):
+    """Synthetic posts; roughly `mod_ratio` of them contain a moderator keyword"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(num_posts):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(20, 300))]
+        if rng.random() < mod_ratio:
+            words.insert(rng.randrange(len(words)), rng.choice(MOD_WORDS))
+        corpus.append({
+            'title': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))),
+            'content': ' '.join(words),
+            'upvotes': rng.randint(0, 200),
+            'comments': rng.randint(0, 50),
+        })
+    return corpus
+
+def legacy_filter_mod_posts(posts):
+    """filter_mod_posts as it was implemented in app.py"""
+    filtered = []
+    for post in posts:
+        if post.get('is_moderator', False):
+            continue
+        title = post.get('title', '').lower()
+        content = post.get('content', '').lower()
+        if title.startswith(('[mod]', '[meta]', '[announcement]')):
+            continue
+        combined = f"{title}\n{content}"
+        if any(keyword in combined for keyword in MOD_KEYWORDS):
+            continue
+        upvotes = post.get('upvotes', 0)
+        comments = post.get('comments', 1)
+        if upvotes > 100 and comments < 3:
+            continue
+        filtered.append(post)
+    return filtered
+
+def legacy_extract_keywords(posts, top_n=5):
+    """extract_keywords as it was implemented in app.py"""
+    keyword_counts = Counter()
+    for post in posts:
+        content = (post.get('title', '') + ' ' + post.get('content', '')).lower()
+        for term in MENTAL_HEALTH_TERMS:
+            if term in content:
+                keyword_counts[term] += 1
+    return dict(keyword_counts.most_common(top_n))
+
+def extract_keywords(posts, matcher, top_n=5):
+    keyword_counts = Counter()
+    for post in posts:
+        keyword_counts.update(matcher.matching_terms(post.get('title', '') + ' ' + post.get('content', '')))
+    return dict(keyword_counts.most_common(top_n))
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    print(f"{label:<45} {time.perf_counter() - start:8.3f}s")
+    return result
+
+def main():
+    num_posts = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    corpus = make_corpus(num_posts)
+    print(f"{num_posts} synthetic posts\n")
+
+    expected = timed("legacy filter_mod_posts", lambda: legacy_filter_mod_posts(corpus))
+    regex_matcher = TermMatcher(MOD_KEYWORDS, strategy='regex')
+    regex_filtered = timed("regex alternation mod filter", lambda: [
+        post for post in corpus
+        if not regex_matcher.matches_any(f"{post['title']}\n{post['content']}")
+        and not (post['upvotes'] > 100 and post['comments'] < 3)
+    ])
+    fresh = [dict(post) for post in corpus]
+    first = timed("filter_mod_posts (first pass, records verdict)", lambda: filter_mod_posts(fresh))
+    again = timed("filter_mod_posts (recorded verdict)", lambda: filter_mod_posts(fresh))
+    assert len(expected) == len(regex_filtered) == len(first) == len(again)
+
+    print()
+    expected = timed("legacy extract_keywords", lambda: legacy_extract_keywords(corpus))
+    regex_terms = TermMatcher(MENTAL_HEALTH_TERMS, strategy='regex')
+    via_regex = timed("extract_keywords (regex lookahead)", lambda: extract_keywords(corpus, regex_terms))
+    via_substring = timed("extract_keywords (substring)", lambda: extract_keywords(corpus, mental_health_matcher))
+    assert expected == via_regex == via_substring
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,340 @@
+"""
+Offline stand-ins for Reddit, Gemini and the sentiment model used by the benchmarks
+
+FakeReddit mimics the parts of praw.Reddit that RedditScraper touches, StubGeminiServer serves
+generateContent responses on localhost with configurable latency and failures, and
+StubSentimentPipeline replaces the transformers pipeline with a word-count classifier.
+"""
+import json
+import random
+import threading
+import time
+import types
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+WORDS = (
+    "i feel so tired today and nothing helps my anxiety keeps getting worse at night "
+    "work is hard family does not understand therapy session was okay stress panic "
+    "support group recovery grief trauma coping medication sleep friends walk journal "
+    "better hopeful proud alone scared numb exhausted grateful progress"
+).split()
+KEYWORDS = ['anxiety', 'depression', 'stress', 'therapy']
+MOD_WORDS = ['update', 'rules', 'welcome', 'moderator', 'announcement']
+POSITIVE_WORDS = {'better', 'hopeful', 'proud', 'grateful', 'progress', 'helps', 'okay', 'friends'}
+NEGATIVE_WORDS = {'tired', 'worse', 'hard', 'alone', 'scared', 'numb', 'exhausted', 'panic', 'grief'}
+
+def make_submissions(num_posts: int, subreddit: str, seed, mod_ratio: float = 0.05,
+                     days: int = 30) -> List[types.SimpleNamespace]:
+    """
+    Synthetic PRAW-like submissions for one subreddit
+    :param seed: Seed for the generator; different seeds give disjoint permalinks
+    :param mod_ratio: Share of posts that look like moderator posts (keyword, sticky or distinguished)
+    :param days: Posts are spread over this many days before now
+    """
+    rng = random.Random(f"{seed}-{subreddit}")
+    now = time.time()
+    submissions = []
+    for i in range(num_posts):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(20, 300))]
+        words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+        stickied = distinguished = False
+        if rng.random() < mod_ratio:
+            kind = rng.randrange(3)
+            if kind == 0:
+                title = f"{rng.choice(MOD_WORDS)} {title}"
+            stickied = kind == 1
+            distinguished = 'moderator' if kind == 2 else None
+        submissions.append(types.SimpleNamespace(
+            id=f"{seed}{subreddit}{i}",
+            title=title,
+            selftext=' '.join(words),
+            author=types.SimpleNamespace(name=f"user{rng.randrange(num_posts * 2 + 1)}"),
+            created_utc=now - rng.uniform(0, days * 86400),
+            permalink=f"/r/{subreddit}/comments/{seed}x{i}/",
+            score=rng.randint(0, 150),
+            num_comments=rng.randint(0, 60),
+            stickied=stickied,
+            distinguished=distinguished or None,
+            author_flair_text=None,
+            author_flair_css_class=None,
+        ))
+    return submissions
+
+def make_posts(num_posts: int, seed=42, mod_ratio: float = 0.05) -> List[Dict]:
+    """Synthetic posts in the dict format produced by RedditScraper"""
+    submissions = make_submissions(num_posts, 'benchmark', seed, mod_ratio=mod_ratio)
+    return [{
+        'source': 'reddit',
+        'subreddit': 'benchmark',
+        'title': s.title,
+        'content': f"{s.title}\n\n{s.selftext}",
+        'author': s.author.name,
+        'date': datetime.utcfromtimestamp(s.created_utc).isoformat(),
+        'url': f"https://reddit.com{s.permalink}",
+        'upvotes': s.score,
+        'comments': s.num_comments,
+        'is_moderator': bool(s.stickied or s.distinguished),
+    } for s in submissions]
+
+class FakeSubreddit:
+    def __init__(self, name: str, submissions: List, page_size: int = 100, page_latency: float = 0,
+                 client: 'FakeReddit' = None, max_listing: int = 1000):
+        """
+        :param max_listing: Submissions a listing serves at most, like Reddit's cap (limit=None reads up to it)
+        """
+        self.display_name = name
+        self.submissions = submissions
+        self.page_size = page_size
+        self.page_latency = page_latency
+        self.client = client
+        self.max_listing = max_listing
+
+    def moderator(self):
+        if self.client:
+            self.client.request()
+        return [types.SimpleNamespace(name='AutoModerator'), types.SimpleNamespace(name=f"{self.display_name}_mod")]
+
+    def _listing(self, submissions, limit):
+        if self.client:
+            self.client.listing_started()
+        try:
+            for i, submission in enumerate(submissions[:min(self.max_listing, limit or self.max_listing)]):
+                # PRAW fetches listings a page (100 items) at a time
+                if i % self.page_size == 0:
+                    if self.client:
+                        self.client.request()
+                    if self.page_latency:
+                        time.sleep(self.page_latency)
+                yield submission
+        finally:
+            if self.client:
+                self.client.listing_finished()
+
+    def hot(self, limit: int = 100):
+        return self._listing(self.submissions, limit)
+
+    def new(self, limit: int = 100):
+        return self._listing(sorted(self.submissions, key=lambda s: s.created_utc, reverse=True), limit)
+
+    def top(self, limit: int = 100):
+        return self._listing(sorted(self.submissions, key=lambda s: s.score, reverse=True), limit)
+
+class FakeReddit:
+    def __init__(self, posts_per_subreddit: int, seed=0, page_latency: float = 0, mod_ratio: float = 0.05,
+                 ratelimit_budget: int = 600, ratelimit_window: float = 600):
+        """
+        praw.Reddit replacement serving synthetic submissions for any subreddit name
+        :param posts_per_subreddit: Submissions available in each subreddit listing
+        :param page_latency: Seconds slept per 100-item listing page, like a PRAW round trip
+        :param ratelimit_budget: Requests (listing pages, moderator lookups) allowed per rate-limit window;
+                                 auth.limits reports what is left like prawcore does after each response
+        :param ratelimit_window: Seconds until the budget resets
+        """
+        self.posts_per_subreddit = posts_per_subreddit
+        self.seed = seed
+        self.page_latency = page_latency
+        self.mod_ratio = mod_ratio
+        self.ratelimit_budget = ratelimit_budget
+        self.ratelimit_window = ratelimit_window
+        self.auth = types.SimpleNamespace(limits={'remaining': ratelimit_budget, 'used': 0,
+                                                  'reset_timestamp': time.time() + ratelimit_window})
+        self.requests = 0
+        self.over_limit = 0
+        # Listings iterated at once on this client; PRAW clients must not be shared between threads
+        self.max_concurrent_listings = 0
+        self._listings = 0
+        self._subreddits = {}
+        self._lock = threading.Lock()
+
+    def subreddit(self, name: str) -> FakeSubreddit:
+        with self._lock:
+            if name not in self._subreddits:
+                submissions = make_submissions(self.posts_per_subreddit, name, self.seed, mod_ratio=self.mod_ratio)
+                self._subreddits[name] = FakeSubreddit(name, submissions, page_latency=self.page_latency, client=self)
+            return self._subreddits[name]
+
+    def add_submissions(self, name: str, count: int, seed) -> List:
+        """Publish `count` new submissions (newer than any existing one) to a subreddit"""
+        subreddit = self.subreddit(name)
+        submissions = make_submissions(count, name, seed, mod_ratio=0, days=0)
+        newest = max((s.created_utc for s in subreddit.submissions), default=0)
+        for offset, submission in enumerate(submissions, 1):
+            submission.created_utc = max(time.time(), newest) + offset
+        with self._lock:
+            subreddit.submissions = subreddit.submissions + submissions
+        return submissions
+
+    def request(self):
+        """Count one API request against the rate-limit window"""
+        with self._lock:
+            limits = self.auth.limits
+            now = time.time()
+            if now >= limits['reset_timestamp']:
+                limits.update(remaining=self.ratelimit_budget, used=0, reset_timestamp=now + self.ratelimit_window)
+            self.requests += 1
+            if limits['remaining'] <= 0:
+                self.over_limit += 1
+            limits['remaining'] = max(0, limits['remaining'] - 1)
+            limits['used'] += 1
+
+    def listing_started(self):
+        with self._lock:
+            self._listings += 1
+            self.max_concurrent_listings = max(self.max_concurrent_listings, self._listings)
+
+    def listing_finished(self):
+        with self._lock:
+            self._listings -= 1
+
+class StubSentimentPipeline:
+    """transformers sentiment pipeline replacement: labels by counting positive and negative words"""
+
+    def __init__(self, latency_per_text: float = 0.0):
+        self.latency_per_text = latency_per_text
+        self.tokenizer = lambda texts, truncation=True: {'input_ids': [text.split()[:512] for text in texts]}
+
+    def __call__(self, texts, **kwargs):
+        texts = [texts] if isinstance(texts, str) else texts
+        if self.latency_per_text:
+            time.sleep(self.latency_per_text * len(texts))
+        results = []
+        for text in texts:
+            words = text.lower().split()
+            balance = sum(word in POSITIVE_WORDS for word in words) - sum(word in NEGATIVE_WORDS for word in words)
+            results.append({'label': 'POSITIVE' if balance >= 0 else 'NEGATIVE',
+                            'score': min(0.99, 0.5 + abs(balance) / (len(words) or 1))})
+        return results
+
+class StubGeminiServer:
+    def __init__(self, latency: float = 0.05, jitter: float = 0.5, error_rate: float = 0.0,
+                 error_status: int = 503, drop_rate: float = 0.0, max_concurrency: int = 0,
+                 stream_chunks: int = 4, chunk_latency: float = 0.0, seed: int = 0):
+        """
+        Local HTTP server answering Gemini generateContent requests
+        :param latency: Mean response delay in seconds
+        :param jitter: Delay varies uniformly within latency * (1 +/- jitter)
+        :param error_rate: Share of requests answered with error_status instead of an insight
+        :param drop_rate: Share of posts left out of multi-post (responseSchema) answers
+        :param max_concurrency: Requests beyond this many in flight get an immediate 429 (0 = no limit)
+        :param stream_chunks: streamGenerateContent answers are split into this many server-sent events,
+                              the first after `latency` and the rest chunk_latency apart
+        :param chunk_latency: Generation time per further chunk; generateContent answers wait for all of them
+        Settings may be changed while the server runs, e.g. to simulate an outage and its recovery.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.drop_rate = drop_rate
+        self.max_concurrency = max_concurrency
+        self.stream_chunks = stream_chunks
+        self.chunk_latency = chunk_latency
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self._in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1beta/models/stub:generateContent"
+
+    def start(self) -> 'StubGeminiServer':
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; Nagle would delay the body ~40ms
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stream = ':streamGenerateContent' in self.path
+                status, payload = stub.respond(json.loads(body or b'{}'), stream)
+                if status == 200 and stream:
+                    return self.send_events(payload['candidates'][0]['content']['parts'][0]['text'])
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client timed out and hung up
+
+            def send_events(self, text):
+                words = text.split(' ')
+                size = -(-len(words) // max(1, stub.stream_chunks))
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/event-stream')
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for start in range(0, len(words), size):
+                        if start:
+                            time.sleep(stub.chunk_latency)
+                        chunk = ' '.join(words[start:start + size]) + (' ' if start + size < len(words) else '')
+                        event = {'candidates': [{'content': {'parts': [{'text': chunk}]}}]}
+                        data = f"data: {json.dumps(event)}\r\n\r\n".encode()
+                        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='stub-gemini', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def respond(self, request: Dict, stream: bool = False) -> Tuple[int, Dict]:
+        """
+        Status code and JSON body for one generateContent request
+        :param stream: Only wait for the first chunk; the handler spaces out the rest
+        """
+        with self._lock:
+            self.requests += 1
+            if self.max_concurrency and self._in_flight >= self.max_concurrency:
+                self.throttled += 1
+                return 429, {'error': {'code': 429, 'message': 'stub rate limit'}}
+            self._in_flight += 1
+            delay = self.latency * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+            if not stream:
+                delay += (self.stream_chunks - 1) * self.chunk_latency
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        try:
+            time.sleep(max(0.0, delay))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        if failed:
+            return self.error_status, {'error': {'code': self.error_status, 'message': 'stub failure'}}
+
+        prompt = request['contents'][0]['parts'][0]['text']
+        schema = request.get('generationConfig', {}).get('responseSchema')
+        if schema:
+            with self._lock:
+                post_ids = [post_id for post_id in schema['properties'] if self._rng.random() >= self.drop_rate]
+            text = json.dumps({post_id: f"Stub insight for {post_id}." for post_id in post_ids})
+        else:
+            text = f"Stub insight for a {len(prompt.split())}-word prompt."
+        return 200, {'candidates': [{'content': {'parts': [{'text': text}]}}]}
+
+    def stats(self) -> Dict:
+        return {'requests': self.requests, 'errors': self.errors, 'throttled': self.throttled}
@@ -0,0 +1,22 @@
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+# With PRELOAD_MODEL=1 the app (and the sentiment model weights) are loaded once in the
+# master process; workers forked from it share those pages copy-on-write.
+preload_app = os.getenv('PRELOAD_MODEL') == '1'
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach so that gc passes in the
+    # workers do not touch (and therefore copy) the shared pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    if preload_app:
+        # The weights are already in memory; run one inference in the worker to warm it up
+        from app import sentiment_analyzer
+        sentiment_analyzer.warm_up(background=True)
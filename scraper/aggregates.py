@@ -0,0 +1,124 @@
+import sqlite3
+from collections import Counter
+from typing import Dict, Optional, Set, Tuple
+from scraper.text_classifier import mental_health_matcher
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, dimension, value)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_counts_dimension ON daily_counts(dimension, day);
+"""
+
+UNKNOWN_DAY = 'unknown'
+
+def sentiment_bucket(label: Optional[str]) -> str:
+    """Map a sentiment label to its sentiment_counts key"""
+    if label == 'POSITIVE':
+        return 'positive'
+    if label == 'NEGATIVE':
+        return 'negative'
+    return 'neutral'
+
+class AggregateCounters:
+    """
+    Per-day sentiment, keyword and subreddit counters over stored posts
+
+    Counters are adjusted in the same transaction as each post write, so reading
+    them never rescans post text.
+    """
+
+    def create_schema(self, conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+
+    @staticmethod
+    def contributions(post: Optional[Dict]) -> Set[Tuple[str, str, str]]:
+        """(day, dimension, value) counters a stored post adds one to"""
+        if not post or post.get('mod_flagged'):
+            return set()
+        day = (post.get('date') or '')[:10] or UNKNOWN_DAY
+        keys = {
+            (day, 'posts', 'all'),
+            (day, 'sentiment', sentiment_bucket(post.get('sentiment'))),
+        }
+        if post.get('subreddit'):
+            keys.add((day, 'subreddit', post['subreddit']))
+        text = f"{post.get('title') or ''} {post.get('content') or ''}"
+        keys.update((day, 'keyword', term) for term in mental_health_matcher.matching_terms(text))
+        return keys
+
+    def apply(self, conn: sqlite3.Connection, old_post: Optional[Dict], new_post: Optional[Dict]):
+        """Move counters from a post's previous stored version to its new one"""
+        old_keys = self.contributions(old_post)
+        new_keys = self.contributions(new_post)
+        deltas = [(key, -1) for key in old_keys - new_keys] + [(key, 1) for key in new_keys - old_keys]
+        for (day, dimension, value), delta in deltas:
+            conn.execute(
+                "INSERT INTO daily_counts (day, dimension, value, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(day, dimension, value) DO UPDATE SET count = count + excluded.count",
+                (day, dimension, value, delta)
+            )
+
+    def rebuild(self, conn: sqlite3.Connection, posts):
+        """Recompute every counter from an iterable of stored posts"""
+        totals = Counter()
+        for post in posts:
+            totals.update(self.contributions(post))
+        conn.execute("DELETE FROM daily_counts")
+        conn.executemany(
+            "INSERT INTO daily_counts (day, dimension, value, count) VALUES (?, ?, ?, ?)",
+            [(day, dimension, value, count) for (day, dimension, value), count in totals.items()]
+        )
+
+    def summary(self, conn: sqlite3.Connection, since: Optional[str] = None, until: Optional[str] = None,
+                top_keywords: int = 5) -> Dict:
+        """
+        Counter totals over a day window
+        :param since: First day included (YYYY-MM-DD), or None for no lower bound
+        :param until: Last day included (YYYY-MM-DD), or None for no upper bound
+        """
+        conditions = ["count != 0"]
+        params = []
+        if since:
+            conditions.append("day >= ? AND day != ?")
+            params.extend([since, UNKNOWN_DAY])
+        if until:
+            conditions.append("day <= ?")
+            params.append(until)
+        rows = conn.execute(
+            f"SELECT dimension, value, SUM(count) FROM daily_counts WHERE {' AND '.join(conditions)} "
+            f"GROUP BY dimension, value", params
+        ).fetchall()
+
+        totals = {'posts': Counter(), 'sentiment': Counter(), 'subreddit': Counter(), 'keyword': Counter()}
+        for dimension, value, count in rows:
+            totals.setdefault(dimension, Counter())[value] = count
+
+        return {
+            'total': totals['posts']['all'],
+            'sentiment_counts': {
+                bucket: totals['sentiment'][bucket] for bucket in ('positive', 'negative', 'neutral')
+            },
+            'keywords': dict(totals['keyword'].most_common(top_keywords)),
+            'subreddits': dict(totals['subreddit'].most_common()),
+        }
+
+    def daily(self, conn: sqlite3.Connection, dimension: str, since: Optional[str] = None) -> Dict[str, Dict]:
+        """Per-day counts for one dimension, e.g. daily('sentiment')"""
+        params = [dimension]
+        condition = ""
+        if since:
+            condition = "AND day >= ?"
+            params.append(since)
+        rows = conn.execute(
+            f"SELECT day, value, count FROM daily_counts WHERE dimension = ? AND day != '{UNKNOWN_DAY}' "
+            f"AND count != 0 {condition} ORDER BY day", params
+        ).fetchall()
+        result = {}
+        for day, value, count in rows:
+            result.setdefault(day, {})[value] = count
+        return result
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from scraper.metrics import registry, json_io_seconds
+
+analysis_cache_lookups_total = registry.counter(
+    'analysis_cache_lookups_total', 'Analysis cache lookups by result', ['result']
+)
+
+class AnalysisCache:
+    def __init__(self, path: Optional[str] = "data/analysis_cache.db", max_memory_entries: int = 2048,
+                 max_disk_entries: int = 100000, ttl: float = 30 * 24 * 3600):
+        """
+        Two-tier per-post analysis cache (in-memory LRU in front of SQLite)
+        :param path: SQLite file for the persistent tier (None keeps the cache in memory only)
+        :param max_memory_entries: Size of the in-memory LRU tier
+        :param max_disk_entries: Rows kept on disk before the least recently used are evicted
+        :param ttl: Entry lifetime in seconds
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._stats = {'hits': 0, 'misses': 0, 'memory_hits': 0, 'disk_hits': 0}
+
+        self.path = path
+        self._db = self._open() if path else None
+        if path and hasattr(os, 'register_at_fork'):
+            # SQLite connections must not be shared with a forked child (e.g. gunicorn --preload)
+            os.register_at_fork(after_in_child=self.reset_after_fork)
+
+    def _open(self) -> Optional[sqlite3.Connection]:
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache(accessed_at)")
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            self.logger.error(f"Failed to open analysis cache at {self.path}: {str(e)}")
+            return None
+
+    def reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._db = self._open() if self.path else None
+
+    @staticmethod
+    def make_key(namespace: str, version: str, text: str) -> str:
+        """Content-addressed key: hash of the analysis kind, model/prompt version and post text"""
+        digest = hashlib.sha256(f"{namespace}\0{version}\0{text}".encode('utf-8')).hexdigest()
+        return f"{namespace}:{digest}"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._stats['hits'] += 1
+                    self._stats['memory_hits'] += 1
+                    analysis_cache_lookups_total.inc(result='memory_hit')
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and now - row[1] <= self.ttl:
+                        self._db.execute("UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        with json_io_seconds.time(operation='load', source='analysis_cache'):
+                            value = json.loads(row[0])
+                        self._remember(key, value, row[1])
+                        self._stats['hits'] += 1
+                        self._stats['disk_hits'] += 1
+                        analysis_cache_lookups_total.inc(result='disk_hit')
+                        return value
+                    if row:
+                        self._db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                        self._db.commit()
+                except sqlite3.Error as e:
+                    self.logger.error(f"Analysis cache read failed: {str(e)}")
+
+            self._stats['misses'] += 1
+            analysis_cache_lookups_total.inc(result='miss')
+            return None
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is None:
+                return
+            try:
+                with json_io_seconds.time(operation='dump', source='analysis_cache'):
+                    encoded = json.dumps(value)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, encoded, now, now)
+                )
+                self._db.commit()
+                self._writes_since_evict += 1
+                if self._writes_since_evict >= 100:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                self.logger.error(f"Analysis cache write failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            lookups = stats['hits'] + stats['misses']
+            stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, key: str, value: Any, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        """Drop expired rows, then the least recently used rows beyond the size limit"""
+        self._writes_since_evict = 0
+        self._db.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM analysis_cache WHERE key IN ("
+            "SELECT key FROM analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+        self._db.commit()
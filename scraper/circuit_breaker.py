@@ -0,0 +1,101 @@
+import time
+import logging
+import threading
+from scraper.metrics import registry
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+# Gauge values, so dashboards can plot the state
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_breaker_state = registry.gauge(
+    'circuit_breaker_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)', ['name']
+)
+circuit_breaker_transitions_total = registry.counter(
+    'circuit_breaker_transitions_total', 'Circuit breaker state changes by new state', ['name', 'state']
+)
+circuit_breaker_rejections_total = registry.counter(
+    'circuit_breaker_rejections_total',
+    'Calls refused without being attempted because the circuit was open (or half-open with its trials in flight)',
+    ['name']
+)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30,
+                 half_open_max_calls: int = 1):
+        """
+        Stops calling a failing dependency after consecutive failures, then probes it with trial calls
+        :param name: Label used in logs and metrics
+        :param failure_threshold: Consecutive failures (errors, timeouts) that open the circuit
+        :param reset_timeout: Seconds the circuit stays open before trial calls are let through
+        :param half_open_max_calls: Concurrent trial calls allowed while half-open; other callers are refused
+                                    until a trial closes the circuit
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trials = 0
+        self._lock = threading.Lock()
+        circuit_breaker_state.set(STATE_VALUES[CLOSED], name=name)
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go ahead now; while half-open only the trial calls may
+        Never blocks, so callers holding a concurrency slot give it back at once when refused.
+        Every allowed call must be followed by record_success or record_failure.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    circuit_breaker_rejections_total.inc(name=self.name)
+                    return False
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self._trials < self.half_open_max_calls:
+                self._trials += 1
+                return True
+            circuit_breaker_rejections_total.inc(name=self.name)
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self._trials = max(0, self._trials - 1)
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self._trials = max(0, self._trials - 1)
+                self._transition(OPEN)
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def _transition(self, state: str):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.logger.warning(f"{self.name} circuit opened after {self.failures} consecutive failures; "
+                                f"retrying in {self.reset_timeout:g}s")
+        elif state == HALF_OPEN:
+            self._trials = 0
+            self.logger.info(f"{self.name} circuit half-open, sending trial calls")
+        else:
+            self.logger.info(f"{self.name} circuit closed again (was {previous})")
+        circuit_breaker_state.set(STATE_VALUES[state], name=self.name)
+        circuit_breaker_transitions_total.inc(name=self.name, state=state)
+
+    def status(self) -> dict:
+        return {'state': self.state, 'consecutive_failures': self.failures}
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+from scraper.pipeline import analyze_stream
+from scraper.text_classifier import is_mod_post
+from scraper.metrics import registry
+
+crawler_posts_total = registry.counter(
+    'crawler_posts_total', 'New posts analyzed and stored by the incremental crawler', ['subreddit']
+)
+crawler_run_seconds = registry.histogram(
+    'crawler_run_seconds', 'Duration of one incremental crawl over all subreddits',
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800)
+)
+
+class IncrementalCrawler:
+    def __init__(self, reddit_scraper, result_store, sentiment_analyzer, gemini_analyzer,
+                 subreddits: Optional[List[str]] = None, interval: float = 900, max_posts: int = 100,
+                 near_duplicates=None):
+        """
+        Periodically fetches only submissions newer than each subreddit's stored watermark and feeds
+        them through analysis into the result store
+        :param subreddits: Subreddits to follow (defaults to the scraper's list)
+        :param interval: Seconds between crawls when running on the background schedule
+        :param max_posts: Submissions read on a subreddit's first crawl; later crawls read everything newer
+                          than its watermark
+        :param near_duplicates: Optional NearDuplicateDetector passed to analyze_stream
+        """
+        self.logger = logging.getLogger(__name__)
+        self.reddit_scraper = reddit_scraper
+        self.result_store = result_store
+        self.sentiment_analyzer = sentiment_analyzer
+        self.gemini_analyzer = gemini_analyzer
+        self.subreddits = list(subreddits or reddit_scraper.subreddits)
+        self.interval = interval
+        self.max_posts = max_posts
+        self.near_duplicates = near_duplicates
+        self.last_run = None
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self) -> Dict[str, int]:
+        """Crawl every subreddit once, returning the number of new posts stored per subreddit"""
+        with self._run_lock:
+            started = time.time()
+            stored = {}
+            with crawler_run_seconds.time():
+                for sub in self.subreddits:
+                    if self._stop.is_set():
+                        break
+                    try:
+                        stored[sub] = self._crawl_subreddit(sub)
+                    except Exception as e:
+                        self.logger.error(f"Incremental crawl of r/{sub} failed: {str(e)}")
+            self.last_run = {'started_at': started, 'finished_at': time.time(), 'stored': stored}
+            self.logger.info(f"Incremental crawl stored {sum(stored.values())} new posts")
+            return stored
+
+    def _crawl_subreddit(self, sub: str) -> int:
+        watermark = self.result_store.get_watermark(sub)
+        posts, newest = self.reddit_scraper.fetch_new_posts(sub, watermark, limit=self.max_posts)
+        posts = [post for post in posts if not is_mod_post(post)]
+
+        count = 0
+        for post in analyze_stream(posts, self.sentiment_analyzer, self.gemini_analyzer,
+                                   near_duplicates=self.near_duplicates):
+            self.result_store.upsert_posts([post])
+            count += 1
+        crawler_posts_total.inc(count, subreddit=sub)
+
+        # Only advance once everything up to the new watermark is stored, so a failed crawl is retried
+        if newest and newest != watermark:
+            self.result_store.set_watermark(sub, newest['created_utc'], newest['submission_id'])
+        return count
+
+    def start(self):
+        """Run crawls every `interval` seconds in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name='incremental-crawler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        """Crawl, then wait `interval` seconds, until stop() is called"""
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.error(f"Incremental crawl failed: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def status(self) -> Dict:
+        return {
+            'running': bool(self._thread and self._thread.is_alive()),
+            'interval': self.interval,
+            'subreddits': self.subreddits,
+            'last_run': self.last_run,
+            'watermarks': self.result_store.watermarks(),
+        }
+
+if __name__ == '__main__':
+    # Usage: python -m scraper.crawler [--once]
+    # Runs the crawler as its own process (e.g. next to several gunicorn workers) using the app's settings
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    load_dotenv()
+    interval = float(os.getenv('CRAWL_INTERVAL') or 900)
+    # The app must not start a second crawler thread inside this process
+    os.environ.update({'CRAWL_INTERVAL': '0', 'WARM_UP_MODEL': '0'})
+    import app
+
+    crawler = app.incremental_crawler
+    crawler.interval = interval
+    if '--once' in sys.argv[1:]:
+        print(crawler.run_once())
+    else:
+        crawler.run_forever()
@@ -0,0 +1,115 @@
+import io
+import os
+import sys
+import csv
+import json
+import zlib
+import argparse
+import logging
+from typing import Dict, Iterable, Iterator
+from scraper.metrics import registry
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# CSV columns, in order; NDJSON rows carry every stored field
+CSV_FIELDS = [
+    'id', 'source', 'subreddit', 'title', 'content', 'author', 'date', 'url',
+    'upvotes', 'comments', 'sentiment', 'sentiment_score', 'insight'
+]
+
+# Compressed output is handed on once this much has accumulated, so small rows don't become tiny writes
+GZIP_FLUSH_BYTES = 64 * 1024
+
+export_rows_total = registry.counter('export_rows_total', 'Posts written by bulk exports', ['format'])
+
+def iter_ndjson(posts: Iterable[Dict]) -> Iterator[str]:
+    """One JSON object per line"""
+    for post in posts:
+        export_rows_total.inc(format='ndjson')
+        yield json.dumps(post, ensure_ascii=False) + '\n'
+
+def iter_csv(posts: Iterable[Dict]) -> Iterator[str]:
+    """Header row, then one row per post"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for post in posts:
+        writer.writerow(post)
+        export_rows_total.inc(format='csv')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_export(posts: Iterable[Dict], fmt: str = 'ndjson', compress: bool = False) -> Iterator:
+    """
+    Serialize posts lazily
+    :param fmt: 'ndjson' or 'csv'
+    :param compress: Yield gzip-compressed bytes instead of text
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    chunks = iter_ndjson(posts) if fmt == 'ndjson' else iter_csv(posts)
+    return gzip_chunks(chunks) if compress else chunks
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip a stream of text chunks incrementally (one gzip member, no full buffering)"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    pending = []
+    size = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            pending.append(data)
+            size += len(data)
+        if size >= GZIP_FLUSH_BYTES:
+            yield b''.join(pending)
+            pending, size = [], 0
+    pending.append(compressor.flush())
+    yield b''.join(pending)
+
+def export_filename(fmt: str, compress: bool, stamp: str) -> str:
+    return f"posts_{stamp}.{fmt}{'.gz' if compress else ''}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Export stored posts as NDJSON or CSV")
+    parser.add_argument('--db', default=os.getenv('RESULTS_DB_PATH', 'data/results.db'))
+    parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+    parser.add_argument('--gzip', action='store_true', help='Compress the output')
+    parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+    parser.add_argument('--since', help='Only posts dated at or after this ISO date')
+    parser.add_argument('--until', help='Only posts dated before this ISO date')
+    parser.add_argument('--subreddit', action='append', help='Only posts from this subreddit (repeatable)')
+    parser.add_argument('--sentiment', choices=['POSITIVE', 'NEGATIVE', 'NEUTRAL'])
+    parser.add_argument('--query', type=int, help='Only posts returned by this saved query id')
+    parser.add_argument('--q', dest='text', help='Only posts whose title or content contains this text')
+    args = parser.parse_args()
+
+    from scraper.storage import ResultStore
+
+    logging.basicConfig(level=logging.INFO)
+    store = ResultStore(args.db)
+    posts = store.iter_posts(query_id=args.query, sentiment=args.sentiment, subreddits=args.subreddit,
+                             text=args.text, since=args.since, until=args.until)
+    chunks = iter_export(posts, args.format, compress=args.gzip)
+
+    if args.output:
+        out = open(args.output, 'wb') if args.gzip else open(args.output, 'w', encoding='utf-8', newline='')
+    else:
+        out = sys.stdout.buffer if args.gzip else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    logging.info(f"Exported {int(export_rows_total.value(format=args.format))} posts")
+    return 0
+
+if __name__ == '__main__':
+    # Usage: python -m scraper.export [--format ndjson|csv] [--gzip] [-o FILE] [--since 2024-01-01] [--subreddit anxiety]
+    sys.exit(main())
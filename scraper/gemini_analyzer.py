@@ -1,77 +1,309 @@
 import os
+import random
+import time
 import requests
 import logging
 import json
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Union
+from requests.adapters import HTTPAdapter
+from scraper.rate_limiter import AdaptiveConcurrencyLimiter, TokenBucket
+from scraper.circuit_breaker import OPEN, CircuitBreaker, CircuitOpenError
+from scraper.analysis_cache import AnalysisCache
+from scraper.insights import is_fallback
+from scraper.metrics import registry
+
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Responses that mean "send less": they shrink the adaptive concurrency limit
+OVERLOAD_STATUS_CODES = {429, 503}
+# Bump whenever the prompt or generation settings change so cached insights are not reused
+PROMPT_VERSION = "1"
+
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_CIVIC_INTEGRITY", "threshold": "BLOCK_NONE"}
+]
+
+gemini_request_seconds = registry.histogram(
+    'gemini_request_seconds', 'Gemini API latency per HTTP attempt', ['status'], timing_name='gemini'
+)
+gemini_responses_total = registry.counter(
+    'gemini_responses_total', 'Gemini API attempts by HTTP status or error kind', ['status']
+)
+gemini_retries_total = registry.counter('gemini_retries_total', 'Gemini API attempts that were retried')
+gemini_first_token_seconds = registry.histogram(
+    'gemini_first_token_seconds', 'Time from a streamGenerateContent request to its first insight text',
+    timing_name='gemini_first_token'
+)
+gemini_batch_posts_total = registry.counter(
+    'gemini_batch_posts_total', 'Posts sent in multi-post requests: parsed, fallback (retried alone) or failed', ['result']
+)
 
 class GeminiAnalyzer:
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None, max_workers: int = 4,
+                 requests_per_second: Optional[float] = None, max_retries: int = 3,
+                 backoff_base: float = 0.5, timeout: float = 15, cache: Optional[AnalysisCache] = None,
+                 batch_size: int = 1, max_batch_tokens: int = 6000, breaker_failures: Optional[int] = None,
+                 breaker_reset_seconds: Optional[float] = None, adaptive_concurrency: bool = True):
+        """
+        Initialize the Gemini client
+        :param base_url: generateContent endpoint (defaults to GEMINI_API_URL or the public API)
+        :param max_workers: Number of concurrent requests used by generate_insights
+        :param requests_per_second: Token bucket rate limit (defaults to GEMINI_RPS, unlimited if unset)
+        :param max_retries: Retries on 429/5xx responses and connection errors
+        :param backoff_base: Base delay in seconds for jittered exponential backoff
+        :param timeout: Per-request timeout in seconds
+        :param cache: Optional per-post analysis cache consulted before calling the API
+        :param batch_size: Posts packed into one generateContent call by generate_insight_batch (1 disables packing)
+        :param max_batch_tokens: Approximate prompt token budget of a multi-post request
+        :param breaker_failures: Consecutive failed attempts (5xx, timeouts, connection errors) that open the
+                                 circuit (defaults to GEMINI_BREAKER_FAILURES or 5; 0 disables the breaker)
+        :param breaker_reset_seconds: Seconds the open circuit answers with fallbacks before a trial request
+                                      (defaults to GEMINI_BREAKER_RESET_SECONDS or 30)
+        :param adaptive_concurrency: Let in-flight requests float between 1 and max_workers with latency and 429s
+        """
         self.logger = logging.getLogger(__name__)
         self.api_key = os.getenv('GEMINI_API_KEY')
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        self.base_url = base_url or os.getenv('GEMINI_API_URL') or DEFAULT_BASE_URL
+        # Server-sent events variant of the same model's endpoint, used by stream_insight
+        self.stream_url = self.base_url.replace(':generateContent', ':streamGenerateContent') \
+            if self.base_url.endswith(':generateContent') else None
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.max_batch_tokens = max_batch_tokens
+
+        rps = requests_per_second if requests_per_second is not None else float(os.getenv('GEMINI_RPS', 0) or 0)
+        self.rate_limiter = TokenBucket(rps) if rps > 0 else None
+
+        failures = breaker_failures if breaker_failures is not None else int(os.getenv('GEMINI_BREAKER_FAILURES', 5))
+        reset = breaker_reset_seconds if breaker_reset_seconds is not None else \
+            float(os.getenv('GEMINI_BREAKER_RESET_SECONDS', 30))
+        self.circuit_breaker = CircuitBreaker('gemini', failure_threshold=failures, reset_timeout=reset) \
+            if failures > 0 else None
+        self.concurrency = AdaptiveConcurrencyLimiter('gemini', max_limit=max_workers) if adaptive_concurrency else None
+
+        # Keep-alive session shared by all worker threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_workers, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
         if not self.api_key:
             self.logger.warning("Gemini API key not configured. Set GEMINI_API_KEY environment variable.")
 
     def generate_insight(self, text: str) -> str:
         """Generate therapeutic insights using Gemini API"""
+        unavailable = self._check_text(text)
+        if unavailable:
+            return unavailable
+
+        cached = self._cache_get(text)
+        if cached is not None:
+            return cached
+        return self._fetch_insight(text)
+
+    def stream_insight(self, text: str) -> Iterator[str]:
+        """
+        Generate one post's insight with streamGenerateContent, yielding text as it arrives
+        Cached insights and fallback strings are yielded whole. Endpoints without a streaming
+        variant get a single generate_insight answer.
+        :param text: Post content
+        """
+        unavailable = self._check_text(text)
+        if unavailable:
+            yield unavailable
+            return
+
+        cached = self._cache_get(text)
+        if cached is not None:
+            yield cached
+            return
+        if self.stream_url is None:
+            yield self._fetch_insight(text)
+            return
+
+        parts = []
+        start = time.perf_counter()
+        try:
+            response = self._post(self._build_request(text), url=f"{self.stream_url}?alt=sse", stream=True)
+            with response:
+                if response.status_code != 200:
+                    self.logger.error(f"Gemini API HTTP error on stream: {response.status_code} - {response.text}")
+                    yield f"Analysis unavailable - API returned status {response.status_code}"
+                    return
+
+                # chunk_size=None hands over each network chunk as it arrives instead of filling 512-byte blocks
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    # Each event is one "data: <GenerateContentResponse JSON>" line
+                    if not line or not line.startswith('data:'):
+                        continue
+                    chunk = json.loads(line[5:])
+                    for candidate in chunk.get('candidates', [])[:1]:
+                        for part in candidate.get('content', {}).get('parts', []):
+                            if part.get('text'):
+                                if not parts:
+                                    gemini_first_token_seconds.observe(time.perf_counter() - start)
+                                parts.append(part['text'])
+                                yield part['text']
+
+        except CircuitOpenError:
+            if not parts:
+                yield "Analysis unavailable - API temporarily unavailable, retrying shortly"
+            return
+
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Text already sent stays with the client; only a stream that produced nothing gets a fallback
+            self.logger.error(f"Gemini API stream failed after {len(parts)} chunks: {str(e)}")
+            if not parts:
+                yield "Analysis unavailable - Could not connect to API"
+            return
+
+        if not parts:
+            self.logger.error("Gemini API stream returned no text")
+            yield "Analysis unavailable - Empty response from API"
+            return
+        self._cache_set(text, ''.join(parts).strip())
+
+    def generate_insight_batch(self, texts: List[str]) -> List[str]:
+        """
+        Generate insights for several posts, packing them into as few generateContent calls as
+        batch_size and max_batch_tokens allow
+        Posts missing or malformed in a multi-post answer are retried with single-post calls; when the
+        request itself fails (HTTP error after retries, timeout, open circuit) the whole group gets the
+        fallback string instead, so a throttled API is not hit with one more request per post.
+        :param texts: Post contents
+        :return: Insights in input order
+        """
+        insights = [None] * len(texts)
+        pending = []
+        for i, text in enumerate(texts):
+            insights[i] = self._check_text(text) or self._cache_get(text)
+            if insights[i] is None:
+                pending.append(i)
+
+        for group in self._pack(texts, pending):
+            if len(group) == 1:
+                insights[group[0]] = self._fetch_insight(texts[group[0]])
+                continue
+
+            answers = self._request_batch([texts[i] for i in group])
+            if isinstance(answers, str):
+                gemini_batch_posts_total.inc(len(group), result='failed')
+                for i in group:
+                    insights[i] = answers
+                continue
+            for post_id, i in zip(self._batch_ids(len(group)), group):
+                insight = answers.get(post_id)
+                if insight:
+                    gemini_batch_posts_total.inc(result='parsed')
+                    self._cache_set(texts[i], insight)
+                    insights[i] = insight
+                else:
+                    gemini_batch_posts_total.inc(result='fallback')
+                    insights[i] = self._fetch_insight(texts[i])
+        return insights
+
+    def _check_text(self, text: str) -> Optional[str]:
+        """Fallback string when a post cannot be analyzed at all, otherwise None"""
         if not self.api_key:
             return "Analysis unavailable - API key not configured"
 
         # Sanitize input text - ensure it's not empty
         if not text or text.strip() == '':
             return "Analysis unavailable - Empty content"
+        return None
 
-        headers = {'Content-Type': 'application/json'}
-        prompt = (
-            "Analyze this Reddit post from a mental health professional perspective. "
-            "Identify key emotional themes, potential concerns, and provide "
-            "supportive, clinically-informed insights. Keep response concise (3-4 sentences).\n\n"
-            f"Post content: {text[:2000]}"  # Limit to first 2000 chars
-        )
-        
-        data = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }],
-            "safetySettings": [
-                {
-                    "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                    "threshold": "BLOCK_NONE"
-                },
-                 {
-                    "category": "HARM_CATEGORY_HATE_SPEECH",
-                    "threshold": "BLOCK_NONE"
-                },
-                {
-                    "category": "HARM_CATEGORY_SEXUALLY_EXPLICIT",
-                    "threshold": "BLOCK_NONE"
-                },
-                {
-                    "category": "HARM_CATEGORY_HARASSMENT",
-                    "threshold": "BLOCK_NONE"
-                },
-                {
-                    "category": "HARM_CATEGORY_CIVIC_INTEGRITY",
-                    "threshold": "BLOCK_NONE"
-                }
-            ],
-            "generationConfig": {
-                "temperature": 0.5,
-                "maxOutputTokens": 256
+    def _cache_key(self, text: str) -> str:
+        return AnalysisCache.make_key('insight', f"{self.base_url}|{PROMPT_VERSION}", text[:2000])
+
+    def _cache_get(self, text: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.get(self._cache_key(text))
+
+    def _cache_set(self, text: str, insight: str):
+        if self.cache is not None and not is_fallback(insight):
+            self.cache.set(self._cache_key(text), insight)
+
+    def _fetch_insight(self, text: str) -> str:
+        """Request one post's insight and cache it unless the call failed"""
+        insight = self._request_insight(text)
+        self._cache_set(text, insight)
+        return insight
+
+    def _pack(self, texts: List[str], indices: List[int]) -> List[List[int]]:
+        """Group post indices into requests of at most batch_size posts and max_batch_tokens prompt tokens"""
+        groups = []
+        group, tokens = [], 0
+        for i in indices:
+            # Rough estimate of 4 characters per token, plus the per-post header
+            post_tokens = len(texts[i][:2000]) // 4 + 10
+            if group and (len(group) >= self.batch_size or tokens + post_tokens > self.max_batch_tokens):
+                groups.append(group)
+                group, tokens = [], 0
+            group.append(i)
+            tokens += post_tokens
+        if group:
+            groups.append(group)
+        return groups
+
+    @staticmethod
+    def _batch_ids(count: int) -> List[str]:
+        return [f"post_{n}" for n in range(1, count + 1)]
+
+    def _request_batch(self, texts: List[str]) -> Union[Dict[str, str], str]:
+        """
+        Call the Gemini API for several posts
+        :return: {post id: insight} for the parsable answers of a successful response (possibly empty),
+                 or a fallback string when the request itself failed
+        """
+        try:
+            response = self._post(self._build_batch_request(texts))
+            if response.status_code != 200:
+                self.logger.error(f"Gemini API HTTP error on batch of {len(texts)}: {response.status_code} - {response.text}")
+                return f"Analysis unavailable - API returned status {response.status_code}"
+
+            answers = json.loads(response.json()['candidates'][0]['content']['parts'][0]['text'])
+            if not isinstance(answers, dict):
+                raise ValueError(f"expected a JSON object, got {type(answers).__name__}")
+            return {
+                post_id: insight.strip() for post_id, insight in answers.items()
+                if isinstance(insight, str) and insight.strip()
             }
-        }
+
+        except CircuitOpenError:
+            return "Analysis unavailable - API temporarily unavailable, retrying shortly"
+
+        # Before RequestException: an undecodable 200 body is a malformed answer, not a failed request
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            self.logger.error(f"Gemini batch answer unparsable, falling back to single-post calls: {str(e)}")
+            return {}
+
+        except requests.exceptions.Timeout:
+            self.logger.error(f"Gemini API batch request of {len(texts)} posts timed out")
+            return "Analysis unavailable - API request timed out"
+
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"Gemini API batch request of {len(texts)} posts failed: {str(e)}")
+            return "Analysis unavailable - Could not connect to API"
+
+    def _request_insight(self, text: str) -> str:
+        """Call the Gemini API for one post, returning a fallback string on failure"""
+        data = self._build_request(text)
         
         try:
             self.logger.debug(f"Sending request to Gemini API with {len(text)} characters of text")
             self.logger.debug(f"Request data: {json.dumps(data, indent=2)}")  # Log the data
 
-            response = requests.post(
-                f"{self.base_url}?key={self.api_key}",
-                headers=headers,
-                json=data,
-                timeout=15
-            )
+            response = self._post(data)
             
             self.logger.debug(f"Gemini API response status: {response.status_code}")
             
@@ -115,8 +347,181 @@ class GeminiAnalyzer:
         except requests.exceptions.ConnectionError:
             self.logger.error("Gemini API connection error")
             return "Analysis unavailable - Could not connect to API"
-            
-        
+
+        except CircuitOpenError:
+            # Logged once when the circuit opened; failing fast here is the point
+            return "Analysis unavailable - API temporarily unavailable, retrying shortly"
+
         except Exception as e:
             self.logger.error(f"Gemini API error: {str(e)}")
             return f"Analysis unavailable - {str(e)}"
+
+    def generate_insights(self, texts: List[str],
+                          on_result: Optional[Callable[[int, str], None]] = None) -> List[str]:
+        """
+        Generate insights for many posts concurrently (batch_size posts per request when packing is enabled)
+        :param texts: Post contents
+        :param on_result: Optional callback invoked with (index, insight) as each insight completes
+        :return: Insights in input order
+        """
+        insights = [None] * len(texts)
+        if not texts:
+            return insights
+
+        groups = [list(range(start, min(start + self.batch_size, len(texts))))
+                  for start in range(0, len(texts), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(groups)))) as executor:
+            futures = {
+                executor.submit(self.generate_insight_batch, [texts[i] for i in group]): group for group in groups
+            }
+            for future in as_completed(futures):
+                for i, insight in zip(futures[future], future.result()):
+                    insights[i] = insight
+                    if on_result:
+                        on_result(i, insight)
+        return insights
+
+    def _build_request(self, text: str) -> dict:
+        """Build the generateContent request body for a single post"""
+        prompt = (
+            "Analyze this Reddit post from a mental health professional perspective. "
+            "Identify key emotional themes, potential concerns, and provide "
+            "supportive, clinically-informed insights. Keep response concise (3-4 sentences).\n\n"
+            f"Post content: {text[:2000]}"  # Limit to first 2000 chars
+        )
+        
+        return {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }],
+            "safetySettings": SAFETY_SETTINGS,
+            "generationConfig": {
+                "temperature": 0.5,
+                "maxOutputTokens": 256
+            }
+        }
+
+    def _build_batch_request(self, texts: List[str]) -> dict:
+        """Build one generateContent request for several posts, asking for a JSON object keyed by post id"""
+        post_ids = self._batch_ids(len(texts))
+        posts = "\n\n".join(f"[{post_id}]\n{text[:2000]}" for post_id, text in zip(post_ids, texts))
+        prompt = (
+            "Analyze each of the following Reddit posts from a mental health professional perspective. "
+            "For each post, identify key emotional themes, potential concerns, and provide "
+            "supportive, clinically-informed insights. Keep each response concise (3-4 sentences). "
+            "Answer with a JSON object mapping each post id to its insight.\n\n"
+            f"{posts}"
+        )
+
+        return {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }],
+            "safetySettings": SAFETY_SETTINGS,
+            "generationConfig": {
+                "temperature": 0.5,
+                "maxOutputTokens": min(256 * len(texts), 8192),
+                "responseMimeType": "application/json",
+                "responseSchema": {
+                    "type": "OBJECT",
+                    "properties": {post_id: {"type": "STRING"} for post_id in post_ids},
+                    "required": post_ids
+                }
+            }
+        }
+
+    def _post(self, data: dict, url: Optional[str] = None, stream: bool = False) -> requests.Response:
+        """
+        POST to Gemini through the shared session, retrying 429/5xx with jittered backoff
+        :param url: Endpoint without the key parameter (defaults to base_url)
+        :param stream: Return once the headers arrive; the caller reads and closes the body
+        """
+        attempt = 0
+        while True:
+            try:
+                response = self._send(data, url or self.base_url, stream)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+                self.logger.warning(f"Gemini API returned {response.status_code}, retrying")
+                retry_after = response.headers.get('Retry-After')
+                response.content  # Read the (short) error body so a streamed connection goes back to the pool
+            except requests.exceptions.ConnectionError:
+                if attempt >= self.max_retries:
+                    raise
+                self.logger.warning("Gemini API connection error, retrying")
+                retry_after = None
+
+            attempt += 1
+            gemini_retries_total.inc()
+            delay = self._backoff_delay(attempt)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            time.sleep(delay)
+
+    def _send(self, data: dict, url: str, stream: bool = False) -> requests.Response:
+        """
+        One HTTP attempt, gated by the circuit breaker, the rate limit and the adaptive concurrency limit
+        Raises CircuitOpenError without calling the API while the circuit is open, or half-open with its
+        trial request in flight. Streamed attempts are judged (and hold their concurrency slot) up to the
+        response headers.
+        """
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        # Checked before taking a slot, so calls refused while a half-open trial runs never queue for one
+        if self.circuit_breaker and not self.circuit_breaker.allow():
+            raise CircuitOpenError("gemini circuit is open")
+        slot = self.concurrency.acquire() if self.concurrency else None
+        # And again after waiting for it, so queued calls notice a circuit that opened meanwhile
+        if self.circuit_breaker and self.circuit_breaker.state == OPEN:
+            if self.concurrency:
+                self.concurrency.release(slot)
+            raise CircuitOpenError("gemini circuit is open")
+        start = time.perf_counter()
+        latency, overloaded, healthy = None, False, False
+        try:
+            response = self.session.post(
+                url,
+                params={'key': self.api_key},
+                headers={'Content-Type': 'application/json'},
+                json=data,
+                timeout=self.timeout,
+                stream=stream
+            )
+            self._observe(start, response.status_code)
+            if response.status_code == 200:
+                latency = time.perf_counter() - start
+            overloaded = response.status_code in OVERLOAD_STATUS_CODES
+            # A 429 means the API is up but throttling us: concurrency backs off, the circuit stays closed
+            healthy = response.status_code < 500
+            return response
+        except requests.exceptions.ConnectionError:
+            self._observe(start, 'connection_error')
+            raise
+        except requests.exceptions.Timeout:
+            self._observe(start, 'timeout')
+            overloaded = True
+            raise
+        finally:
+            if self.concurrency:
+                self.concurrency.release(slot, latency, overloaded)
+            if self.circuit_breaker:
+                if healthy:
+                    self.circuit_breaker.record_success()
+                else:
+                    self.circuit_breaker.record_failure()
+
+    def status(self) -> Dict:
+        """Circuit breaker state and current adaptive concurrency limit"""
+        return {
+            'circuit': self.circuit_breaker.status() if self.circuit_breaker else None,
+            'concurrency_limit': int(self.concurrency.limit) if self.concurrency else self.max_workers
+        }
+
+    @staticmethod
+    def _observe(start: float, status):
+        gemini_request_seconds.observe(time.perf_counter() - start, status=status)
+        gemini_responses_total.inc(status=status)
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, self.backoff_base * (2 ** (attempt - 1)))
@@ -0,0 +1,184 @@
+import os
+import sys
+import gzip
+import time
+import hashlib
+import logging
+import mimetypes
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from flask import Response, send_from_directory
+from scraper.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+# Response types worth compressing; streamed responses (NDJSON, exports) are left alone
+COMPRESSIBLE_TYPES = {
+    'application/json', 'text/html', 'text/css', 'text/plain', 'text/csv',
+    'application/javascript', 'text/javascript', 'image/svg+xml',
+}
+# Below this size the encoding overhead outweighs the savings
+MIN_COMPRESS_BYTES = 500
+# Precompressed copies written next to static files (preferred encoding first)
+PRECOMPRESSED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+http_compressed_responses_total = registry.counter(
+    'http_compressed_responses_total', 'Responses sent with a Content-Encoding', ['encoding', 'source']
+)
+http_not_modified_total = registry.counter(
+    'http_not_modified_total', 'Conditional requests answered with 304 Not Modified', ['endpoint']
+)
+fragment_cache_lookups_total = registry.counter(
+    'fragment_cache_lookups_total', 'Rendered fragment cache lookups', ['result']
+)
+
+def make_etag(*parts: Any) -> str:
+    """Opaque ETag value for a representation identified by `parts`"""
+    return hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def is_not_modified(request, etag: str, last_modified: Optional[float]) -> bool:
+    """
+    Whether a conditional GET already has the current representation
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110
+    :param last_modified: Epoch seconds the data last changed
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+def set_validators(response: Response, etag: str, last_modified: Optional[float]) -> Response:
+    """Attach ETag/Last-Modified and ask clients to revalidate before reusing the response"""
+    # Weak: the body may be re-encoded (compressed) on the way out
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = int(last_modified)
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified_response(etag: str, last_modified: Optional[float]) -> Response:
+    return set_validators(Response(status=304), etag, last_modified)
+
+class FragmentCache:
+    def __init__(self, ttl: float = 30, max_entries: int = 128):
+        """
+        Short-lived cache of rendered output keyed by (key, data version)
+        :param ttl: Seconds an entry is reused even if its data version is unchanged (bounds
+                    staleness of parts that depend on the clock, e.g. "last 7 days" windows)
+        :param max_entries: Least recently used entries beyond this are dropped
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: Hashable, version: Any, render: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version and entry[1] > now:
+                self._entries.move_to_end(key)
+                fragment_cache_lookups_total.inc(result='hit')
+                return entry[2]
+        fragment_cache_lookups_total.inc(result='miss')
+        value = render()
+        with self._lock:
+            self._entries[key] = (version, now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """Best content coding this server can produce that the client accepts"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def compress_response(response: Response, accept_encodings, level: int = 6) -> Response:
+    """Compress a buffered text response in place when the client accepts br or gzip"""
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encodings)
+    data = response.get_data()
+    if encoding is None or len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    if encoding == 'br':
+        # Quality 5 compresses about as fast as gzip -6 while producing smaller output
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=level, mtime=0))
+    response.headers['Content-Encoding'] = encoding
+    http_compressed_responses_total.inc(encoding=encoding, source='dynamic')
+    return response
+
+def send_static(directory: str, filename: str, accept_encodings, max_age: Optional[int] = None) -> Response:
+    """
+    Serve a static file, preferring an up-to-date precompressed <file>.br / <file>.gz copy
+    the client accepts (see precompress_directory)
+    """
+    path = os.path.join(directory, filename)
+    if os.path.isfile(path):
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+            compressed = path + suffix
+            if accept_encodings[encoding] and os.path.isfile(compressed) and \
+                    os.path.getmtime(compressed) >= os.path.getmtime(path):
+                response = send_from_directory(directory, filename + suffix, max_age=max_age,
+                                               mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                http_compressed_responses_total.inc(encoding=encoding, source='static')
+                return response
+    return send_from_directory(directory, filename, max_age=max_age)
+
+def precompress_directory(directory: str, min_size: int = MIN_COMPRESS_BYTES) -> int:
+    """
+    Write <file>.gz (and <file>.br when brotli is installed) next to every static file that is
+    missing one or has changed since, using maximum compression since this happens once
+    :return: Number of compressed files written
+    """
+    written = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(tuple(suffix for _, suffix in PRECOMPRESSED_SUFFIXES)):
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) < min_size:
+                continue
+            for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = path + suffix
+                if os.path.isfile(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                with open(path, 'rb') as f:
+                    data = f.read()
+                data = brotli.compress(data, quality=11) if encoding == 'br' else gzip.compress(data, 9, mtime=0)
+                with open(target, 'wb') as f:
+                    f.write(data)
+                written += 1
+    return written
+
+if __name__ == '__main__':
+    # Usage: python -m scraper.http_cache [static_dir]
+    logging.basicConfig(level=logging.INFO)
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else "static"
+    count = precompress_directory(static_dir)
+    print(f"Wrote {count} precompressed files under {static_dir}" + ("" if brotli else " (gzip only; pip install brotli for .br)"))
@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+from scraper.metrics import registry
+
+DEFAULT_SOCKET = "/tmp/therapeutic-sentiment.sock"
+
+inference_batch_size = registry.histogram(
+    'inference_batch_size', 'Texts per micro-batched forward pass in the inference service',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+inference_queue_seconds = registry.histogram(
+    'inference_queue_seconds', 'Time a text waited in the inference service before its batch ran'
+)
+
+class MicroBatcher:
+    def __init__(self, infer: Callable[[List[str]], List[Dict]], max_batch_size: int = 32,
+                 max_wait: float = 0.005):
+        """
+        Collects texts from concurrent callers and runs them through one forward pass
+        :param infer: Runs the model on a list of texts, returning one result per text
+        :param max_batch_size: Largest batch handed to `infer`
+        :param max_wait: Seconds to keep collecting after the first text of a batch arrives
+        """
+        self.logger = logging.getLogger(__name__)
+        self.infer = infer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.texts = 0
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name='inference-batcher', daemon=True).start()
+
+    def submit(self, texts: List[str]) -> List[Future]:
+        futures = []
+        for text in texts:
+            future = Future()
+            self._queue.put((text, future, time.monotonic()))
+            futures.append(future)
+        return futures
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            started = time.monotonic()
+            for _, _, queued_at in batch:
+                inference_queue_seconds.observe(started - queued_at)
+            inference_batch_size.observe(len(batch))
+            self.batches += 1
+            self.texts += len(batch)
+            try:
+                results = self.infer([text for text, _, _ in batch])
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                self.logger.error(f"Batched inference failed: {str(e)}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line, answered with one JSON line"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                if request.get('ping'):
+                    response = self.server.status()
+                else:
+                    futures = self.server.batcher.submit([str(text) for text in request['texts']])
+                    response = {'results': [future.result() for future in futures]}
+            except Exception as e:
+                response = {'error': str(e)}
+            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Every worker thread holds its own connection; the default backlog of 5 refuses bursts of them
+    request_queue_size = 128
+
+    def __init__(self, socket_path: str, sentiment_analyzer, max_batch_size: int = 32, max_wait: float = 0.005):
+        """
+        Serves sentiment inference for other processes over a Unix socket, micro-batching
+        concurrent requests into shared forward passes
+        :param sentiment_analyzer: In-process SentimentAnalyzer that owns the model
+        """
+        self.logger = logging.getLogger(__name__)
+        self.socket_path = socket_path
+        self.sentiment_analyzer = sentiment_analyzer
+        self.batcher = MicroBatcher(
+            lambda texts: sentiment_analyzer.analyze_batch(texts, batch_size=len(texts)),
+            max_batch_size=max_batch_size, max_wait=max_wait
+        )
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Left behind by a previous run
+        super().__init__(socket_path, _RequestHandler)
+
+    def status(self) -> Dict:
+        return {
+            'ok': True,
+            'model_version': self.sentiment_analyzer.model_version,
+            'batches': self.batcher.batches,
+            'texts': self.batcher.texts,
+        }
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+class InferenceClient:
+    def __init__(self, socket_path: str, timeout: float = 30):
+        """
+        Client for InferenceServer; each thread keeps its own connection
+        :param timeout: Seconds to wait for a response (covers queueing behind other batches)
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset_after_fork)
+
+    def reset_after_fork(self):
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            conn = self._local.conn = (sock, sock.makefile('rb'))
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn:
+            conn[1].close()
+            conn[0].close()
+
+    def request(self, payload: Dict) -> Dict:
+        """Send one request, raising OSError if the service cannot be reached"""
+        try:
+            sock, reader = self._connection()
+            sock.sendall((json.dumps(payload) + '\n').encode('utf-8'))
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("Inference service closed the connection")
+            return json.loads(line)
+        except (OSError, ValueError):
+            self._close()
+            raise
+
+    def analyze(self, texts: List[str]) -> List[Dict]:
+        response = self.request({'texts': texts})
+        if 'error' in response:
+            raise ValueError(f"Inference service error: {response['error']}")
+        return response['results']
+
+    def ping(self) -> Dict:
+        return self.request({'ping': True})
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared sentiment inference service")
+    parser.add_argument('--socket', default=os.getenv('SENTIMENT_SERVICE_SOCKET') or DEFAULT_SOCKET)
+    parser.add_argument('--backend', default=os.getenv('SENTIMENT_BACKEND', 'pytorch'))
+    parser.add_argument('--batch-size', type=int, default=32, help='Largest micro-batch')
+    parser.add_argument('--max-wait-ms', type=float, default=5, help='Time to collect a micro-batch')
+    args = parser.parse_args()
+
+    from scraper.sentiment_analyzer import SentimentAnalyzer
+
+    logging.basicConfig(level=logging.INFO)
+    analyzer = SentimentAnalyzer(backend=args.backend)
+    analyzer.warm_up()
+    server = InferenceServer(args.socket, analyzer, max_batch_size=args.batch_size, max_wait=args.max_wait_ms / 1000)
+    logging.info(f"Sentiment inference service listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == '__main__':
+    # Usage: python -m scraper.inference_server [--socket PATH] [--backend pytorch] [--batch-size 32] [--max-wait-ms 5]
+    sys.exit(main())
@@ -0,0 +1,8 @@
+from typing import Optional
+
+# Insights that start with this are placeholders for a failed analysis, not real insights
+FALLBACK_PREFIX = "Analysis unavailable"
+
+def is_fallback(insight: Optional[str]) -> bool:
+    """Whether an insight is missing or a fallback placeholder rather than a real analysis"""
+    return not insight or insight.startswith(FALLBACK_PREFIX)
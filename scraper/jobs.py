@@ -0,0 +1,196 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Minimum seconds between saved snapshots while a stage only reports progress
+SAVE_INTERVAL = 0.5
+
+class Job:
+    def __init__(self, key: str, stages: List[str], on_change: Optional[Callable[['Job'], None]] = None):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = 'queued'
+        self.stages = {name: {'status': 'pending', 'done': 0, 'total': None} for name in stages}
+        self.partial_results = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._on_change = on_change
+        self._saved_at = 0.0
+
+    def start_stage(self, name: str, total: Optional[int] = None):
+        with self._lock:
+            self.stages[name].update(status='running', total=total)
+        self.changed()
+
+    def set_total(self, name: str, total: int):
+        with self._lock:
+            self.stages[name]['total'] = total
+        self.changed()
+
+    def advance(self, name: str, done: int):
+        with self._lock:
+            self.stages[name]['done'] = done
+        self.changed(force=False)
+
+    def finish_stage(self, name: str):
+        with self._lock:
+            stage = self.stages[name]
+            stage['status'] = 'done'
+            if stage['total'] is not None:
+                stage['done'] = stage['total']
+        self.changed()
+
+    def set_partial_results(self, results: List[Dict]):
+        with self._lock:
+            self.partial_results = results
+        self.changed()
+
+    def changed(self, force: bool = True):
+        """
+        Report a state change to the on_change callback
+        :param force: False for progress updates, which are passed on at most every SAVE_INTERVAL seconds
+        """
+        if self._on_change is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._saved_at < SAVE_INTERVAL:
+            return
+        self._saved_at = now
+        self._on_change(self)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'stages': [{'name': name, **stage} for name, stage in self.stages.items()],
+                'partial_results': list(self.partial_results) if self.result is None else [],
+                'result': self.result,
+                'error': self.error,
+            }
+
+def _process_alive(pid: Optional[int]) -> bool:
+    """Whether another process with this pid is running; jobs of this process are tracked in memory"""
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # Exists but belongs to another user
+    return True
+
+class JobManager:
+    def __init__(self, max_workers: int = 2, retention: float = 3600, store=None):
+        """
+        Runs scrape pipelines in background threads
+        :param max_workers: Number of pipelines that may run at the same time
+        :param retention: Seconds a finished job stays available for polling
+        :param store: ResultStore that job snapshots are saved to, so every server process sharing the
+                      database can answer polls for jobs started by another one; in-process only if None
+        """
+        self.logger = logging.getLogger(__name__)
+        self.retention = retention
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape-job')
+        self._jobs = {}
+        self._active_by_key = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: str, stages: List[str], target: Callable[[Job], Dict]) -> str:
+        """
+        Queue a job, or return the id of the in-flight job already running for the same key (in this
+        process, or with a store in any live process sharing the database)
+        :param target: Called with the Job; its return value becomes the job result
+        :return: Job id to poll
+        """
+        with self._lock:
+            self._prune()
+            active = self._active_by_key.get(key)
+            if active is not None:
+                return active.id
+            job = Job(key, stages, on_change=self._save if self.store is not None else None)
+            if self.store is not None:
+                # Stored before the id is handed out, so a poll landing on another process finds it
+                claimed = self._claim(job)
+                if claimed != job.id:
+                    return claimed
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+
+        self._executor.submit(self._run, job, target)
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        """Status dict of a job started by this or (with a store) any other process, or None if unknown"""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.store is None:
+            return None
+        try:
+            saved = self.store.get_job(job_id)
+        except Exception as e:
+            self.logger.error(f"Error loading job {job_id}: {str(e)}")
+            return None
+        if saved is None:
+            return None
+        state = saved['state']
+        if state['status'] in ('queued', 'running') and not _process_alive(saved['pid']):
+            # The process running it exited (e.g. a recycled worker) before the job finished
+            state.update(status='error', error='Job was interrupted')
+        return state
+
+    def _claim(self, job: Job) -> str:
+        """Store a new job, or return the id of a live job another process runs for the same key"""
+        try:
+            return self.store.claim_job(job.id, job.key, job.to_dict(), job.created_at, _process_alive)
+        except Exception as e:
+            self.logger.error(f"Error storing job {job.id}, running it unshared: {str(e)}")
+            return job.id
+
+    def _save(self, job: Job):
+        try:
+            self.store.save_job(job.id, job.key, job.to_dict(), job.created_at, job.finished_at)
+        except Exception as e:
+            self.logger.error(f"Error saving job {job.id}: {str(e)}")
+
+    def _run(self, job: Job, target: Callable[[Job], Dict]):
+        job.status = 'running'
+        job.changed()
+        try:
+            job.result = target(job)
+            job.status = 'done'
+        except Exception as e:
+            self.logger.error(f"Job {job.id} failed: {str(e)}")
+            job.error = str(e)
+            job.status = 'error'
+        finally:
+            job.finished_at = time.time()
+            job.changed()
+            with self._lock:
+                if self._active_by_key.get(job.key) is job:
+                    del self._active_by_key[job.key]
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if self.store is not None:
+            try:
+                self.store.delete_jobs(cutoff)
+            except Exception as e:
+                self.logger.error(f"Error pruning saved jobs: {str(e)}")
@@ -0,0 +1,102 @@
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+class ModelManager:
+    def __init__(self, name: str, loader: Callable[[], Any], retry_after: float = 60):
+        """
+        Lazily loads a model on first use and tracks its lifecycle
+        :param name: Name used in logs and status reports
+        :param loader: Callable returning the loaded model
+        :param retry_after: Seconds to wait before retrying a failed load
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.loader = loader
+        self.retry_after = retry_after
+        self.state = 'cold'
+        self.load_seconds = None
+        self.warm = False
+        self._warming = False
+        self._model = None
+        self._error = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset_after_fork)
+
+    def get(self) -> Any:
+        """Return the model, loading it first if needed"""
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is not None:
+                return self._model
+            if self._error is not None and time.monotonic() - self._failed_at < self.retry_after:
+                raise RuntimeError(f"{self.name} failed to load: {self._error}")
+
+            self.state = 'loading'
+            start = time.monotonic()
+            try:
+                self._model = self.loader()
+            except Exception as e:
+                self.state = 'failed'
+                self._error = str(e)
+                self._failed_at = time.monotonic()
+                self.logger.error(f"Failed to load {self.name}: {str(e)}")
+                raise
+            self.load_seconds = time.monotonic() - start
+            self._error = None
+            self.state = 'loaded'
+            self.logger.info(f"Loaded {self.name} in {self.load_seconds:.1f}s")
+            return self._model
+
+    def warm_up(self, probe: Optional[Callable[[Any], Any]] = None, background: bool = False):
+        """
+        Load the model and optionally run a probe call so the first real request is fast
+        :param probe: Called with the loaded model (e.g. a dummy inference)
+        :param background: Run in a daemon thread instead of blocking
+        """
+        # Not ready until the probe has run, even if the model itself is already loaded
+        self._warming = True
+        if background:
+            threading.Thread(target=self._warm_up, args=(probe,), name=f"{self.name}-warmup", daemon=True).start()
+        else:
+            self._warm_up(probe)
+
+    def _warm_up(self, probe: Optional[Callable[[Any], Any]]):
+        try:
+            model = self.get()
+            if probe:
+                probe(model)
+            self.warm = True
+            self.state = 'ready'
+        except Exception as e:
+            self.logger.error(f"Warm-up of {self.name} failed: {str(e)}")
+        finally:
+            self._warming = False
+
+    @property
+    def ready(self) -> bool:
+        """Loaded, however that happened (load, warm-up or first use), and not in the middle of a warm-up"""
+        return self._model is not None and not self._warming
+
+    def reset_after_fork(self):
+        """Locks do not survive fork safely; the loaded weights are shared copy-on-write"""
+        self._lock = threading.Lock()
+        # Thread pools used by a probe in the parent are gone, so the child re-runs warm-up
+        self.warm = False
+        self._warming = False
+        if self._model is not None:
+            self.state = 'loaded'
+
+    def status(self) -> Dict:
+        return {
+            'name': self.name,
+            'state': self.state,
+            'ready': self.ready,
+            'load_seconds': self.load_seconds,
+            'error': self._error,
+        }
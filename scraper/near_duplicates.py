@@ -0,0 +1,183 @@
+import re
+import zlib
+import struct
+import hashlib
+import logging
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Tuple
+from scraper.metrics import registry
+
+# Words per shingle; consecutive word triples survive small edits while still tracking word order
+SHINGLE_SIZE = 3
+# One-permutation MinHash: each shingle hash lands in one of NUM_BINS bins, which keeps its minimum
+NUM_BINS = 64
+# LSH banding of the signature: texts with Jaccard similarity s share at least one band with
+# probability 1 - (1 - s^ROWS)^BANDS (~0.99 at s=0.7, ~0.64 at s=0.5, ~1e-4 at s=0.05)
+BANDS = 16
+ROWS = NUM_BINS // BANDS
+# Shorter posts get no signature; a handful of words compares unreliably
+MIN_TOKENS = 20
+
+_BIN_SHIFT = 32 - (NUM_BINS.bit_length() - 1)
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_SIGNATURE_FORMAT = f'>{NUM_BINS}I'
+# ASCII only, so token lengths are byte lengths
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+near_duplicate_posts_total = registry.counter(
+    'near_duplicate_posts_total', 'Posts that reused the analysis of a near-duplicate canonical post', ['source']
+)
+near_duplicate_seconds = registry.histogram(
+    'near_duplicate_seconds', 'Signature plus lookup time per post', timing_name='dedup'
+)
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+def minhash(tokens: List[str]) -> Tuple[int, ...]:
+    """
+    NUM_BINS-value MinHash signature over word shingles; the share of equal positions between two
+    signatures estimates the Jaccard similarity of their shingle sets
+    :param tokens: Normalized words of the text (see tokenize)
+    """
+    # Shingles are byte ranges of the normalized text, hashed without building per-shingle strings
+    text = ' '.join(tokens).encode('ascii')
+    view = memoryview(text)
+    starts = [0, *accumulate(len(token) + 1 for token in tokens)]
+    if len(tokens) >= SHINGLE_SIZE:
+        hashes = [zlib.crc32(view[start:end]) for start, end in zip(starts, starts[SHINGLE_SIZE:])]
+    else:
+        hashes = [zlib.crc32(text)]
+    # Descending order, so the last (smallest) hash written for each bin wins; a bin's smallest
+    # hash also has its smallest value because every hash in a bin shares the same top bits
+    hashes.sort(reverse=True)
+    minimums = {h >> _BIN_SHIFT: h & _VALUE_MASK for h in hashes}
+    bins = [minimums.get(position) for position in range(NUM_BINS)]
+
+    # Empty bins borrow from the next filled one (rotation densification) so short texts still compare
+    signature = list(bins)
+    for i in range(NUM_BINS):
+        if bins[i] is None:
+            offset = 1
+            while bins[(i + offset) % NUM_BINS] is None:
+                offset += 1
+            signature[i] = bins[(i + offset) % NUM_BINS] + (offset << _BIN_SHIFT)
+    return tuple(signature)
+
+def content_signature(content: str, min_tokens: int = MIN_TOKENS) -> Optional[Tuple[int, ...]]:
+    """MinHash of a post's content, or None if it has fewer than min_tokens words"""
+    tokens = tokenize(content or '')
+    if len(tokens) < min_tokens:
+        return None
+    return minhash(tokens)
+
+def similarity(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_BINS
+
+def band_keys(signature: Tuple[int, ...]) -> List[int]:
+    """One signed 64-bit key per LSH band, stable across processes so they can be stored"""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(struct.pack(f'>{ROWS}I', *rows), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+def pack_signature(signature: Tuple[int, ...]) -> bytes:
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+def unpack_signature(data: bytes) -> Tuple[int, ...]:
+    return struct.unpack(_SIGNATURE_FORMAT, data)
+
+class MinHashIndex:
+    def __init__(self, threshold: float = 0.7):
+        """
+        In-memory LSH index over MinHash signatures
+        :param threshold: Lowest estimated Jaccard similarity still considered a near-duplicate
+        """
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(BANDS)]
+
+    def add(self, signature: Tuple[int, ...], item: Any):
+        for band, key in enumerate(band_keys(signature)):
+            self._buckets[band].setdefault(key, []).append((signature, item))
+
+    def find(self, signature: Tuple[int, ...]) -> Optional[Any]:
+        """Most similar indexed item at or above the threshold, or None"""
+        best, best_score = None, self.threshold
+        seen = set()
+        for band, key in enumerate(band_keys(signature)):
+            for candidate, item in self._buckets[band].get(key, ()):
+                if id(item) in seen:
+                    continue
+                seen.add(id(item))
+                score = similarity(signature, candidate)
+                if score >= best_score:
+                    best, best_score = item, score
+        return best
+
+class NearDuplicateDetector:
+    def __init__(self, result_store=None, threshold: float = 0.7, min_tokens: int = MIN_TOKENS):
+        """
+        Finds posts whose text nearly matches one already analyzed (cross-posts, reposts with small
+        edits) so they can reuse its sentiment and insight
+        :param result_store: Optional ResultStore searched for stored canonical posts
+        :param threshold: Lowest estimated Jaccard similarity of word shingles treated as a near-duplicate
+        :param min_tokens: Shorter posts are always analyzed
+        """
+        self.logger = logging.getLogger(__name__)
+        self.result_store = result_store
+        self.threshold = threshold
+        self.min_tokens = min_tokens
+
+    def signature(self, post: Dict) -> Optional[Tuple[int, ...]]:
+        """MinHash of the post's content, or None if it is too short (the post itself is left untouched)"""
+        return content_signature(post.get('content'), self.min_tokens)
+
+    def session(self) -> 'DuplicateSession':
+        """Per-scrape state: canonical posts seen so far in this stream, plus the stored ones"""
+        return DuplicateSession(self)
+
+    def find_stored(self, signature: Tuple[int, ...], exclude_url: Optional[str] = None) -> Optional[Dict]:
+        if self.result_store is None:
+            return None
+        try:
+            return self.result_store.find_near_duplicate(signature, self.threshold, exclude_url)
+        except Exception as e:
+            self.logger.error(f"Stored near-duplicate lookup failed: {str(e)}")
+            return None
+
+class DuplicateSession:
+    def __init__(self, detector: NearDuplicateDetector):
+        self.detector = detector
+        self.index = MinHashIndex(detector.threshold)
+
+    def match(self, post: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Canonical post this one nearly duplicates, and whether it came from this 'stream' or the 'store'
+        Posts without a match are registered as canonical for the rest of the stream
+        """
+        with near_duplicate_seconds.time():
+            signature = self.detector.signature(post)
+            if signature is None:
+                return None, None
+            canonical = self.index.find(signature)
+            if canonical is not None and canonical.get('url') != post.get('url'):
+                return canonical, 'stream'
+            canonical = self.detector.find_stored(signature, exclude_url=post.get('url'))
+            if canonical is not None:
+                return canonical, 'store'
+            self.index.add(signature, post)
+            return None, None
+
+def as_duplicate(post: Dict, canonical: Dict, source: str) -> Dict:
+    """Copy of `post` carrying the canonical post's analysis and a link to it"""
+    near_duplicate_posts_total.inc(source=source)
+    return {
+        **post,
+        'sentiment': canonical.get('sentiment'),
+        'sentiment_score': canonical.get('sentiment_score'),
+        'insight': canonical.get('insight'),
+        'duplicate_of': canonical.get('url'),
+    }
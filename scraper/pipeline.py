@@ -0,0 +1,98 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from scraper.insights import is_fallback
+from scraper.near_duplicates import as_duplicate
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to `size` items as they arrive from an iterator"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def analyze_stream(posts: Iterable[Dict], sentiment_analyzer, gemini_analyzer, batch_size: int = 4,
+                   on_sentiment: Optional[Callable[[int], None]] = None,
+                   near_duplicates=None) -> Iterator[Dict]:
+    """
+    Analyze posts as they arrive and yield each one as soon as its insight is ready
+    :param posts: Iterator of filtered posts (e.g. straight from RedditScraper.iter_mentalhealth)
+    :param batch_size: Posts grouped per sentiment forward pass (and split into Gemini requests of
+                       gemini_analyzer.batch_size posts)
+    :param on_sentiment: Optional callback invoked with the running count of sentiment-analyzed posts
+    :param near_duplicates: Optional NearDuplicateDetector; near-duplicates of a post analyzed earlier
+                            (in this stream or stored) reuse its sentiment and insight, unless its
+                            insight is a fallback, in which case they are analyzed themselves
+    :return: Iterator of analyzed posts in completion order
+    """
+    analyzed_count = 0
+    max_workers = max(1, getattr(gemini_analyzer, 'max_workers', 1))
+    insight_batch_size = max(1, getattr(gemini_analyzer, 'batch_size', 1))
+    session = near_duplicates.session() if near_duplicates else None
+    # id() of a canonical post still waiting for its insight -> near-duplicates waiting with it
+    followers = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def analyze(analyzed_posts: List[Dict]):
+            if analyzed_posts:
+                sentiments = sentiment_analyzer.analyze_batch([post['content'] for post in analyzed_posts])
+                for analyzed_post, sentiment in zip(analyzed_posts, sentiments):
+                    analyzed_post['sentiment'] = sentiment['label']
+                    analyzed_post['sentiment_score'] = sentiment['score']
+            for group in chunked(analyzed_posts, insight_batch_size):
+                contents = [post['content'] for post in group]
+                pending[executor.submit(gemini_analyzer.generate_insight_batch, contents)] = group
+
+        for batch in chunked(posts, batch_size):
+            analyzed_posts, duplicates = [], []
+            for post in batch:
+                analyzed_post = {**post, 'sentiment': None, 'sentiment_score': None, 'insight': None}
+                canonical, source = session.match(analyzed_post) if session else (None, None)
+                if canonical is None:
+                    analyzed_posts.append(analyzed_post)
+                elif canonical['insight'] is None:
+                    followers.setdefault(id(canonical), []).append(analyzed_post)
+                elif not is_fallback(canonical['insight']):
+                    duplicates.append(as_duplicate(analyzed_post, canonical, source))
+                else:
+                    # The canonical post's insight failed; a copy of the placeholder is no analysis
+                    analyzed_posts.append(analyzed_post)
+
+            analyze(analyzed_posts)
+            analyzed_count += len(batch)
+            if on_sentiment:
+                on_sentiment(analyzed_count)
+            yield from duplicates
+
+            # Hand back whatever finished while this batch was being fetched and analyzed
+            for future in [future for future in pending if future.done()]:
+                ready, retry = _with_insights(pending.pop(future), future, followers)
+                analyze(retry)
+                yield from ready
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                ready, retry = _with_insights(pending.pop(future), future, followers)
+                analyze(retry)
+                yield from ready
+
+def _with_insights(analyzed_posts: List[Dict], future,
+                   followers: Dict[int, List[Dict]]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    :return: Posts ready to yield (with their near-duplicates), and near-duplicates whose canonical
+             post's insight failed, which still need analyzing themselves
+    """
+    ready, retry = [], []
+    for analyzed_post, insight in zip(analyzed_posts, future.result()):
+        analyzed_post['insight'] = insight
+        ready.append(analyzed_post)
+        waiting = followers.pop(id(analyzed_post), ())
+        if is_fallback(insight):
+            retry.extend(waiting)
+        else:
+            ready.extend(as_duplicate(post, analyzed_post, 'stream') for post in waiting)
+    return ready, retry
@@ -0,0 +1,105 @@
+import threading
+import time
+from typing import Optional
+from scraper.metrics import registry
+
+adaptive_concurrency_limit = registry.gauge(
+    'adaptive_concurrency_limit', 'Current AIMD concurrency limit', ['name']
+)
+adaptive_concurrency_in_flight = registry.gauge(
+    'adaptive_concurrency_in_flight', 'Calls currently holding an adaptive concurrency slot', ['name']
+)
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Thread-safe token bucket rate limiter
+        :param rate: Tokens added per second
+        :param capacity: Maximum burst size (defaults to one second worth of tokens)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until the requested number of tokens is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+class AdaptiveConcurrencyLimiter:
+    def __init__(self, name: str, max_limit: int, min_limit: int = 1, latency_tolerance: float = 2.5,
+                 backoff_ratio: float = 0.5, smoothing: float = 0.05):
+        """
+        Thread-safe concurrency limit adjusted AIMD-style: it grows by one per limit's worth of fast
+        successful calls and is cut by backoff_ratio on overload (429/503, timeouts, or latency well
+        above the smoothed average)
+        :param name: Label used in metrics
+        :param max_limit: Upper bound, and the starting limit
+        :param min_limit: Lower bound
+        :param latency_tolerance: Calls slower than this multiple of the smoothed latency count as overload
+        :param backoff_ratio: Multiplicative decrease applied on overload
+        :param smoothing: Weight of each new sample in the exponentially smoothed latency
+        """
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.smoothing = smoothing
+        self.limit = float(self.max_limit)
+        self.latency = None
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        adaptive_concurrency_limit.set(self.max_limit, name=name)
+
+    def acquire(self) -> float:
+        """
+        Block until a slot is free under the current limit
+        :return: Token to hand back to release
+        """
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+            adaptive_concurrency_in_flight.set(self._in_flight, name=self.name)
+            return time.monotonic()
+
+    def release(self, token: float, latency: Optional[float] = None, overloaded: bool = False):
+        """
+        Free a slot and adjust the limit
+        :param token: Value returned by the matching acquire
+        :param latency: Seconds taken by a successful call (None when the call failed)
+        :param overloaded: The dependency signalled overload (rate limited, unavailable, timed out)
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if latency is not None and not overloaded:
+                if self.latency is not None and latency > self.latency * self.latency_tolerance:
+                    overloaded = True
+                else:
+                    self.latency = latency if self.latency is None else \
+                        self.latency + self.smoothing * (latency - self.latency)
+            # Calls already in flight when the limit was cut report the same overload; cut once per window
+            if overloaded:
+                if token > self._last_decrease:
+                    self._last_decrease = time.monotonic()
+                    self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            elif latency is not None:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            adaptive_concurrency_limit.set(int(self.limit), name=self.name)
+            adaptive_concurrency_in_flight.set(self._in_flight, name=self.name)
+            self._condition.notify_all()
+
@@ -1,110 +1,330 @@
 import praw
+import time
+import queue
 import logging
 import re
-from typing import List, Dict
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
+from scraper.text_classifier import mod_keyword_matcher
+from scraper.metrics import registry
+
+reddit_fetch_seconds = registry.histogram(
+    'reddit_fetch_seconds', 'Time spent crawling one subreddit listing', ['listing'], timing_name='reddit'
+)
+reddit_posts_total = registry.counter('reddit_posts_total', 'Matching posts emitted by the crawler', ['listing'])
+reddit_moderator_lookup_seconds = registry.histogram(
+    'reddit_moderator_lookup_seconds', 'Time to resolve a subreddit moderator list', ['cache'],
+    timing_name='modlookup'
+)
+reddit_ratelimit_wait_seconds_total = registry.counter(
+    'reddit_ratelimit_wait_seconds_total', 'Time spent waiting for the Reddit rate-limit window to reset'
+)
+
+DEFAULT_SUBREDDITS = ['mentalhealth', 'depression', 'anxiety', 'therapy', 'CPTSD']
+LISTING_TYPES = ('hot', 'new', 'top')
+# Submissions PRAW requests per listing page
+LISTING_PAGE_SIZE = 100
 
 class RedditScraper:
-    def __init__(self, client_id: str, client_secret: str, user_agent: str):
+    def __init__(self, client_id: str, client_secret: str, user_agent: str,
+                 subreddits: Optional[List[str]] = None, listings: Optional[List[str]] = None,
+                 max_workers: int = 4, min_ratelimit_remaining: float = 10, reddit=None,
+                 reddit_factory: Optional[Callable] = None):
+        """
+        Initialize the Reddit client
+        :param subreddits: Subreddits to crawl (defaults to DEFAULT_SUBREDDITS)
+        :param listings: Listing types to read from each subreddit ('hot', 'new', 'top')
+        :param max_workers: Subreddit listings fetched in parallel (1 crawls sequentially)
+        :param min_ratelimit_remaining: Pause listing page requests while fewer requests than this remain
+        :param reddit: Pre-built praw.Reddit-compatible client (used instead of the credentials); shared by
+                       all fetch threads, so it must be thread-safe
+        :param reddit_factory: Builds the clients instead of the credentials; each concurrent fetch gets its own
+        """
         self.logger = logging.getLogger(__name__)
+        self.subreddits = list(subreddits or DEFAULT_SUBREDDITS)
+        self.listings = list(listings or ['hot'])
+        unknown = [listing for listing in self.listings if listing not in LISTING_TYPES]
+        if unknown:
+            raise ValueError(f"Unsupported listing types: {', '.join(unknown)}")
+        self.max_workers = max_workers
+        self.min_ratelimit_remaining = min_ratelimit_remaining
+        self._moderator_cache = {}
+        self._moderator_lock = threading.Lock()
+
+        if reddit is not None:
+            self.reddit = reddit
+            return
+        factory = reddit_factory or (lambda: praw.Reddit(
+            client_id=client_id,
+            client_secret=client_secret,
+            user_agent=user_agent
+        ))
         try:
-            self.reddit = praw.Reddit(
-                client_id=client_id,
-                client_secret=client_secret,
-                user_agent=user_agent
-            )
+            self.reddit = factory()
             self.logger.info("Reddit API initialized successfully")
         except Exception as e:
             self.logger.error(f"Reddit API initialization failed: {str(e)}")
             raise
+        self._reddit_factory = factory
+        self._idle_clients.put(self._reddit)
 
-    def scrape_mentalhealth(self, keywords: List[str], limit: int = 10) -> List[Dict]:
+    @property
+    def reddit(self):
+        return self._reddit
+
+    @reddit.setter
+    def reddit(self, client):
+        """Use a pre-built client for every fetch from now on, in place of the per-thread clients"""
+        self._reddit = client
+        self._reddit_factory = None
+        self._idle_clients = queue.LifoQueue()
+
+    @contextmanager
+    def _client(self):
+        """
+        A client for the calling thread's exclusive use: praw.Reddit instances, and the rate-limit state
+        prawcore keeps in them, are not thread-safe. Clients are reused across fetches; a new one is built
+        only when every existing one is busy.
+        """
+        if self._reddit_factory is None:
+            yield self._reddit
+            return
+        try:
+            client = self._idle_clients.get_nowait()
+        except queue.Empty:
+            client = self._reddit_factory()
+        try:
+            yield client
+        finally:
+            self._idle_clients.put(client)
+
+    def scrape_mentalhealth(self, keywords: List[str], limit: int = 10,
+                            subreddits: Optional[List[str]] = None,
+                            listings: Optional[List[str]] = None) -> List[Dict]:
         """Scrape mental health related posts from Reddit based on keywords"""
+        return list(self.iter_mentalhealth(keywords, limit, subreddits, listings))
+
+    def iter_mentalhealth(self, keywords: List[str], limit: int = 10,
+                          subreddits: Optional[List[str]] = None,
+                          listings: Optional[List[str]] = None,
+                          exclude_urls: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """
+        Yield matching posts as soon as they are fetched, stopping after `limit` posts
+        :param exclude_urls: Post URLs the caller already has; these are skipped and not counted
+        """
         if not self.reddit:
             self.logger.warning("Reddit API not initialized - skipping scrape")
-            return []
+            return
 
-        results = []
-        subreddits = ['mentalhealth', 'depression', 'anxiety', 'therapy', 'CPTSD']
-        
+        subreddits = subreddits or self.subreddits
+        listings = listings or self.listings
+        tasks = [(sub, listing) for sub in subreddits for listing in listings]
+        found = queue.Queue()
+        state = {
+            'count': 0,
+            'seen': set(exclude_urls or ()),
+            'lock': threading.Lock(),
+            'stop': threading.Event(),
+            'emit': found.put,
+        }
+        done = object()
+
+        def crawl_all():
+            try:
+                if self.max_workers <= 1 or len(tasks) == 1:
+                    for sub, listing in tasks:
+                        if state['stop'].is_set():
+                            break
+                        self._crawl_listing(sub, listing, keywords, limit, state)
+                else:
+                    with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+                        futures = [
+                            executor.submit(self._crawl_listing, sub, listing, keywords, limit, state)
+                            for sub, listing in tasks
+                        ]
+                        for future in futures:
+                            future.result()
+            except Exception as e:
+                self.logger.error(f"Reddit scraping error: {str(e)}")
+            finally:
+                found.put(done)
+
+        crawler = threading.Thread(target=crawl_all, name='reddit-crawl', daemon=True)
+        crawler.start()
         try:
-            for sub in subreddits:
-                subreddit = self.reddit.subreddit(sub)
-                moderators = self._get_moderators(subreddit)
-                
-                for submission in subreddit.hot(limit=limit * 3):
-                    if len(results) >= limit:
+            while True:
+                post = found.get()
+                if post is done:
+                    break
+                yield post
+        finally:
+            # Consumer stopped early or crawl finished: release any workers still fetching
+            state['stop'].set()
+
+    def _crawl_listing(self, sub: str, listing: str, keywords: List[str], limit: int, state: Dict):
+        """Collect matching posts from one subreddit listing until the shared limit is reached"""
+        if state['stop'].is_set():
+            return
+
+        with self._client() as reddit, reddit_fetch_seconds.time(listing=listing):
+            self._fetch_listing(reddit, sub, listing, keywords, limit, state)
+
+    def _fetch_listing(self, reddit, sub: str, listing: str, keywords: List[str], limit: int, state: Dict):
+        subreddit = reddit.subreddit(sub)
+        moderators = self._get_moderators(subreddit)
+
+        for submission in self._paged(reddit, getattr(subreddit, listing)(limit=limit * 3), state['stop']):
+            if state['stop'].is_set():
+                break
+
+            if not submission.author:
+                continue
+
+            if self._is_moderator_post(submission, moderators, sub):
+                continue
+
+            content = f"{submission.title}\n\n{submission.selftext}"
+            if any(kw.lower() in content.lower() for kw in keywords):
+                post = self._to_post(submission, sub)
+                with state['lock']:
+                    if state['count'] >= limit:
+                        state['stop'].set()
                         break
-                        
-                    if not submission.author:
-                        continue
-                        
-                    if self._is_moderator_post(submission, moderators, sub):
+                    if post['url'] in state['seen']:
                         continue
-                        
-                    content = f"{submission.title}\n\n{submission.selftext}"
-                    if any(kw.lower() in content.lower() for kw in keywords):
-                        results.append({
-                            'source': 'reddit',
-                            'subreddit': sub,
-                            'title': submission.title,
-                            'content': content,
-                            'author': submission.author.name,
-                            'date': datetime.utcfromtimestamp(submission.created_utc).isoformat(),
-                            'url': f"https://reddit.com{submission.permalink}",
-                            'upvotes': submission.score,
-                            'comments': submission.num_comments,
-                            'is_moderator': False
-                        })
-                        
-        except Exception as e:
-            self.logger.error(f"Reddit scraping error: {str(e)}")
+                    state['seen'].add(post['url'])
+                    state['count'] += 1
+                    state['emit'](post)
+                    reddit_posts_total.inc(listing=listing)
+                    if state['count'] >= limit:
+                        state['stop'].set()
+                        break
+
+    def fetch_new_posts(self, sub: str, watermark: Optional[Dict] = None,
+                        limit: int = 100) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        Fetch submissions newer than a watermark from a subreddit's 'new' listing
+        :param watermark: {'created_utc', 'submission_id'} of the newest submission already seen, or None
+        :param limit: Submissions read when there is no watermark yet; with one, the listing is paged until
+                      the watermark is reached (Reddit serves at most about 1000 submissions per listing)
+        :return: (non-moderator posts, newest-first; watermark to store, or the given one if nothing is newer)
+        """
+        if not self.reddit:
+            self.logger.warning("Reddit API not initialized - skipping incremental fetch")
+            return [], watermark
+
+        posts = []
+        newest = watermark
+        reached = watermark is None
+        read = 0
+        with self._client() as reddit, reddit_fetch_seconds.time(listing='new'):
+            subreddit = reddit.subreddit(sub)
+            moderators = self._get_moderators(subreddit)
+            listing = subreddit.new(limit=None if watermark else limit)
+            for submission in self._paged(reddit, listing, threading.Event()):
+                if watermark and (submission.id == watermark.get('submission_id') or
+                                  submission.created_utc < watermark['created_utc']):
+                    reached = True
+                    break  # The listing is newest-first, so everything from here on was seen before
+                read += 1
+                if newest is watermark:
+                    newest = {'created_utc': submission.created_utc, 'submission_id': submission.id}
+                if not submission.author or self._is_moderator_post(submission, moderators, sub):
+                    continue
+                posts.append(self._to_post(submission, sub))
+                reddit_posts_total.inc(listing='new')
+        if not reached:
+            # Nothing older can be listed, so the submissions in between are lost whatever we do
+            self.logger.warning(f"r/{sub}: the 'new' listing ended after {read} submissions without reaching the "
+                                f"watermark ({watermark['submission_id']}); older new submissions were missed")
+        return posts, newest
+
+    @staticmethod
+    def _to_post(submission, sub: str) -> Dict:
+        return {
+            'source': 'reddit',
+            'subreddit': sub,
+            'title': submission.title,
+            'content': f"{submission.title}\n\n{submission.selftext}",
+            'author': submission.author.name,
+            'date': datetime.utcfromtimestamp(submission.created_utc).isoformat(),
+            'url': f"https://reddit.com{submission.permalink}",
+            'upvotes': submission.score,
+            'comments': submission.num_comments,
+            'is_moderator': False
+        }
+
+    def _paged(self, reddit, submissions: Iterable, stop: threading.Event) -> Iterator:
+        """Iterate a listing, checking the rate-limit budget before each page PRAW requests"""
+        iterator = iter(submissions)
+        fetched = 0
+        while not stop.is_set():
+            if fetched % LISTING_PAGE_SIZE == 0:
+                self._wait_for_ratelimit(reddit, stop)
+            try:
+                submission = next(iterator)
+            except StopIteration:
+                return
+            fetched += 1
+            yield submission
+
+    def _wait_for_ratelimit(self, reddit, stop: threading.Event):
+        """Hold off the next listing page while PRAW reports the rate-limit budget is nearly spent"""
+        auth = getattr(reddit, 'auth', None)
+        limits = getattr(auth, 'limits', None) or {}
+        remaining = limits.get('remaining')
+        reset_timestamp = limits.get('reset_timestamp')
+        if remaining is None or reset_timestamp is None or remaining >= self.min_ratelimit_remaining:
+            return
+        delay = max(0.0, reset_timestamp - time.time())
+        self.logger.info(f"Reddit rate limit nearly exhausted ({remaining} left), waiting {delay:.1f}s")
+        reddit_ratelimit_wait_seconds_total.inc(delay)
+        stop.wait(delay)
 
-        return results
-        
     def _is_moderator_post(self, submission, moderators, subreddit_name):
         """Comprehensive check for moderator posts"""
         # Check if author is in moderator list
         if submission.author and submission.author.name in moderators:
             return True
-        
+
         # Check flair for MOD indicators
         if hasattr(submission, 'author_flair_text') and submission.author_flair_text:
             flair_text = submission.author_flair_text.lower()
             if 'mod' in flair_text or 'moderator' in flair_text:
                 return True
-        
+
         # Check CSS class for MOD indicators
         if hasattr(submission, 'author_flair_css_class') and submission.author_flair_css_class:
             if 'mod' in submission.author_flair_css_class.lower():
                 return True
-        
+
         # Check if post is stickied or distinguished
         if submission.stickied or getattr(submission, 'distinguished', None):
             return True
-        
+
         # Check title and content for MOD-related terms
-        mod_keywords = [
-            'moderator', 'mod ', 'mods ', 'modding', 'moderation',
-            'rules', 'rule', 'announcement', 'official', 'meta',
-            'welcome', 'introduction', 'guideline', 'reminder', 'update'
-        ]
-        content = f"{submission.title}\n{submission.selftext}".lower()
-        return any(keyword in content for keyword in mod_keywords)
-        
+        return mod_keyword_matcher.matches_any(f"{submission.title}\n{submission.selftext}")
+
     def _get_moderators(self, subreddit) -> List[str]:
         """Get list of moderator usernames for a subreddit with caching"""
-        if not hasattr(self, '_moderator_cache'):
-            self._moderator_cache = {}
-            
         sub_name = subreddit.display_name
-        
-        if sub_name not in self._moderator_cache:
-            try:
-                self._moderator_cache[sub_name] = [mod.name for mod in subreddit.moderator()]
-                self.logger.info(f"Retrieved and cached {len(self._moderator_cache[sub_name])} moderators for r/{sub_name}")
-            except Exception as e:
-                self.logger.error(f"Failed to get moderators for r/{sub_name}: {str(e)}")
-                self._moderator_cache[sub_name] = []
-        
-        return self._moderator_cache[sub_name]
\ No newline at end of file
+
+        with self._moderator_lock:
+            if sub_name in self._moderator_cache:
+                reddit_moderator_lookup_seconds.observe(0, cache='hit')
+                return self._moderator_cache[sub_name]
+
+        try:
+            with reddit_moderator_lookup_seconds.time(cache='miss'):
+                moderators = [mod.name for mod in subreddit.moderator()]
+            self.logger.info(f"Retrieved and cached {len(moderators)} moderators for r/{sub_name}")
+        except Exception as e:
+            self.logger.error(f"Failed to get moderators for r/{sub_name}: {str(e)}")
+            moderators = []
+
+        with self._moderator_lock:
+            self._moderator_cache[sub_name] = moderators
+        return moderators
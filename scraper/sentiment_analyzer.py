@@ -1,19 +1,127 @@
-from transformers import pipeline
-from typing import Dict
+from typing import Callable, Dict, List, Optional
+import time
 import logging
+from scraper.analysis_cache import AnalysisCache
+from scraper.model_manager import ModelManager
+from scraper.metrics import registry
+from scraper.inference_server import InferenceClient
+
+NEUTRAL_RESULT = {'label': 'NEUTRAL', 'score': 0.5}
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+# After the inference service fails, use the in-process model for this long before trying it again
+SERVICE_RETRY_SECONDS = 30
+
+sentiment_batch_seconds = registry.histogram(
+    'sentiment_batch_seconds', 'Sentiment model forward pass time per batch', ['backend'], timing_name='sentiment'
+)
+sentiment_item_seconds = registry.histogram(
+    'sentiment_item_seconds', 'Sentiment model time per text (batch time divided by batch size)', ['backend']
+)
 
 class SentimentAnalyzer:
-    def __init__(self, model_name: str = "distilbert-base-uncased-finetuned-sst-2-english"):
+    def __init__(self, model_name: str = "distilbert-base-uncased-finetuned-sst-2-english",
+                 cache: Optional[AnalysisCache] = None, lazy: bool = True, backend: str = 'pytorch',
+                 service_socket: Optional[str] = None):
         """
         Initialize sentiment analysis pipeline
         :param model_name: HuggingFace model to use (default is a lightweight sentiment model)
+        :param cache: Optional per-post analysis cache consulted before running the model
+        :param lazy: Defer importing transformers and loading the model until first use
+        :param backend: 'pytorch' (full precision), 'quantized' (int8 dynamic quantization of the
+                        linear layers) or 'onnx' (ONNX Runtime, requires optimum[onnxruntime])
+        :param service_socket: Unix socket of a shared inference service (python -m scraper.inference_server);
+                               texts are sent there, and the in-process model is only loaded if it is unavailable
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown sentiment backend: {backend}")
+        self.model_name = model_name
+        self.backend = backend
+        # Backends can disagree on borderline texts, so each caches its results separately
+        self.model_version = model_name if backend == 'pytorch' else f"{model_name}:{backend}"
+        self.cache = cache
+        self.model = ModelManager(f"sentiment model {self.model_version}", self._load_pipeline)
+        self.service = InferenceClient(service_socket) if service_socket else None
+        self._service_retry_at = 0.0
+        if not lazy:
+            self.load()
+
+    def _load_pipeline(self):
+        # Imported here so that importing the app does not pull in transformers/torch
+        from transformers import pipeline, AutoTokenizer
+
+        if self.backend == 'quantized':
+            import torch
+            from transformers import AutoModelForSequenceClassification
+            model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            nlp = pipeline("sentiment-analysis", model=model,
+                           tokenizer=AutoTokenizer.from_pretrained(self.model_name))
+        elif self.backend == 'onnx':
+            try:
+                from optimum.onnxruntime import ORTModelForSequenceClassification
+            except ImportError as e:
+                raise ImportError(
+                    "The onnx sentiment backend requires optimum[onnxruntime] (pip install optimum[onnxruntime])"
+                ) from e
+            model = ORTModelForSequenceClassification.from_pretrained(self.model_name, export=True)
+            nlp = pipeline("sentiment-analysis", model=model,
+                           tokenizer=AutoTokenizer.from_pretrained(self.model_name))
+        else:
+            nlp = pipeline("sentiment-analysis", model=self.model_name)
+
+        logging.info(f"Sentiment analyzer initialized successfully ({self.backend} backend)")
+        return nlp
+
+    @property
+    def nlp(self):
+        return self.model.get()
+
+    def load(self):
+        """Load the model weights now (e.g. in the gunicorn master before workers fork)"""
+        self.model.get()
+
+    def warm_up(self, background: bool = False):
+        """Load the model and run one inference so the first request does not pay for it"""
+        if self.service_available():
+            return
+        self.model.warm_up(probe=lambda nlp: nlp("warm up"), background=background)
+
+    @property
+    def ready(self) -> bool:
+        """Whether texts can be analyzed without waiting for a model to load"""
+        return self.model.ready or self.service_available()
+
+    def service_available(self) -> bool:
+        """Ping the inference service (if configured), noting a model mismatch"""
+        if self.service is None or time.monotonic() < self._service_retry_at:
+            return False
         try:
-            self.nlp = pipeline("sentiment-analysis", model=model_name)
-            logging.info("Sentiment analyzer initialized successfully")
-        except Exception as e:
-            logging.error(f"Failed to initialize sentiment analyzer: {str(e)}")
-            raise
+            status = self.service.ping()
+        except (OSError, ValueError) as e:
+            self._service_failed(e)
+            return False
+        if status.get('model_version') != self.model_version:
+            logging.warning(f"Inference service runs {status.get('model_version')}, expected {self.model_version}")
+        return True
+
+    def _service_failed(self, error: Exception):
+        logging.warning(f"Sentiment inference service unavailable, using the in-process model: {str(error)}")
+        self._service_retry_at = time.monotonic() + SERVICE_RETRY_SECONDS
+
+    def _infer(self, texts: List[str]) -> List[Dict]:
+        """Run the model on texts, through the inference service when it is reachable"""
+        start = time.perf_counter()
+        if self.service is not None and time.monotonic() >= self._service_retry_at:
+            try:
+                outputs = self.service.analyze(texts)
+                self._observe(time.perf_counter() - start, len(texts), 'service')
+                return outputs
+            except (OSError, ValueError) as e:
+                self._service_failed(e)
+                start = time.perf_counter()
+        outputs = self.nlp(texts, batch_size=len(texts), truncation=True)
+        self._observe(time.perf_counter() - start, len(texts), self.backend)
+        return outputs
 
     def analyze_text(self, text: str) -> Dict:
         """
@@ -22,16 +130,92 @@ class SentimentAnalyzer:
         :return: Dictionary with 'label' and 'score' keys
         """
         if not text:
-            return {'label': 'NEUTRAL', 'score': 0.5}
+            return dict(NEUTRAL_RESULT)
         
         try:
             # Process text (limit to first 512 characters due to model constraints)
             processed_text = text[:512]
-            result = self.nlp(processed_text)[0]  # Get first result
-            return {
+            cached = self._cache_get(processed_text)
+            if cached is not None:
+                return cached
+
+            result = self._infer([processed_text])[0]  # Get first result
+            sentiment = {
                 'label': result['label'],
                 'score': result['score']
             }
+            self._cache_set(processed_text, sentiment)
+            return sentiment
         except Exception as e:
             logging.error(f"Sentiment analysis failed: {str(e)}")
-            return {'label': 'NEUTRAL', 'score': 0.5}
+            return dict(NEUTRAL_RESULT)
+
+    def analyze_batch(self, texts: List[str], batch_size: int = 16,
+                      on_progress: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """
+        Analyze sentiment for many texts with batched forward passes
+        :param texts: Texts to analyze
+        :param batch_size: Maximum number of texts per forward pass
+        :param on_progress: Optional callback invoked with the number of texts analyzed so far
+        :return: List of dictionaries with 'label' and 'score' keys, in input order
+        """
+        results = [dict(NEUTRAL_RESULT) for _ in texts]
+        processed = {}
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            cached = self._cache_get(text[:512])
+            if cached is not None:
+                results[i] = cached
+            else:
+                processed[i] = text[:512]
+        if not processed:
+            if on_progress:
+                on_progress(len(texts))
+            return results
+
+        # Sort by token count so each batch pads to a similar length
+        indices = list(processed)
+        lengths = self._token_lengths([processed[i] for i in indices])
+        order = [i for _, i in sorted(zip(lengths, indices))]
+
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            try:
+                outputs = self._infer([processed[i] for i in chunk])
+                for i, output in zip(chunk, outputs):
+                    results[i] = {'label': output['label'], 'score': output['score']}
+                    self._cache_set(processed[i], results[i])
+            except Exception as e:
+                logging.error(f"Batched sentiment analysis failed, retrying per item: {str(e)}")
+                for i in chunk:
+                    results[i] = self.analyze_text(processed[i])
+            if on_progress:
+                on_progress(len(texts) - len(order) + min(start + batch_size, len(order)))
+
+        return results
+
+    @staticmethod
+    def _observe(seconds: float, batch_size: int, backend: str):
+        sentiment_batch_seconds.observe(seconds, backend=backend)
+        for _ in range(batch_size):
+            sentiment_item_seconds.observe(seconds / batch_size, backend=backend)
+
+    def _cache_get(self, processed_text: str) -> Optional[Dict]:
+        if self.cache is None:
+            return None
+        return self.cache.get(AnalysisCache.make_key('sentiment', self.model_version, processed_text))
+
+    def _cache_set(self, processed_text: str, sentiment: Dict):
+        if self.cache is not None:
+            self.cache.set(AnalysisCache.make_key('sentiment', self.model_version, processed_text), sentiment)
+
+    def _token_lengths(self, texts: List[str]) -> List[int]:
+        """Number of tokens the model will see for each text (falls back to character count)"""
+        if self.service is not None and not self.model.ready:
+            # Don't load a tokenizer just for sorting; the service sorts its own batches
+            return [len(text) for text in texts]
+        try:
+            return [len(ids) for ids in self.nlp.tokenizer(texts, truncation=True)['input_ids']]
+        except Exception:
+            return [len(text) for text in texts]
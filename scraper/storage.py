@@ -0,0 +1,749 @@
+import os
+import re
+import sys
+import json
+import base64
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from scraper.text_classifier import is_mod_post
+from scraper.aggregates import AggregateCounters, sentiment_bucket
+from scraper.metrics import json_io_seconds
+from scraper.insights import FALLBACK_PREFIX
+from scraper.near_duplicates import band_keys, content_signature, pack_signature, similarity, unpack_signature
+
+# Post fields stored in their own columns; anything else round-trips through `extra`
+POST_COLUMNS = [
+    'source', 'subreddit', 'title', 'content', 'author', 'date', 'url',
+    'upvotes', 'comments', 'is_moderator', 'mod_flagged', 'sentiment', 'sentiment_score', 'insight',
+    'duplicate_of'
+]
+
+# Sortable fields for list_posts, with NULL-free expressions so keyset cursors compare cleanly
+SORT_EXPRESSIONS = {
+    'date': "COALESCE(p.date, '')",
+    'upvotes': "COALESCE(p.upvotes, 0)",
+    'comments': "COALESCE(p.comments, 0)",
+    'sentiment_score': "COALESCE(p.sentiment_score, 0)",
+}
+
+# Columns added after the first release, applied to existing databases on open
+MIGRATIONS = {
+    ('posts', 'mod_flagged'): "ALTER TABLE posts ADD COLUMN mod_flagged INTEGER",
+    ('queries', 'summary'): "ALTER TABLE queries ADD COLUMN summary TEXT",
+    ('posts', 'duplicate_of'): "ALTER TABLE posts ADD COLUMN duplicate_of TEXT",
+    ('posts', 'minhash'): "ALTER TABLE posts ADD COLUMN minhash BLOB",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    permalink TEXT NOT NULL UNIQUE,
+    source TEXT,
+    subreddit TEXT,
+    title TEXT,
+    content TEXT,
+    author TEXT,
+    date TEXT,
+    url TEXT,
+    upvotes INTEGER,
+    comments INTEGER,
+    is_moderator INTEGER NOT NULL DEFAULT 0,
+    mod_flagged INTEGER,
+    sentiment TEXT,
+    sentiment_score REAL,
+    insight TEXT,
+    duplicate_of TEXT,
+    extra TEXT,
+    stored_at REAL NOT NULL,
+    minhash BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_posts_subreddit ON posts(subreddit);
+CREATE INDEX IF NOT EXISTS idx_posts_date ON posts(date);
+CREATE INDEX IF NOT EXISTS idx_posts_sentiment ON posts(sentiment);
+
+CREATE TABLE IF NOT EXISTS queries (
+    id INTEGER PRIMARY KEY,
+    query_key TEXT NOT NULL,
+    keywords TEXT,
+    post_limit INTEGER,
+    created_at REAL NOT NULL,
+    summary TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_queries_key ON queries(query_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_queries_created ON queries(created_at);
+
+CREATE TABLE IF NOT EXISTS query_posts (
+    query_id INTEGER NOT NULL REFERENCES queries(id) ON DELETE CASCADE,
+    post_id INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (query_id, post_id)
+);
+CREATE INDEX IF NOT EXISTS idx_query_posts_post ON query_posts(post_id);
+
+CREATE TABLE IF NOT EXISTS imported_files (
+    filename TEXT PRIMARY KEY,
+    imported_at REAL NOT NULL
+);
+
+-- MinHash LSH band keys of canonical posts, so near-duplicates are found by exact key lookups
+CREATE TABLE IF NOT EXISTS minhash_bands (
+    band INTEGER NOT NULL,
+    band_key INTEGER NOT NULL,
+    post_id INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    PRIMARY KEY (band, band_key, post_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS crawl_watermarks (
+    subreddit TEXT PRIMARY KEY,
+    created_utc REAL NOT NULL,
+    submission_id TEXT,
+    updated_at REAL NOT NULL
+);
+
+-- Background scrape jobs, so whichever server process receives a poll can report on them
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    job_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    state TEXT NOT NULL,
+    pid INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+"""
+
+# Trigram full-text index over post text, kept in sync by triggers; trigram matching gives the same
+# case-insensitive substring semantics as the scraper's keyword filter (for terms of 3+ characters)
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, content, content='posts', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts
+WHEN old.title IS NOT new.title OR old.content IS NOT new.content BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+"""
+
+# A single counter bumped by every change to the tables responses are built from; HTTP caching
+# (ETag / Last-Modified) and the dashboard fragment cache key on it
+DATA_VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+INSERT OR IGNORE INTO data_version (id, version, updated_at) VALUES (1, 0, (julianday('now') - 2440587.5) * 86400.0);
+""" + "".join(f"""
+CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+    UPDATE data_version SET version = version + 1, updated_at = (julianday('now') - 2440587.5) * 86400.0;
+END;""" for table in ('posts', 'queries', 'query_posts') for event in ('INSERT', 'UPDATE', 'DELETE'))
+
+class ResultStore:
+    def __init__(self, path: str = "data/results.db"):
+        """
+        SQLite-backed store for analyzed posts and the queries that returned them
+        :param path: Database file (opened in WAL mode, one connection per thread)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self._local = threading.local()
+        if hasattr(os, 'register_at_fork'):
+            # SQLite connections must not be shared with a forked child (e.g. gunicorn --preload)
+            os.register_at_fork(after_in_child=self.reset_after_fork)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.aggregates = AggregateCounters()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.executescript(DATA_VERSION_SCHEMA)
+        for (table, column), statement in MIGRATIONS.items():
+            if column not in {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(statement)
+        self.aggregates.create_schema(conn)
+        conn.commit()
+        self.fts_enabled = self._create_fts(conn)
+
+        # Databases created before the counters existed get them built once
+        if not conn.execute("SELECT 1 FROM daily_counts LIMIT 1").fetchone() and \
+                conn.execute("SELECT 1 FROM posts LIMIT 1").fetchone():
+            self.rebuild_aggregates()
+
+    def reset_after_fork(self):
+        self._local = threading.local()
+
+    def _create_fts(self, conn: sqlite3.Connection) -> bool:
+        """Create the full-text index (indexing existing posts once); False if SQLite lacks FTS5 trigrams"""
+        existed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'").fetchone()
+        try:
+            with conn:
+                conn.executescript(FTS_SCHEMA)
+                if not existed:
+                    conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            self.logger.warning(f"Full-text index unavailable, falling back to LIKE scans: {str(e)}")
+            return False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def permalink_for(post: Dict) -> str:
+        """Deduplication key for a post (its Reddit URL, or a content hash when missing)"""
+        if post.get('url'):
+            return post['url']
+        digest = hashlib.sha1(f"{post.get('title', '')}\n{post.get('content', '')}".encode('utf-8')).hexdigest()
+        return f"content:{digest}"
+
+    def upsert_posts(self, posts: Iterable[Dict]) -> List[int]:
+        """Insert or update posts by permalink, returning their row ids in input order"""
+        conn = self._connect()
+        with conn:
+            return [self._upsert_post(conn, post) for post in posts]
+
+    def _upsert_post(self, conn: sqlite3.Connection, post: Dict) -> int:
+        permalink = self.permalink_for(post)
+        old_row = conn.execute("SELECT * FROM posts WHERE permalink = ?", (permalink,)).fetchone()
+        values = [post.get(column) for column in POST_COLUMNS]
+        values[POST_COLUMNS.index('is_moderator')] = int(bool(post.get('is_moderator', False)))
+        if post.get('mod_flagged') is not None:
+            values[POST_COLUMNS.index('mod_flagged')] = int(bool(post['mod_flagged']))
+        extra = {k: v for k, v in post.items() if k not in POST_COLUMNS and k != 'id'}
+        if extra:
+            with json_io_seconds.time(operation='dump', source='posts'):
+                extra = json.dumps(extra)
+        # Derived here rather than carried on the post, so API payloads never include it
+        signature = content_signature(post.get('content'))
+        assignments = ', '.join(f"{column} = excluded.{column}" for column in POST_COLUMNS)
+        conn.execute(
+            f"INSERT INTO posts (permalink, {', '.join(POST_COLUMNS)}, extra, stored_at, minhash) "
+            f"VALUES (?, {', '.join('?' for _ in POST_COLUMNS)}, ?, ?, ?) "
+            f"ON CONFLICT(permalink) DO UPDATE SET {assignments}, extra = excluded.extra, "
+            f"minhash = COALESCE(excluded.minhash, posts.minhash)",
+            [permalink, *values, extra or None, time.time(), pack_signature(signature) if signature else None]
+        )
+        new_row = conn.execute("SELECT * FROM posts WHERE permalink = ?", (permalink,)).fetchone()
+        if signature:
+            # Only canonical posts are matched against, so duplicates get no band keys
+            conn.execute("DELETE FROM minhash_bands WHERE post_id = ?", (new_row['id'],))
+            if not post.get('duplicate_of'):
+                conn.executemany(
+                    "INSERT INTO minhash_bands (band, band_key, post_id) VALUES (?, ?, ?)",
+                    [(band, key, new_row['id']) for band, key in enumerate(band_keys(signature))]
+                )
+        self.aggregates.apply(
+            conn, self._row_to_post(old_row) if old_row else None, self._row_to_post(new_row)
+        )
+        return new_row['id']
+
+    def save_query(self, query_key: str, keywords: List[str], limit: Optional[int], posts: List[Dict],
+                   created_at: Optional[float] = None) -> int:
+        """Store posts and record a query that references them, returning the query id"""
+        conn = self._connect()
+        with conn:
+            post_ids = [self._upsert_post(conn, post) for post in posts]
+        return self.record_query(query_key, keywords, limit, post_ids, created_at)
+
+    def record_query(self, query_key: str, keywords: List[str], limit: Optional[int], post_ids: List[int],
+                     created_at: Optional[float] = None) -> int:
+        """Record a query over posts that are already stored, returning the query id"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO queries (query_key, keywords, post_limit, created_at) VALUES (?, ?, ?, ?)",
+                (query_key, ','.join(keywords or []), limit, created_at or time.time())
+            )
+            query_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO query_posts (query_id, post_id, position) VALUES (?, ?, ?)",
+                [(query_id, post_id, position) for position, post_id in enumerate(post_ids)]
+            )
+            self._refresh_query_summary(conn, query_id)
+        return query_id
+
+    def _refresh_query_summary(self, conn: sqlite3.Connection, query_id: int):
+        """Store a query's post count and sentiment counts so cache hits need not load its posts"""
+        rows = conn.execute(
+            "SELECT p.sentiment, COUNT(*) AS n FROM query_posts qp JOIN posts p ON p.id = qp.post_id "
+            "WHERE qp.query_id = ? AND COALESCE(p.mod_flagged, 0) = 0 GROUP BY p.sentiment", (query_id,)
+        ).fetchall()
+        sentiment_counts = {'positive': 0, 'negative': 0, 'neutral': 0}
+        for row in rows:
+            sentiment_counts[sentiment_bucket(row['sentiment'])] += row['n']
+        summary = {'count': sum(sentiment_counts.values()), 'sentiment_counts': sentiment_counts}
+        with json_io_seconds.time(operation='dump', source='query_summary'):
+            encoded = json.dumps(summary)
+        conn.execute("UPDATE queries SET summary = ? WHERE id = ?", (encoded, query_id))
+
+    def get_query_summary(self, query_key: str) -> Optional[Dict]:
+        """Summary of the most recent query saved under a key, or None if the key is unknown"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT id, summary FROM queries WHERE query_key = ? ORDER BY created_at DESC LIMIT 1", (query_key,)
+        ).fetchone()
+        if not row:
+            return None
+        if row['summary'] is None:
+            with conn:
+                self._refresh_query_summary(conn, row['id'])
+            return self.get_query_summary(query_key)
+        with json_io_seconds.time(operation='load', source='query_summary'):
+            summary = json.loads(row['summary'])
+        return {'query_id': row['id'], **summary}
+
+    def aggregate_summary(self, since: Optional[str] = None, until: Optional[str] = None,
+                          top_keywords: int = 5) -> Dict:
+        """Sentiment, keyword and subreddit totals across all stored posts within a day window"""
+        return self.aggregates.summary(self._connect(), since, until, top_keywords)
+
+    def daily_counts(self, dimension: str, since: Optional[str] = None) -> Dict[str, Dict]:
+        return self.aggregates.daily(self._connect(), dimension, since)
+
+    def rebuild_aggregates(self):
+        """Recompute the aggregate counters from every stored post"""
+        conn = self._connect()
+        rows = conn.execute("SELECT * FROM posts")
+        with conn:
+            self.aggregates.rebuild(conn, (self._row_to_post(row) for row in rows))
+
+    def find_query_id(self, query_key: str) -> Optional[int]:
+        """Id of the most recent query saved under a key, or None if the key is unknown"""
+        row = self._connect().execute(
+            "SELECT id FROM queries WHERE query_key = ? ORDER BY created_at DESC LIMIT 1", (query_key,)
+        ).fetchone()
+        return row['id'] if row else None
+
+    def get_query_posts(self, query_key: str) -> Optional[List[Dict]]:
+        """Posts of the most recent query saved under a key, or None if the key is unknown"""
+        query_id = self.find_query_id(query_key)
+        return self.posts_for_query(query_id) if query_id is not None else None
+
+    def latest_query(self) -> Optional[Dict]:
+        """Most recently saved query"""
+        row = self._connect().execute(
+            "SELECT * FROM queries ORDER BY created_at DESC LIMIT 1"
+        ).fetchone()
+        return dict(row) if row else None
+
+    def posts_for_query(self, query_id: int, limit: int = -1) -> List[Dict]:
+        rows = self._connect().execute(
+            "SELECT p.* FROM query_posts qp JOIN posts p ON p.id = qp.post_id "
+            "WHERE qp.query_id = ? ORDER BY qp.position LIMIT ?", (query_id, limit)
+        ).fetchall()
+        return [self._row_to_post(row) for row in rows]
+
+    def query_ids(self, query_key: Optional[str] = None) -> List[int]:
+        """Ids of saved queries, optionally restricted to one query key"""
+        if query_key:
+            rows = self._connect().execute("SELECT id FROM queries WHERE query_key = ?", (query_key,))
+        else:
+            rows = self._connect().execute("SELECT id FROM queries")
+        return [row['id'] for row in rows]
+
+    def unlink_posts(self, query_id: int, post_ids: List[int]) -> int:
+        """Remove posts from a saved query (the posts themselves are kept)"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.executemany(
+                "DELETE FROM query_posts WHERE query_id = ? AND post_id = ?",
+                [(query_id, post_id) for post_id in post_ids]
+            )
+            self._refresh_query_summary(conn, query_id)
+        return cursor.rowcount
+
+    def list_posts(self, query_id: Optional[int] = None, sentiment: Optional[str] = None,
+                   subreddit: Optional[str] = None, source: Optional[str] = None, text: Optional[str] = None,
+                   since: Optional[str] = None, until: Optional[str] = None,
+                   sort: str = '-date', size: int = 50, cursor: Optional[str] = None,
+                   offset: int = 0) -> Dict:
+        """
+        Filtered, sorted page of stored posts (moderator-flagged posts are excluded)
+        :param query_id: Only posts returned by this saved query
+        :param sentiment: POSITIVE, NEGATIVE or NEUTRAL
+        :param text: Case-insensitive substring of the title or content
+        :param since: Only posts dated at or after this ISO timestamp (or YYYY-MM-DD day)
+        :param until: Only posts dated before this ISO timestamp
+        :param sort: Field from SORT_EXPRESSIONS, prefixed with '-' for descending order
+        :param cursor: Opaque cursor from a previous page (takes precedence over offset)
+        :return: Dictionary with 'posts', 'next_cursor' and 'total'
+        """
+        descending = sort.startswith('-')
+        field = sort.lstrip('-')
+        if field not in SORT_EXPRESSIONS:
+            raise ValueError(f"Unsupported sort field: {field}")
+        order_expr = SORT_EXPRESSIONS[field]
+
+        joins, conditions, params = self._post_filters(
+            query_id=query_id, sentiment=sentiment, subreddits=[subreddit] if subreddit else None,
+            source=source, text=text, since=since, until=until
+        )
+
+        conn = self._connect()
+        where = " AND ".join(conditions)
+        total = conn.execute(f"SELECT COUNT(*) FROM posts p {joins} WHERE {where}", params).fetchone()[0]
+
+        page_conditions = list(conditions)
+        page_params = list(params)
+        if cursor:
+            last_value, last_id = self._decode_cursor(cursor)
+            op = '<' if descending else '>'
+            page_conditions.append(f"({order_expr} {op} ? OR ({order_expr} = ? AND p.id {op} ?))")
+            page_params.extend([last_value, last_value, last_id])
+            offset = 0
+
+        direction = 'DESC' if descending else 'ASC'
+        rows = conn.execute(
+            f"SELECT p.*, {order_expr} AS sort_value FROM posts p {joins} "
+            f"WHERE {' AND '.join(page_conditions)} "
+            f"ORDER BY sort_value {direction}, p.id {direction} LIMIT ? OFFSET ?",
+            [*page_params, size + 1, max(offset, 0)]
+        ).fetchall()
+
+        next_cursor = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_cursor = self._encode_cursor(rows[-1]['sort_value'], rows[-1]['id'])
+
+        return {
+            'posts': [self._row_to_post(row) for row in rows],
+            'next_cursor': next_cursor,
+            'total': total,
+        }
+
+    def iter_posts(self, query_id: Optional[int] = None, sentiment: Optional[str] = None,
+                   subreddits: Optional[List[str]] = None, source: Optional[str] = None,
+                   text: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None,
+                   chunk_size: int = 500) -> Iterator[Dict]:
+        """
+        Every matching stored post, oldest first, read in keyset-paginated chunks so memory use does
+        not grow with the number of posts (moderator-flagged posts are excluded)
+        :param since: Only posts dated at or after this ISO timestamp
+        :param until: Only posts dated before this ISO timestamp
+        :param chunk_size: Rows fetched per query
+        """
+        joins, conditions, params = self._post_filters(
+            query_id=query_id, sentiment=sentiment, subreddits=subreddits, source=source, text=text,
+            since=since, until=until
+        )
+
+        last = None
+        while True:
+            page_conditions = list(conditions)
+            page_params = list(params)
+            if last is not None:
+                page_conditions.append("(COALESCE(p.date, '') > ? OR (COALESCE(p.date, '') = ? AND p.id > ?))")
+                page_params.extend([last[0], last[0], last[1]])
+            rows = self._connect().execute(
+                f"SELECT p.* FROM posts p {joins} WHERE {' AND '.join(page_conditions)} "
+                f"ORDER BY COALESCE(p.date, '') ASC, p.id ASC LIMIT ?",
+                [*page_params, chunk_size]
+            ).fetchall()
+            for row in rows:
+                yield self._row_to_post(row)
+            if len(rows) < chunk_size:
+                return
+            last = (rows[-1]['date'] or '', rows[-1]['id'])
+
+    def _post_filters(self, query_id: Optional[int] = None, sentiment: Optional[str] = None,
+                      subreddits: Optional[List[str]] = None, source: Optional[str] = None,
+                      text: Optional[str] = None, since: Optional[str] = None,
+                      until: Optional[str] = None) -> Tuple[str, List[str], List]:
+        """JOIN clause, WHERE conditions and parameters shared by list_posts and iter_posts"""
+        joins = ""
+        conditions = ["COALESCE(p.mod_flagged, 0) = 0"]
+        params = []
+        if query_id is not None:
+            joins = "JOIN query_posts qp ON qp.post_id = p.id AND qp.query_id = ?"
+            params.append(query_id)
+        if sentiment:
+            sentiment = sentiment.upper()
+            if sentiment == 'NEUTRAL':
+                conditions.append("(p.sentiment IS NULL OR p.sentiment NOT IN ('POSITIVE', 'NEGATIVE'))")
+            else:
+                conditions.append("p.sentiment = ?")
+                params.append(sentiment)
+        if subreddits:
+            conditions.append(f"p.subreddit COLLATE NOCASE IN ({', '.join('?' for _ in subreddits)})")
+            params.extend(subreddits)
+        if source:
+            conditions.append("p.source = ?")
+            params.append(source)
+        if text:
+            condition, text_params = self._match_any([text])
+            conditions.append(condition)
+            params.extend(text_params)
+        if since:
+            conditions.append("p.date >= ?")
+            params.append(since)
+        if until:
+            conditions.append("p.date < ?")
+            params.append(until)
+        return joins, conditions, params
+
+    def search_posts(self, keywords: List[str], limit: int, subreddits: Optional[List[str]] = None,
+                     since: Optional[str] = None) -> List[Dict]:
+        """
+        Newest analyzed, non-moderator posts whose title or content contains any keyword
+        :param subreddits: Only posts from these subreddits
+        :param since: Only posts dated at or after this ISO timestamp
+        """
+        condition, params = self._match_any(keywords)
+        conditions = [
+            condition,
+            "COALESCE(p.mod_flagged, 0) = 0",
+            "p.sentiment IS NOT NULL",
+            # Posts whose insight failed are left for the next scrape to re-analyze
+            "p.insight IS NOT NULL AND substr(p.insight, 1, ?) != ?",
+        ]
+        params.extend([len(FALLBACK_PREFIX), FALLBACK_PREFIX])
+        if subreddits:
+            conditions.append(f"p.subreddit COLLATE NOCASE IN ({', '.join('?' for _ in subreddits)})")
+            params.extend(subreddits)
+        if since:
+            conditions.append("p.date >= ?")
+            params.append(since)
+
+        rows = self._connect().execute(
+            f"SELECT p.* FROM posts p WHERE {' AND '.join(conditions)} ORDER BY p.date DESC, p.id DESC LIMIT ?",
+            [*params, limit]
+        ).fetchall()
+        return [self._row_to_post(row) for row in rows]
+
+    def _match_any(self, terms: List[str]) -> Tuple[str, List]:
+        """SQL condition on posts `p` whose title or content contains any term (case-insensitive)"""
+        terms = [term.strip() for term in terms if term and term.strip()]
+        # Trigrams cannot match terms shorter than three characters
+        fts_terms = [term for term in terms if self.fts_enabled and len(term) >= 3]
+        clauses, params = [], []
+        if fts_terms:
+            clauses.append("p.id IN (SELECT rowid FROM posts_fts WHERE posts_fts MATCH ?)")
+            params.append(' OR '.join('"' + term.replace('"', '""') + '"' for term in fts_terms))
+        for term in terms:
+            if term in fts_terms:
+                continue
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            clauses.append("(p.title LIKE ? ESCAPE '\\' OR p.content LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+        return f"({' OR '.join(clauses) or '0'})", params
+
+    def find_near_duplicate(self, signature: Tuple[int, ...], threshold: float,
+                            exclude_url: Optional[str] = None) -> Optional[Dict]:
+        """
+        Most similar stored canonical post (analyzed, not itself a duplicate, not moderator-flagged)
+        whose MinHash signature shares an LSH band with `signature` and reaches `threshold`
+        :param exclude_url: The post being checked, so a re-scraped post does not match itself
+        """
+        keys = list(enumerate(band_keys(signature)))
+        rows = self._connect().execute(
+            f"SELECT p.* FROM posts p WHERE p.id IN (SELECT post_id FROM minhash_bands WHERE "
+            f"{' OR '.join('(band = ? AND band_key = ?)' for _ in keys)}) "
+            f"AND p.duplicate_of IS NULL AND COALESCE(p.mod_flagged, 0) = 0 AND p.sentiment IS NOT NULL "
+            f"AND p.insight IS NOT NULL AND substr(p.insight, 1, ?) != ? AND p.url IS NOT ?",
+            [*(v for band, key in keys for v in (band, key)), len(FALLBACK_PREFIX), FALLBACK_PREFIX, exclude_url]
+        ).fetchall()
+        best, best_score = None, threshold
+        for row in rows:
+            score = similarity(signature, unpack_signature(row['minhash']))
+            if score >= best_score:
+                best, best_score = row, score
+        return self._row_to_post(best) if best is not None else None
+
+    @staticmethod
+    def _encode_cursor(value, post_id: int) -> str:
+        return base64.urlsafe_b64encode(json.dumps([value, post_id]).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        try:
+            value, post_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return value, int(post_id)
+        except (ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor") from e
+
+    def data_version(self) -> Tuple[int, float]:
+        """Counter that changes with every stored post or query, and when it last changed (epoch seconds)"""
+        row = self._connect().execute("SELECT version, updated_at FROM data_version WHERE id = 1").fetchone()
+        return row['version'], row['updated_at']
+
+    def get_watermark(self, subreddit: str) -> Optional[Dict]:
+        """Newest submission the incremental crawler has stored for a subreddit, or None"""
+        row = self._connect().execute(
+            "SELECT created_utc, submission_id, updated_at FROM crawl_watermarks WHERE subreddit = ?", (subreddit,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def set_watermark(self, subreddit: str, created_utc: float, submission_id: Optional[str]):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO crawl_watermarks (subreddit, created_utc, submission_id, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(subreddit) DO UPDATE SET created_utc = excluded.created_utc, "
+                "submission_id = excluded.submission_id, updated_at = excluded.updated_at",
+                (subreddit, created_utc, submission_id, time.time())
+            )
+
+    def watermarks(self) -> Dict[str, Dict]:
+        rows = self._connect().execute(
+            "SELECT subreddit, created_utc, submission_id, updated_at FROM crawl_watermarks ORDER BY subreddit"
+        ).fetchall()
+        return {row['subreddit']: {k: row[k] for k in ('created_utc', 'submission_id', 'updated_at')} for row in rows}
+
+    def save_job(self, job_id: str, key: str, state: Dict, created_at: float, finished_at: Optional[float] = None):
+        """
+        Store the latest snapshot of a background job
+        :param state: The job's status dict as served by /jobs/<id>
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (id, job_key, status, state, pid, created_at, updated_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET status = excluded.status, "
+                "state = excluded.state, pid = excluded.pid, updated_at = excluded.updated_at, "
+                "finished_at = excluded.finished_at",
+                (job_id, key, state['status'], json.dumps(state), os.getpid(), created_at, time.time(), finished_at)
+            )
+
+    def claim_job(self, job_id: str, key: str, state: Dict, created_at: float,
+                  is_live: Callable[[Optional[int]], bool]) -> str:
+        """
+        Store a new job unless a queued or running job for the same key is still held by a live process
+        Runs as one write transaction, so processes submitting the same key at once agree on a single job.
+        :param is_live: Called with the pid of each active job for the key
+        :return: Id of the live job already running for the key, or job_id if the new job was stored
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, pid FROM jobs WHERE job_key = ? AND status IN ('queued', 'running') "
+                "ORDER BY created_at DESC", (key,)
+            ).fetchall()
+            for row in rows:
+                if is_live(row['pid']):
+                    conn.rollback()
+                    return row['id']
+            conn.execute(
+                "INSERT INTO jobs (id, job_key, status, state, pid, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, key, state['status'], json.dumps(state), os.getpid(), created_at, time.time())
+            )
+            conn.commit()
+            return job_id
+        except Exception:
+            conn.rollback()
+            raise
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Latest snapshot of a job with the process running it (pid) and when it was saved, or None"""
+        row = self._connect().execute(
+            "SELECT state, pid, updated_at, finished_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'state': json.loads(row['state']), 'pid': row['pid'],
+                'updated_at': row['updated_at'], 'finished_at': row['finished_at']}
+
+    def delete_jobs(self, before: float) -> int:
+        """Drop jobs that finished, or were last updated, before an epoch time"""
+        conn = self._connect()
+        with conn:
+            return conn.execute("DELETE FROM jobs WHERE COALESCE(finished_at, updated_at) < ?", (before,)).rowcount
+
+    def backfill_mod_verdicts(self) -> int:
+        """Record the moderator-filter verdict on stored posts that predate it"""
+        conn = self._connect()
+        rows = conn.execute("SELECT * FROM posts WHERE mod_flagged IS NULL").fetchall()
+        with conn:
+            for row in rows:
+                old_post = self._row_to_post(row)
+                new_post = dict(old_post)
+                is_mod_post(new_post)
+                conn.execute("UPDATE posts SET mod_flagged = ? WHERE id = ?", (int(new_post['mod_flagged']), row['id']))
+                self.aggregates.apply(conn, old_post, new_post)
+        return len(rows)
+
+    def _row_to_post(self, row: sqlite3.Row) -> Dict:
+        post = {column: row[column] for column in POST_COLUMNS if row[column] is not None}
+        post['is_moderator'] = bool(row['is_moderator'])
+        if row['mod_flagged'] is not None:
+            post['mod_flagged'] = bool(row['mod_flagged'])
+        if row['extra']:
+            with json_io_seconds.time(operation='load', source='posts'):
+                post.update(json.loads(row['extra']))
+        post['id'] = row['id']
+        return post
+
+    def import_json_files(self, directory: str = "data") -> int:
+        """
+        One-shot import of legacy cache_<md5>.json and reddit_results_<ts>.json files
+        :return: Number of files imported (files seen before are skipped)
+        """
+        if not os.path.isdir(directory):
+            return 0
+
+        conn = self._connect()
+        imported = 0
+        for filename in sorted(os.listdir(directory)):
+            match = re.match(r'^(cache_(?P<key>[0-9a-f]{32})|reddit_results_(?P<ts>\d{8}_\d{6}))\.json$', filename)
+            if not match:
+                continue
+            if conn.execute("SELECT 1 FROM imported_files WHERE filename = ?", (filename,)).fetchone():
+                continue
+
+            path = os.path.join(directory, filename)
+            try:
+                with open(path, 'r', encoding='utf-8') as f, \
+                        json_io_seconds.time(operation='load', source='legacy_file'):
+                    posts = json.load(f)
+            except (OSError, ValueError) as e:
+                self.logger.error(f"Skipping unreadable results file {path}: {str(e)}")
+                continue
+
+            if match.group('ts'):
+                query_key = os.path.splitext(filename)[0]
+                created_at = datetime.strptime(match.group('ts'), "%Y%m%d_%H%M%S").timestamp()
+            else:
+                query_key = match.group('key')
+                created_at = os.path.getmtime(path)
+
+            for post in posts:
+                is_mod_post(post)  # Record the filter verdict so reads never re-scan the text
+            self.save_query(query_key, [], None, posts, created_at=created_at)
+            with conn:
+                conn.execute(
+                    "INSERT INTO imported_files (filename, imported_at) VALUES (?, ?)", (filename, time.time())
+                )
+            imported += 1
+
+        if imported:
+            self.logger.info(f"Imported {imported} legacy JSON results files from {directory}")
+        return imported
+
+if __name__ == '__main__':
+    # Usage: python -m scraper.storage [data_dir] [db_path]
+    logging.basicConfig(level=logging.INFO)
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "data"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(data_dir, "results.db")
+    count = ResultStore(db_path).import_json_files(data_dir)
+    print(f"Imported {count} files into {db_path}")
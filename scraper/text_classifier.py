@@ -0,0 +1,113 @@
+import re
+from typing import Dict, Iterable, List, Set
+from scraper.metrics import registry
+
+MOD_KEYWORDS = [
+    'moderator', 'mod ', 'mods ', 'modding', 'moderation',
+    'rules', 'rule', 'announcement', 'official', 'meta',
+    'welcome', 'introduction', 'guideline', 'reminder', 'update'
+]
+
+MOD_TITLE_PREFIXES = ('[mod]', '[meta]', '[announcement]')
+
+MENTAL_HEALTH_TERMS = [
+    'anxiety', 'depression', 'therapy', 'stress', 'trauma',
+    'coping', 'medication', 'support', 'recovery', 'mental health',
+    'therapist', 'counseling', 'self-care', 'diagnosis', 'symptoms',
+    'treatment', 'healing', 'crisis', 'panic', 'grief'
+]
+
+# Key under which the moderator-filter verdict is recorded on a post
+MOD_VERDICT_KEY = 'mod_flagged'
+
+mod_filter_seconds = registry.histogram(
+    'mod_filter_seconds', 'Time spent in one filter_mod_posts call', timing_name='modfilter'
+)
+mod_filter_verdicts_total = registry.counter(
+    'mod_filter_verdicts_total', 'Moderator-post classifications by verdict', ['verdict']
+)
+
+class TermMatcher:
+    def __init__(self, terms: Iterable[str], strategy: str = 'substring'):
+        """
+        Case-insensitive substring matcher compiled once for a fixed term list
+        :param terms: Terms to look for (matched anywhere in the text, like `term in text`)
+        :param strategy: 'substring' (pruned C-level substring scans, fastest on CPython for short
+                         term lists) or 'regex' (one overlapping alternation pass over the text)
+        """
+        if strategy not in ('substring', 'regex'):
+            raise ValueError(f"Unknown matching strategy: {strategy}")
+        self.terms = list(dict.fromkeys(term.lower() for term in terms))
+        self.strategy = strategy
+
+        # A term containing another term can never match alone, so any-match checks skip it
+        self._any_terms = tuple(
+            term for term in self.terms
+            if not any(other != term and other in term for other in self.terms)
+        )
+        # Every term that occurs whenever a given term occurs (itself plus its substrings)
+        self._implied = {term: {other for other in self.terms if other in term} for term in self.terms}
+
+        alternation = '|'.join(re.escape(term) for term in sorted(self.terms, key=len, reverse=True))
+        self._any_pattern = re.compile(alternation)
+        # Zero-width lookahead so overlapping occurrences are all reported
+        self._all_pattern = re.compile(f"(?=({alternation}))")
+
+    def matches_any(self, text: str) -> bool:
+        """True if any term occurs in the text"""
+        text = text.lower()
+        if self.strategy == 'regex':
+            return self._any_pattern.search(text) is not None
+        return any(term in text for term in self._any_terms)
+
+    def matching_terms(self, text: str) -> Set[str]:
+        """All terms occurring in the text"""
+        text = text.lower()
+        if self.strategy == 'regex':
+            found = set()
+            for match in set(self._all_pattern.findall(text)):
+                found |= self._implied[match]
+            return found
+        return {term for term in self.terms if term in text}
+
+mod_keyword_matcher = TermMatcher(MOD_KEYWORDS)
+mental_health_matcher = TermMatcher(MENTAL_HEALTH_TERMS)
+
+def classify_mod_post(post: Dict) -> bool:
+    """Run the moderator-post heuristics on a post (ignores any recorded verdict)"""
+    # Skip if explicitly marked as mod
+    if post.get('is_moderator', False):
+        return True
+
+    title = (post.get('title') or '').lower()
+
+    # Skip if title starts with [Mod] or similar
+    if title.startswith(MOD_TITLE_PREFIXES):
+        return True
+
+    # Check for mod keywords in title or content
+    if mod_keyword_matcher.matches_any(f"{title}\n{post.get('content') or ''}"):
+        return True
+
+    # Skip posts with very high upvote-to-comment ratios (common for mod posts)
+    upvotes = post.get('upvotes', 0) or 0
+    comments = post.get('comments', 1)
+    comments = 1 if comments is None else comments
+    if upvotes > 100 and comments < 3:  # Suspicious ratio
+        return True
+
+    return False
+
+def is_mod_post(post: Dict) -> bool:
+    """Moderator-filter verdict for a post, classifying and recording it on first use"""
+    verdict = post.get(MOD_VERDICT_KEY)
+    if verdict is None:
+        verdict = classify_mod_post(post)
+        post[MOD_VERDICT_KEY] = verdict
+        mod_filter_verdicts_total.inc(verdict='mod' if verdict else 'kept')
+    return verdict
+
+def filter_mod_posts(posts: Iterable[Dict]) -> List[Dict]:
+    """Filter out any posts that might be from moderators with comprehensive checks"""
+    with mod_filter_seconds.time():
+        return [post for post in posts if not is_mod_post(post)]
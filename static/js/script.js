@@ -32,12 +32,17 @@ document.addEventListener('DOMContentLoaded', function() {
                     })
                 });
 
-                const data = await response.json();
+                let data = await response.json();
                 
                 if (!response.ok) {
                     throw new Error(data.message || 'Analysis failed');
                 }
 
+                // Long-running scrapes run as background jobs; poll until finished
+                if (data.job_id) {
+                    data = await pollJob(data.poll_url);
+                }
+
                 if (data.status === 'success') {
                     successAlert.classList.remove('d-none');
                     
@@ -113,49 +118,60 @@ document.addEventListener('DOMContentLoaded', function() {
             analysisSpinner.classList.remove('d-none');
             modal.show();
             
-            // Get analysis from backend
-            fetch('/analyze', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    text: content
-                })
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.status === 'success') {
-                    geminiAnalysis.innerHTML = `
-                        <div class="mt-3">
-                            <h6>Therapeutic Analysis</h6>
-                            <div class="p-3 bg-info bg-opacity-10 rounded">
-                                ${data.insight}
-                            </div>
-                        </div>
-                    `;
-                } else {
-                    geminiAnalysis.innerHTML = `
-                        <div class="alert alert-warning">
-                            Analysis failed: ${data.message}
-                        </div>
-                    `;
-                }
-            })
-            .catch(error => {
-                geminiAnalysis.innerHTML = `
-                    <div class="alert alert-danger">
-                        Error: ${error.message}
-                    </div>
-                `;
-            })
-            .finally(() => {
-                analysisSpinner.classList.add('d-none');
-            });
+            // Sentiment shows up first, then the analysis fills in as it is generated
+            streamAnalysis(content, geminiAnalysis, analysisSpinner);
         }
     });
 
     // Helper functions
+    async function pollJob(pollUrl) {
+        while (true) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const response = await fetch(pollUrl);
+            const job = await response.json();
+            
+            if (!response.ok) {
+                throw new Error(job.message || 'Lost track of analysis job');
+            }
+            if (job.status === 'done') {
+                return job.result;
+            }
+            if (job.status === 'error') {
+                throw new Error(job.error || 'Analysis failed');
+            }
+            renderProgress(job);
+        }
+    }
+
+    function renderProgress(job) {
+        const labels = {
+            fetch: 'Fetching Reddit posts',
+            sentiment: 'Analyzing sentiment',
+            insight: 'Generating insights',
+            save: 'Saving results'
+        };
+        resultsPreview.innerHTML = `
+            <div class="card mt-3">
+                <div class="card-body">
+                    ${job.stages.map(stage => `
+                        <div class="d-flex justify-content-between">
+                            <span>${labels[stage.name] || stage.name}</span>
+                            <small class="text-muted">
+                                ${stage.status === 'done' ? '✓' : stage.total ? `${stage.done}/${stage.total}` : stage.status === 'running' ? '…' : ''}
+                            </small>
+                        </div>
+                    `).join('')}
+                    ${job.partial_results.map(post => `
+                        <div class="mt-2 p-2 border rounded">
+                            <span class="badge ${getSentimentClass(post.sentiment)}">${post.sentiment}</span>
+                            <span class="ms-2">${escapeHtml(post.title || '')}</span>
+                        </div>
+                    `).join('')}
+                </div>
+            </div>
+        `;
+    }
+
     function getSentimentClass(sentiment) {
         switch(sentiment) {
             case 'POSITIVE': return 'bg-success';
@@ -197,4 +213,90 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
 });
-       
+
+// Render /analyze/stream into `container` as its server-sent events arrive: the sentiment as soon as
+// the model answers, then the therapeutic analysis piece by piece while Gemini writes it
+async function streamAnalysis(text, container, spinner) {
+    container.innerHTML = `
+        <div class="mt-3 d-none" data-part="sentiment"></div>
+        <div class="mt-3 d-none" data-part="insight">
+            <h6>Therapeutic Analysis</h6>
+            <div class="p-3 bg-info bg-opacity-10 rounded" data-part="insightText" style="white-space: pre-wrap;"></div>
+        </div>
+    `;
+    const part = name => container.querySelector(`[data-part="${name}"]`);
+    const insightText = part('insightText');
+
+    function showEvent(event, data) {
+        spinner.classList.add('d-none');
+        if (event === 'sentiment') {
+            const color = data.label === 'POSITIVE' ? 'success' : data.label === 'NEGATIVE' ? 'danger' : 'secondary';
+            const percent = Math.round(data.score * 100);
+            part('sentiment').innerHTML = `
+                <h6>Sentiment Analysis</h6>
+                <div class="p-3 bg-${color} bg-opacity-10 rounded">
+                    <div class="d-flex align-items-center">
+                        <strong>${data.label}</strong>
+                        <div class="progress flex-grow-1 ms-3" style="height: 10px;">
+                            <div class="progress-bar bg-${color}" role="progressbar" style="width: ${percent}%"
+                                 aria-valuenow="${percent}" aria-valuemin="0" aria-valuemax="100"></div>
+                        </div>
+                        <span class="ms-2">${percent}%</span>
+                    </div>
+                </div>
+            `;
+            part('sentiment').classList.remove('d-none');
+        } else if (event === 'insight') {
+            part('insight').classList.remove('d-none');
+            insightText.textContent += data.text;
+        } else if (event === 'done') {
+            part('insight').classList.remove('d-none');
+            insightText.textContent = data.insight;
+        } else if (event === 'error') {
+            throw new Error(data.message);
+        }
+    }
+
+    try {
+        const response = await fetch('/analyze/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                text: text
+            })
+        });
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.message || 'Analysis failed');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            // Events are separated by a blank line; keep a trailing partial event for the next read
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+            for (const frame of frames) {
+                let event = 'message';
+                let data = '';
+                for (const line of frame.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                }
+                if (data) showEvent(event, JSON.parse(data));
+            }
+        }
+    } catch (error) {
+        spinner.classList.add('d-none');
+        const alert = document.createElement('div');
+        alert.className = 'alert alert-warning mt-3';
+        alert.textContent = `Analysis failed: ${error.message}`;
+        container.appendChild(alert);
+    }
+}
@@ -0,0 +1,36 @@
+import time
+from scraper.circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+
+def open_breaker(reset_timeout: float = 0.05) -> CircuitBreaker:
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=reset_timeout)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+def test_consecutive_failures_open_the_circuit():
+    breaker = open_breaker(reset_timeout=30)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+def test_half_open_refuses_non_trial_callers_without_waiting():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    start = time.perf_counter()
+    assert not breaker.allow()
+    assert time.perf_counter() - start < 0.05
+
+def test_trial_outcome_closes_or_reopens_the_circuit():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow()
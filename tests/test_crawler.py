@@ -0,0 +1,77 @@
+import logging
+import pytest
+from benchmarks.fakes import FakeReddit, StubSentimentPipeline
+from scraper.crawler import IncrementalCrawler
+from scraper.gemini_analyzer import GeminiAnalyzer
+from scraper.reddit_scraper import RedditScraper
+from scraper.sentiment_analyzer import SentimentAnalyzer
+from scraper.storage import ResultStore
+from scraper.text_classifier import is_mod_post
+
+SUB = 'anxiety'
+
+@pytest.fixture
+def reddit():
+    return FakeReddit(150, mod_ratio=0)
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultStore(str(tmp_path / 'results.db'))
+
+@pytest.fixture
+def crawler(reddit, store):
+    sentiment = SentimentAnalyzer()
+    sentiment.model.loader = StubSentimentPipeline
+    gemini = GeminiAnalyzer(base_url='http://127.0.0.1:9/v1beta/models/stub:generateContent')
+    gemini.api_key = None  # Insights fall back without calling out
+    scraper = RedditScraper(None, None, None, subreddits=[SUB], reddit=reddit)
+    return IncrementalCrawler(scraper, store, sentiment, gemini, max_posts=100)
+
+def newest(reddit, count: int = 1) -> list:
+    return sorted(reddit.subreddit(SUB).submissions, key=lambda s: s.created_utc, reverse=True)[:count]
+
+def storable(submissions) -> int:
+    """How many of these submissions the crawler stores (it drops posts the classifier flags as moderator posts)"""
+    return sum(not is_mod_post(RedditScraper._to_post(submission, SUB)) for submission in submissions)
+
+def test_first_crawl_backfills_and_sets_the_watermark(crawler, store, reddit):
+    assert crawler.run_once() == {SUB: storable(newest(reddit, 100))}
+    assert store.get_watermark(SUB)['submission_id'] == newest(reddit)[0].id
+
+def test_later_crawls_resume_from_the_watermark(crawler, store, reddit):
+    crawler.run_once()
+    assert crawler.run_once() == {SUB: 0}
+
+    added = reddit.add_submissions(SUB, 5, seed='more')
+    assert crawler.run_once() == {SUB: storable(added)}
+    assert store.get_watermark(SUB)['submission_id'] == added[-1].id
+    assert crawler.run_once() == {SUB: 0}
+
+def test_more_new_posts_than_max_posts_are_all_fetched(crawler, store, reddit):
+    crawler.run_once()
+    added = reddit.add_submissions(SUB, 250, seed='burst')
+    assert crawler.run_once() == {SUB: storable(added)}
+    assert store.get_watermark(SUB)['submission_id'] == added[-1].id
+
+def test_failed_crawl_keeps_the_watermark_for_a_retry(crawler, store, reddit, monkeypatch):
+    crawler.run_once()
+    watermark = store.get_watermark(SUB)
+    added = reddit.add_submissions(SUB, 5, seed='retry')
+
+    def fail(posts):
+        raise RuntimeError('disk full')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(store, 'upsert_posts', fail)
+        assert crawler.run_once() == {}
+    assert store.get_watermark(SUB) == watermark
+    assert crawler.run_once() == {SUB: storable(added)}
+
+def test_listing_cap_before_the_watermark_is_logged(crawler, store, reddit, caplog):
+    crawler.run_once()
+    reddit.subreddit(SUB).max_listing = 50
+    added = reddit.add_submissions(SUB, 80, seed='flood')
+    with caplog.at_level(logging.WARNING, logger='scraper.reddit_scraper'):
+        assert crawler.run_once() == {SUB: storable(added[-50:])}
+    assert 'without reaching the watermark' in caplog.text
+    assert store.get_watermark(SUB)['submission_id'] == added[-1].id
@@ -0,0 +1,98 @@
+import time
+import threading
+import pytest
+from benchmarks.fakes import StubGeminiServer
+from scraper.gemini_analyzer import GeminiAnalyzer
+from scraper.insights import FALLBACK_PREFIX
+
+@pytest.fixture
+def stub():
+    server = StubGeminiServer(latency=0.05, jitter=0).start()
+    yield server
+    server.stop()
+
+def make_analyzer(url: str, **kwargs) -> GeminiAnalyzer:
+    kwargs = dict(dict(max_workers=4, requests_per_second=0, timeout=2, backoff_base=0.01, breaker_failures=0,
+                       adaptive_concurrency=False), **kwargs)
+    analyzer = GeminiAnalyzer(base_url=url, **kwargs)
+    analyzer.api_key = 'test'
+    return analyzer
+
+def test_insights_come_back_in_input_order(stub):
+    texts = [' '.join(['word'] * n) for n in range(1, 9)]
+    analyzer = make_analyzer(stub.url)
+    insights = analyzer.generate_insights(texts)
+    prompt_words = [len(analyzer._build_request(text)['contents'][0]['parts'][0]['text'].split()) for text in texts]
+    assert insights == [f"Stub insight for a {words}-word prompt." for words in prompt_words]
+
+def test_requests_run_concurrently(stub):
+    stub.latency = 0.2
+    start = time.perf_counter()
+    insights = make_analyzer(stub.url, max_workers=8).generate_insights(['some post'] * 8)
+    assert time.perf_counter() - start < 0.2 * 8 / 2
+    assert not any(insight.startswith(FALLBACK_PREFIX) for insight in insights)
+
+def test_server_errors_are_retried_then_fall_back(stub):
+    stub.error_rate = 1.0
+    insight = make_analyzer(stub.url, max_retries=2).generate_insight('some post')
+    assert insight == f"{FALLBACK_PREFIX} - API returned status 503"
+    assert stub.stats()['requests'] == 3
+
+def test_client_errors_are_not_retried(stub):
+    stub.error_rate, stub.error_status = 1.0, 400
+    insight = make_analyzer(stub.url, max_retries=2).generate_insight('some post')
+    assert insight == f"{FALLBACK_PREFIX} - API returned status 400"
+    assert stub.stats()['requests'] == 1
+
+def test_missing_api_key_skips_the_request(stub):
+    analyzer = make_analyzer(stub.url)
+    analyzer.api_key = None
+    assert analyzer.generate_insights(['some post']) == [f"{FALLBACK_PREFIX} - API key not configured"]
+    assert stub.stats()['requests'] == 0
+
+def test_outage_opens_the_circuit_and_falls_back_fast(stub):
+    stub.error_rate = 1.0
+    analyzer = make_analyzer(stub.url, max_workers=1, max_retries=0, breaker_failures=2, breaker_reset_seconds=30)
+    insights = analyzer.generate_insights(['some post'] * 8)
+    assert all(insight.startswith(FALLBACK_PREFIX) for insight in insights)
+    assert stub.stats()['requests'] == 2
+    assert analyzer.circuit_breaker.state == 'open'
+
+def test_trial_request_after_recovery_closes_the_circuit(stub):
+    stub.error_rate = 1.0
+    analyzer = make_analyzer(stub.url, max_retries=0, breaker_failures=1, breaker_reset_seconds=0.1)
+    analyzer.generate_insight('some post')
+    assert analyzer.circuit_breaker.state == 'open'
+
+    stub.error_rate = 0.0
+    time.sleep(0.15)
+    assert not analyzer.generate_insight('some post').startswith(FALLBACK_PREFIX)
+    assert analyzer.circuit_breaker.state == 'closed'
+
+def test_callers_during_a_trial_fall_back_without_holding_a_slot(stub):
+    stub.error_rate = 1.0
+    analyzer = make_analyzer(stub.url, max_workers=2, max_retries=0, breaker_failures=1,
+                             breaker_reset_seconds=0.1, adaptive_concurrency=True)
+    analyzer.generate_insight('some post')
+
+    stub.error_rate, stub.latency = 0.0, 0.5
+    time.sleep(0.15)
+    trial = threading.Thread(target=lambda: results.append(analyzer.generate_insight('trial post')))
+    results = []
+    trial.start()
+    time.sleep(0.1)
+    start = time.perf_counter()
+    assert analyzer.generate_insight('other post').startswith(FALLBACK_PREFIX)
+    assert time.perf_counter() - start < 0.25
+    assert analyzer.concurrency._in_flight == 1
+
+    trial.join()
+    assert not results[0].startswith(FALLBACK_PREFIX)
+    assert analyzer.circuit_breaker.state == 'closed'
+
+def test_throttling_backs_off_the_concurrency_limit(stub):
+    stub.latency, stub.max_concurrency = 0.1, 2
+    analyzer = make_analyzer(stub.url, max_workers=8, max_retries=5, adaptive_concurrency=True)
+    analyzer.generate_insights(['some post'] * 16)
+    assert stub.stats()['throttled'] > 0
+    assert analyzer.concurrency.limit < 8
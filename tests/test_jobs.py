@@ -0,0 +1,65 @@
+import time
+import threading
+import pytest
+from scraper import jobs
+from scraper.jobs import JobManager
+from scraper.storage import ResultStore
+
+STAGES = ['fetch']
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'results.db')
+
+@pytest.fixture
+def other_process(monkeypatch):
+    # Managers in this test share one process; make each treat the other's jobs as a live process's
+    monkeypatch.setattr(jobs, '_process_alive', lambda pid: True)
+
+def wait_for(manager: JobManager, job_id: str, status: str, timeout: float = 5):
+    deadline = time.time() + timeout
+    while manager.status(job_id)['status'] != status:
+        assert time.time() < deadline, manager.status(job_id)
+        time.sleep(0.01)
+
+def test_another_worker_answers_polls(db_path, other_process):
+    # Two managers on one database stand in for two server processes
+    started, release = JobManager(store=ResultStore(db_path)), threading.Event()
+    other = JobManager(store=ResultStore(db_path))
+
+    def target(job):
+        job.start_stage('fetch', total=2)
+        job.advance('fetch', 1)
+        release.wait(5)
+        job.finish_stage('fetch')
+        return {'count': 2}
+
+    job_id = started.submit('query', STAGES, target)
+    assert other.status(job_id)['status'] in ('queued', 'running')
+    release.set()
+    wait_for(other, job_id, 'done')
+    status = other.status(job_id)
+    assert status['result'] == {'count': 2}
+    assert status['stages'] == [{'name': 'fetch', 'status': 'done', 'done': 2, 'total': 2}]
+    assert other.status('unknown') is None
+
+def test_same_key_shares_the_live_job(db_path, other_process):
+    started, release = JobManager(store=ResultStore(db_path)), threading.Event()
+    other = JobManager(store=ResultStore(db_path))
+    job_id = started.submit('query', STAGES, lambda job: release.wait(5) and {})
+    assert other.submit('query', STAGES, lambda job: {}) == job_id
+    assert started.submit('query', STAGES, lambda job: {}) == job_id
+    assert other.submit('other query', STAGES, lambda job: {}) != job_id
+    release.set()
+
+def test_job_of_an_exited_process_is_not_reused(db_path):
+    dead = ResultStore(db_path)
+    dead.claim_job('gone', 'query', {'status': 'running'}, time.time(), lambda pid: False)
+    dead._connect().execute("UPDATE jobs SET pid = 0")
+    dead._connect().commit()
+
+    manager = JobManager(store=ResultStore(db_path))
+    assert manager.status('gone')['status'] == 'error'
+    job_id = manager.submit('query', STAGES, lambda job: {'count': 0})
+    assert job_id != 'gone'
+    wait_for(manager, job_id, 'done')
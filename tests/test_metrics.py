@@ -0,0 +1,15 @@
+from scraper.metrics import MetricsRegistry
+
+def test_fork_reset_drops_counts_but_keeps_gauges():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests')
+    latency = registry.histogram('latency_seconds', 'Latency')
+    state = registry.gauge('state', 'State', ['name'])
+    requests.inc(3)
+    latency.observe(0.2)
+    state.set(2, name='gemini')
+
+    registry.reset_after_fork()
+    assert requests.value() == 0
+    assert latency.count() == 0
+    assert 'state{name="gemini"} 2' in registry.render()
@@ -0,0 +1,29 @@
+import threading
+from scraper.model_manager import ModelManager
+
+def test_ready_after_a_plain_load():
+    # PRELOAD_MODEL=1 outside gunicorn, or a lazy load on first use with WARM_UP_MODEL=0
+    manager = ModelManager('model', lambda: object())
+    assert not manager.ready
+    manager.get()
+    assert manager.ready
+
+def test_not_ready_until_a_running_warm_up_finishes():
+    probing, release = threading.Event(), threading.Event()
+    manager = ModelManager('model', lambda: object())
+    manager.get()
+    manager.warm_up(probe=lambda model: probing.set() or release.wait(5), background=True)
+    assert probing.wait(5)
+    assert not manager.ready
+    release.set()
+    for _ in range(500):
+        if manager.ready:
+            break
+        threading.Event().wait(0.01)
+    assert manager.ready and manager.warm
+
+def test_ready_again_after_fork_without_warm_up():
+    manager = ModelManager('model', lambda: object())
+    manager.warm_up()
+    manager.reset_after_fork()
+    assert manager.ready
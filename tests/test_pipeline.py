@@ -0,0 +1,57 @@
+import threading
+from benchmarks.fakes import make_posts
+from scraper.insights import FALLBACK_PREFIX, is_fallback
+from scraper.near_duplicates import NearDuplicateDetector
+from scraper.pipeline import analyze_stream
+
+class Sentiment:
+    def analyze_batch(self, texts):
+        return [{'label': 'POSITIVE', 'score': 0.9} for _ in texts]
+
+class FailFirstGemini:
+    """Fails its first request with a fallback insight, then answers every later one"""
+    batch_size = 4
+    max_workers = 2
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def generate_insight_batch(self, texts):
+        with self.lock:
+            self.requests += 1
+            failed = self.requests == 1
+        if failed:
+            return [f"{FALLBACK_PREFIX} - API returned status 503" for _ in texts]
+        return [f"Insight {len(text)}" for text in texts]
+
+def copies(count: int):
+    original = make_posts(1, seed=3, mod_ratio=0)[0]
+    return [{**original, 'url': f"https://reddit.com/r/repost/comments/{i}/"} for i in range(count)]
+
+def analyze(posts, batch_size):
+    gemini = FailFirstGemini()
+    analyzed = list(analyze_stream(posts, Sentiment(), gemini, batch_size=batch_size,
+                                   near_duplicates=NearDuplicateDetector()))
+    return {post['url']: post for post in analyzed}, gemini
+
+def test_followers_of_a_failed_canonical_are_analyzed_themselves():
+    posts = copies(3)
+    analyzed, gemini = analyze(posts, batch_size=3)
+
+    assert len(analyzed) == 3
+    assert is_fallback(analyzed[posts[0]['url']]['insight'])
+    for post in posts[1:]:
+        assert not is_fallback(analyzed[post['url']]['insight'])
+        assert analyzed[post['url']].get('duplicate_of') is None
+        assert analyzed[post['url']]['sentiment'] == 'POSITIVE'
+
+def test_later_near_duplicates_do_not_copy_a_fallback_insight():
+    posts = copies(4)
+    analyzed, gemini = analyze(posts, batch_size=1)
+
+    assert len(analyzed) == 4
+    assert sum(is_fallback(post['insight']) for post in analyzed.values()) == 1
+    for post in analyzed.values():
+        if post.get('duplicate_of'):
+            assert not is_fallback(analyzed[post['duplicate_of']]['insight'])
@@ -0,0 +1,70 @@
+import time
+from benchmarks.fakes import FakeReddit, KEYWORDS
+from scraper.reddit_scraper import RedditScraper, reddit_ratelimit_wait_seconds_total
+
+SUBREDDITS = ['anxiety', 'depression', 'therapy', 'mentalhealth']
+
+def make_scraper(reddit=None, **kwargs) -> RedditScraper:
+    return RedditScraper(None, None, None, subreddits=kwargs.pop('subreddits', SUBREDDITS), reddit=reddit, **kwargs)
+
+def test_limit_dedupes_and_skips_moderator_posts():
+    reddit = FakeReddit(100, mod_ratio=0.2)
+    posts = make_scraper(reddit, listings=['hot', 'top']).scrape_mentalhealth(KEYWORDS, limit=60)
+    assert len(posts) == 60
+    assert len({post['url'] for post in posts}) == 60
+    moderator_urls = {f"https://reddit.com{s.permalink}" for sub in SUBREDDITS
+                      for s in reddit.subreddit(sub).submissions if s.stickied or s.distinguished}
+    assert not moderator_urls & {post['url'] for post in posts}
+
+def test_excluded_urls_are_skipped_and_not_counted():
+    reddit = FakeReddit(50, mod_ratio=0)
+    first = make_scraper(reddit, subreddits=['anxiety']).scrape_mentalhealth(KEYWORDS, limit=10)
+    second = list(make_scraper(reddit, subreddits=['anxiety']).iter_mentalhealth(
+        KEYWORDS, limit=10, exclude_urls=[post['url'] for post in first]))
+    assert len(second) == 10
+    assert not {post['url'] for post in first} & {post['url'] for post in second}
+
+def test_listings_are_crawled_in_parallel():
+    elapsed = {}
+    for workers in (1, 4):
+        scraper = make_scraper(FakeReddit(300, page_latency=0.05), max_workers=workers)
+        start = time.perf_counter()
+        assert len(scraper.scrape_mentalhealth(KEYWORDS, limit=1000)) == 1000
+        elapsed[workers] = time.perf_counter() - start
+    assert elapsed[4] < elapsed[1] / 2
+
+def test_consumer_stopping_early_stops_the_crawl():
+    reddit = FakeReddit(1000, page_latency=0.05)
+    posts = make_scraper(reddit).iter_mentalhealth(KEYWORDS, limit=5000)
+    assert next(posts)
+    posts.close()
+    time.sleep(0.3)
+    requests = reddit.requests
+    time.sleep(0.3)
+    assert reddit.requests == requests
+
+def test_each_concurrent_listing_gets_its_own_client():
+    clients = []
+
+    def factory():
+        clients.append(FakeReddit(300, page_latency=0.02))
+        return clients[-1]
+
+    scraper = make_scraper(reddit_factory=factory, max_workers=4)
+    assert len(scraper.scrape_mentalhealth(KEYWORDS, limit=1000)) == 1000
+    assert len(clients) > 1
+    assert all(client.max_concurrent_listings == 1 for client in clients)
+
+    # Idle clients are reused instead of building new ones for every crawl
+    built = len(clients)
+    scraper.scrape_mentalhealth(KEYWORDS, limit=1000)
+    assert len(clients) == built
+
+def test_ratelimit_budget_is_checked_before_every_page():
+    reddit = FakeReddit(1000, mod_ratio=0, ratelimit_budget=3, ratelimit_window=0.2)
+    scraper = make_scraper(reddit, subreddits=['anxiety'], min_ratelimit_remaining=2)
+    waited = reddit_ratelimit_wait_seconds_total.value()
+    assert len(scraper.scrape_mentalhealth(KEYWORDS, limit=400)) == 400
+    assert reddit.requests > 3
+    assert reddit.over_limit == 0
+    assert reddit_ratelimit_wait_seconds_total.value() > waited
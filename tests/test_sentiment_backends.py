@@ -0,0 +1,82 @@
+import os
+import pytest
+from benchmarks.fakes import StubSentimentPipeline, WORDS, make_posts
+from scraper.analysis_cache import AnalysisCache
+from scraper.sentiment_analyzer import SentimentAnalyzer
+
+MIN_AGREEMENT = 0.95
+
+def texts(count: int, seed) -> list:
+    return [post['content'][:300] for post in make_posts(count, seed=seed)]
+
+@pytest.fixture(scope='module')
+def tiny_model(tmp_path_factory):
+    """
+    A small DistilBERT trained for a few seconds to reproduce StubSentimentPipeline's labels, so the
+    backends are compared on a model with real decision boundaries without downloading one
+    """
+    torch = pytest.importorskip('torch')
+    transformers = pytest.importorskip('transformers')
+    path = str(tmp_path_factory.mktemp('tiny-sentiment'))
+    vocab = os.path.join(path, 'vocab.txt')
+    with open(vocab, 'w') as f:
+        f.write('\n'.join(['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + sorted(set(WORDS))))
+    tokenizer = transformers.DistilBertTokenizerFast(vocab, model_max_length=512)
+    tokenizer.save_pretrained(path)
+
+    torch.manual_seed(0)
+    model = transformers.DistilBertForSequenceClassification(transformers.DistilBertConfig(
+        vocab_size=len(set(WORDS)) + 5, dim=32, n_layers=1, n_heads=2, hidden_dim=64,
+        id2label={0: 'NEGATIVE', 1: 'POSITIVE'}, label2id={'NEGATIVE': 0, 'POSITIVE': 1}
+    ))
+    training = texts(256, seed='train')
+    labels = torch.tensor([int(result['label'] == 'POSITIVE') for result in StubSentimentPipeline()(training)])
+    batch = tokenizer(training, truncation=True, padding=True, return_tensors='pt')
+    optimizer = torch.optim.AdamW(model.parameters(), lr=3e-3)
+    model.train()
+    for _ in range(40):
+        for start in range(0, len(training), 64):
+            window = slice(start, start + 64)
+            loss = model(input_ids=batch['input_ids'][window], attention_mask=batch['attention_mask'][window],
+                         labels=labels[window]).loss
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+    model.eval()
+    model.save_pretrained(path)
+    return path
+
+@pytest.fixture(scope='module')
+def reference(tiny_model):
+    corpus = texts(64, seed='eval')
+    labels = [result['label'] for result in SentimentAnalyzer(tiny_model, lazy=False).analyze_batch(corpus)]
+    # The parity check means little if the model answers the same label for everything
+    assert {'POSITIVE', 'NEGATIVE'} <= set(labels)
+    return corpus, labels
+
+@pytest.mark.parametrize('backend', ['quantized', 'onnx'])
+def test_backend_labels_match_full_precision(tiny_model, reference, backend):
+    if backend == 'onnx':
+        pytest.importorskip('optimum.onnxruntime')
+    corpus, expected = reference
+    labels = [result['label'] for result in
+              SentimentAnalyzer(tiny_model, backend=backend, lazy=False).analyze_batch(corpus)]
+    agreement = sum(a == b for a, b in zip(expected, labels)) / len(corpus)
+    assert agreement >= MIN_AGREEMENT
+
+def stub_analyzer(**kwargs) -> SentimentAnalyzer:
+    analyzer = SentimentAnalyzer(**kwargs)
+    analyzer.model.loader = StubSentimentPipeline
+    return analyzer
+
+def test_batches_match_single_texts_in_input_order():
+    corpus = texts(40, seed='order') + ['']
+    analyzer = stub_analyzer()
+    assert analyzer.analyze_batch(corpus, batch_size=8) == [analyzer.analyze_text(text) for text in corpus]
+
+def test_backends_cache_results_separately():
+    cache = AnalysisCache(path=None)
+    pytorch, quantized = stub_analyzer(cache=cache), stub_analyzer(cache=cache, backend='quantized')
+    pytorch.analyze_text('feeling hopeful today')
+    assert cache.get(AnalysisCache.make_key('sentiment', pytorch.model_version, 'feeling hopeful today'))
+    assert cache.get(AnalysisCache.make_key('sentiment', quantized.model_version, 'feeling hopeful today')) is None